@@ -1,6 +1,5 @@
 import os
 import asyncio
-import uuid
 import time
 from urllib.parse import urlparse
 from playwright.async_api import async_playwright
@@ -9,7 +8,6 @@ from transformers import AutoTokenizer
 
 from loguru import logger
 from markitdown import MarkItDown
-from bs4 import BeautifulSoup
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
@@ -17,6 +15,15 @@ import json # Добавляем для парсинга JSON
 import re # Добавляем для извлечения данных из текста, если JSON невалидный
 from llm.model import get_llm_completion, active_llm_provider, LLMUnavailableError # Изменяем импорт, добавляем active_llm_provider и LLMUnavailableError
 from models import AIAnalysisResult
+from scheduler import scheduler, Priority
+from checkpoints import StageCheckpoint
+from retry_policy import plan_failure
+from db import get_db
+from storage_ops import artifact_upload, decode_artifact
+from storage_backends import get_storage
+import cas
+import bookmarks_parser
+from category_normalizer import FALLBACK_CATEGORY, get_normalizer
 import httpx # Добавляем для типизации исключений, если понадобится
 
 # Загрузка окружения
@@ -32,8 +39,8 @@ PROXY_URL = os.getenv("PROXY_URL")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-# --- ПАПКИ ДЛЯ ИМПОРТА ---
-TARGET_FOLDERS = ["Разработка", "Полезное"]
+# --- ПАПКИ ДЛЯ ИМПОРТА (BOOKMARK_TARGET_FOLDERS через запятую) ---
+TARGET_FOLDERS = bookmarks_parser.TARGET_FOLDERS
 
 # --- АВАРИЙНЫЙ ВЫХОД ЕСЛИ НЕТ ПРОКСИ ---
 if not PROXY_URL or "http" not in PROXY_URL:
@@ -41,6 +48,7 @@ if not PROXY_URL or "http" not in PROXY_URL:
     raise SystemExit("Error: PROXY_URL is mandatory for this project.")
 
 # Инициализация клиентов
+# Синхронный клиент остаётся для скриптов; async-код ходит в базу через db.get_db()
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 md_converter = MarkItDown()
@@ -48,37 +56,9 @@ md_converter = MarkItDown()
 # Загружаем токенизатор для Llama 3 (он же для Llama 4)
 tokenizer = AutoTokenizer.from_pretrained("unsloth/llama-3-8b-instruct-bnb-4bit")
 
-def parse_chrome_bookmarks(html_content: str):
-    """Парсит HTML-файл закладок Chrome и возвращает список ссылок из нужных папок."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    extracted_data = {}
-    all_folders = soup.find_all('h3')
-    
-    for h3 in all_folders:
-        folder_name = h3.get_text().strip()
-        if folder_name in TARGET_FOLDERS:
-            parent_dl = h3.find_next('dl')
-            if parent_dl:
-                links = parent_dl.find_all('a')
-                for a in links:
-                    url = a.get('href')
-                    if not url or url.startswith('chrome://') or url.startswith('about:'):
-                        continue
-                    
-                    title = a.get_text().strip()
-                    try:
-                        add_date = int(a.get('add_date', 0))
-                    except:
-                        add_date = 0
-                    
-                    # Сохраняем самую свежую версию ссылки, если она дублируется
-                    if url in extracted_data:
-                        if add_date > extracted_data[url]['add_date']:
-                            extracted_data[url] = {"title": title, "add_date": add_date}
-                    else:
-                        extracted_data[url] = {"title": title, "add_date": add_date}
-
-    return [{"url": url, "title": info["title"], "add_date": info["add_date"]} for url, info in extracted_data.items()]
+def parse_chrome_bookmarks(source):
+    """Ссылки из нужных папок экспорта Chrome (строка, bytes или файл) — потоковым однопроходным разбором."""
+    return bookmarks_parser.parse_chrome_bookmarks(source, TARGET_FOLDERS)
 
 async def take_screenshot(url: str, output_path: str):
     """Делает скриншот через Playwright с ОБЯЗАТЕЛЬНЫМ прокси."""
@@ -127,13 +107,16 @@ async def process_image(input_path: str, output_path: str):
     )
     await process.communicate()
 
-def upload_to_supabase(file_path: str, storage_path: str, content_type: str):
-    """Загрузка в Supabase Storage."""
+async def upload_to_supabase(file_path: str, storage_path: str, content_type: str):
+    """Загрузка в хранилище ассетов (Supabase Storage или замена по STORAGE_BACKEND)."""
     with open(file_path, "rb") as f:
-        supabase.storage.from_("screenshots").upload(
-            path=storage_path, file=f,
-            file_options={"content-type": content_type, "upsert": "true"}
-        )
+        data, options = artifact_upload(f.read(), content_type)
+    await get_storage().upload(storage_path, data, options)
+
+async def download_text_artifact(storage_path: str) -> str:
+    """Читает HTML/markdown из Storage, прозрачно распаковывая сжатые объекты."""
+    data = await get_storage().download(storage_path)
+    return decode_artifact(data).decode("utf-8", errors="replace")
 
 async def analyze_markdown_content(markdown_content: str, fire: bool = False):
     """ИИ-анализ контента."""
@@ -175,10 +158,12 @@ async def analyze_markdown_content(markdown_content: str, fire: bool = False):
             categories_match = re.search(r"Категории:\s*(.*?)(?:\n|$)", content_str)
             
             summary_text = summary_match.group(1).strip() if summary_match else content_str[:200] + "..." # Берем начало текста
-            categories_text = categories_match.group(1).strip() if categories_match else "Разное"
+            categories_text = categories_match.group(1).strip() if categories_match else ""
             result = AIAnalysisResult(summary=summary_text, categories=[c.strip() for c in categories_text.split(',') if c.strip()])
 
-        categories = result.categories if result.categories else ["Разное"]
+        # Свободные метки ИИ → канонические категории (иначе плодятся почти-дубликаты)
+        normalizer = await get_normalizer()
+        categories = normalizer.normalize(result.categories or []) or [FALLBACK_CATEGORY]
         return {"summary": result.summary, "categories": categories}
     except LLMUnavailableError:
         # Просто пробрасываем наверх, чтобы API или Воркер решили что делать
@@ -187,46 +172,83 @@ async def analyze_markdown_content(markdown_content: str, fire: bool = False):
         logger.error(f"AI Error: {e}")
         raise e
 
-async def process_bookmark_full_cycle(bookmark_id: int, url: str):
+async def save_bookmark_update(bookmark_id: int, data: dict, writer=None):
+    """Обновляет закладку сразу или через буфер пачечной записи (если он передан)."""
+    if writer is not None:
+        writer.add(bookmark_id, data)
+    else:
+        db = await get_db()
+        await db.table("bookmarks").update(data).eq("id", bookmark_id).execute()
+
+async def process_bookmark_full_cycle(bookmark_id: int, url: str, priority: Priority = Priority.BACKGROUND, attempts: int = 0, writer=None):
     """
     ПОЛНЫЙ ЦИКЛ ОБРАБОТКИ ЗАКЛАДКИ.
     Используется и сервером (main.py) и воркером (conveyor_worker.py).
+    Тяжёлые этапы занимают место в общем планировщике по одному, поэтому между
+    этапами фоновая задача уступает очередь интерактивным запросам.
+    attempts — сколько попыток уже было; по нему считается следующий повтор.
+    writer — BookmarkWriteBuffer конвейера; без него запись идёт напрямую.
     """
-    unique_id = uuid.uuid4().hex
-    raw_path = os.path.join(TEMP_DIR, f"{unique_id}_raw.png")
-    proc_path = os.path.join(TEMP_DIR, f"{unique_id}.png")
-    html_path = os.path.join(TEMP_DIR, f"{unique_id}.html")
+    checkpoint = StageCheckpoint(bookmark_id)
+    keep_checkpoint = False
     
     start_all = time.perf_counter()
     logger.info(f"--- Начало цикла для закладки #{bookmark_id} ({url}) ---")
+    if checkpoint.stage:
+        logger.info(f"♻️ Найден чекпоинт этапа '{checkpoint.stage}', продолжаем с него.")
 
     try:
         # 1. Скрапинг и Скриншот
-        logger.info(f"[1/5] Скрапинг страницы...")
-        title, html_content = await take_screenshot(url, raw_path)
-        
-        with open(html_path, "w", encoding="utf-8") as f: 
-            f.write(html_content)
+        if checkpoint.reached("crawled"):
+            logger.info(f"[1/5] Скрапинг пропущен (чекпоинт).")
+            title = checkpoint.meta.get("title", "")
+        else:
+            logger.info(f"[1/5] Скрапинг страницы...")
+            async with scheduler.slot(priority):
+                title, html_content = await take_screenshot(url, checkpoint.raw_path)
+            
+            with open(checkpoint.html_path, "w", encoding="utf-8") as f: 
+                f.write(html_content)
+            checkpoint.mark("crawled", title=title)
         
         # 2. Обработка изображения
-        logger.info(f"[2/5] Обработка скриншота...")
-        await process_image(raw_path, proc_path)
+        if checkpoint.reached("rendered"):
+            logger.info(f"[2/5] Обработка скриншота пропущена (чекпоинт).")
+        else:
+            logger.info(f"[2/5] Обработка скриншота...")
+            await process_image(checkpoint.raw_path, checkpoint.proc_path)
+            checkpoint.mark("rendered")
+            if os.path.exists(checkpoint.raw_path): os.remove(checkpoint.raw_path)
         
         # 3. Конвертация в Markdown и ИИ Анализ
         logger.info(f"[3/5] Конвертация и ИИ Анализ (Groq)...")
-        res = md_converter.convert(html_path)
+        if checkpoint.reached("converted"):
+            with open(checkpoint.md_path, "r", encoding="utf-8") as f:
+                markdown_text = f.read()
+        else:
+            markdown_text = md_converter.convert(checkpoint.html_path).text_content
+            with open(checkpoint.md_path, "w", encoding="utf-8") as f:
+                f.write(markdown_text)
+            checkpoint.mark("converted")
         
         try:
-            ai_data = await analyze_markdown_content(res.text_content)
-        except LLMUnavailableError:
-            logger.warning(f"⚠️ ИИ временно недоступен для #{bookmark_id}. Оставляем в очереди.")
+            async with scheduler.slot(priority):
+                ai_data = await analyze_markdown_content(markdown_text)
+        except LLMUnavailableError as llm_error:
+            retry_data = plan_failure(llm_error, attempts)
+            logger.warning(f"⚠️ ИИ временно недоступен для #{bookmark_id}. Повтор после {retry_data['next_attempt_at']} с чекпоинта '{checkpoint.stage}'.")
+            keep_checkpoint = True
+            retry_data["processing_stage"] = checkpoint.stage
+            await save_bookmark_update(bookmark_id, retry_data, writer)
             return None # Выходим без обновления БД как "processed"
 
         # 4. Загрузка в Storage
         logger.info(f"[4/5] Загрузка assets в Supabase...")
-        storage_filename = f"{bookmark_id}.png"
-        upload_to_supabase(proc_path, storage_filename, "image/png")
-        image_url = supabase.storage.from_("screenshots").get_public_url(storage_filename)
+        if cas.CAS_ENABLED:
+            image_path, _, _ = await cas.put_file(checkpoint.proc_path, "image/png")
+            await cas.link_asset(bookmark_id, "image", image_path)
+        else:
+            await upload_to_supabase(checkpoint.proc_path, f"{bookmark_id}.png", "image/png")
         
         # 5. Обновление БД
         logger.info(f"[5/5] Обновление записи в БД...")
@@ -235,9 +257,14 @@ async def process_bookmark_full_cycle(bookmark_id: int, url: str):
             "summary": ai_data["summary"],
             "categories": ai_data["categories"],
             "is_processed": True,
-            "processing_error": None
+            "processing_error": None,
+            "processing_stage": None,
+            "last_error": None,
+            "next_attempt_at": None,
+            "leased_until": None,
+            "dead_letter": False
         }
-        supabase.table("bookmarks").update(update_data).eq("id", bookmark_id).execute()
+        await save_bookmark_update(bookmark_id, update_data, writer)
         
         duration = time.perf_counter() - start_all
         logger.success(f"--- Закладка #{bookmark_id} обработана успешно за {duration:.2f} сек. ---")
@@ -245,16 +272,21 @@ async def process_bookmark_full_cycle(bookmark_id: int, url: str):
 
     except Exception as e:
         logger.error(f"Ошибка цикла для закладки #{bookmark_id}: {str(e)}")
-        # Записываем ошибку в БД и помечаем как обработанную, чтобы воркер не зацикливался
-        supabase.table("bookmarks").update({
-            "processing_error": str(e),
-            "is_processed": True  # Помечаем True, чтобы воркер пропустил её в следующий раз
-        }).eq("id", bookmark_id).execute()
+        # Временные ошибки уходят на повтор с экспоненциальной паузой, постоянные — в dead-letter
+        retry_data = plan_failure(e, attempts)
+        # Для dead-letter чекпоинт удаляется в finally — этап сохранять незачем
+        retry_data["processing_stage"] = None if retry_data["dead_letter"] else checkpoint.stage
+        if retry_data["dead_letter"]:
+            logger.error(f"☠️ Закладка #{bookmark_id} отправлена в dead-letter после {retry_data['attempts']} попыток.")
+        else:
+            keep_checkpoint = True
+            logger.warning(f"🔁 Закладка #{bookmark_id}: повтор после {retry_data['next_attempt_at']}.")
+        await save_bookmark_update(bookmark_id, retry_data, writer)
         raise e
     finally:
-        # Очистка временных файлов
-        for p in [raw_path, proc_path, html_path]:
-            if os.path.exists(p): os.remove(p)
+        # Артефакты чекпоинта оставляем только для будущего повтора
+        if not keep_checkpoint:
+            checkpoint.clear()
 
 # Джин не трогай этот ендпойнт, ето писал Босс, ему это нужно
 def count_tokens(text: str) -> int:
@@ -0,0 +1,44 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+from loguru import logger
+
+from db import get_db
+
+# Заполняет bookmark_categories по bookmarks.categories для уже существующих закладок.
+# Дальше таблицу ведут триггеры (миграция 20261019001000_bookmark_categories.sql).
+# Повторный запуск безопасен: связи каждой пачки пересобираются целиком.
+
+load_dotenv()
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+if not SUPABASE_URL or not SUPABASE_KEY:
+    raise ValueError("Учетные данные Supabase не найдены в файле .env")
+
+BATCH_SIZE = 1000
+
+async def backfill():
+    db = await get_db()
+    last_id, bookmarks, links = 0, 0, 0
+    while True:
+        res = await db.table("bookmarks").select("id") \
+            .gt("id", last_id).order("id").limit(BATCH_SIZE).execute()
+        ids = [row["id"] for row in res.data or []]
+        if not ids:
+            break
+        linked = await db.rpc("sync_bookmark_categories", {"p_ids": ids}).execute()
+        bookmarks += len(ids)
+        links += linked.data or 0
+        last_id = ids[-1]
+        logger.info(f"🔗 Обработано {bookmarks} закладок, связей: {links} (до id {last_id})")
+        if len(ids) < BATCH_SIZE:
+            break
+    logger.success(f"Backfill завершён: {bookmarks} закладок, {links} связей с категориями.")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(backfill())
+    except KeyboardInterrupt:
+        print("\n\nПрограмма прервана пользователем (Ctrl+C)")
+    except Exception as e:
+        logger.exception("Произошла глобальная ошибка в работе программы:")
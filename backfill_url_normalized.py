@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+from loguru import logger
+
+from db import get_db
+from url_canon import normalize_url
+
+# Заполняет bookmarks.url_normalized (миграция 20261019001100_bookmarks_url_normalized.sql).
+# Повторный запуск безопасен: пишутся только изменившиеся значения, поэтому скрипт же
+# пересчитывает ключи после изменения normalize_url и подхватывает строки, вставленные без ключа.
+# Из нескольких закладок с одинаковым ключом остаётся обработанная (со скриншотом и категориями),
+# среди равных — самая ранняя по id. Она получает категории дубликатов, их summary и title,
+# если своих нет, а дубликаты удаляются (их файлы в Storage потом уберёт storage_sweeper.py).
+# --dry-run только показывает план.
+
+load_dotenv()
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+if not SUPABASE_URL or not SUPABASE_KEY:
+    raise ValueError("Учетные данные Supabase не найдены в файле .env")
+
+PAGE_SIZE = 1000
+BATCH_SIZE = 500
+
+async def load_rows(db):
+    rows, last_id = [], 0
+    while True:
+        res = await db.table("bookmarks").select("id, url, url_normalized, title, summary, categories, is_processed") \
+            .gt("id", last_id).order("id").limit(PAGE_SIZE).execute()
+        page = res.data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        last_id = page[-1]["id"]
+
+def survivor_rank(row):
+    """
+    Чем меньше, тем лучше оригинал: обработанная закладка (её скриншот лежит под её id)
+    важнее необработанной, с категориями — важнее пустой, дальше самая ранняя.
+    """
+    return (not row.get("is_processed"), not row.get("categories"), row["id"])
+
+def plan(rows):
+    """
+    Возвращает ({id: новый ключ или None} для изменившихся строк,
+    {id оригинала: [строки-дубликаты]}). Дубликаты в изменения не попадают — они удаляются.
+    """
+    groups, changes = {}, {}
+    for row in rows:
+        key = normalize_url(row["url"])
+        if key is None:
+            if row.get("url_normalized") is not None:
+                changes[row["id"]] = None
+            continue
+        groups.setdefault(key, []).append(row)
+
+    duplicates = {}
+    for key, group in groups.items():
+        original = min(group, key=survivor_rank)
+        dups = [row for row in group if row is not original]
+        if dups:
+            duplicates[original["id"]] = dups
+        if original.get("url_normalized") != key:
+            changes[original["id"]] = key
+    return changes, duplicates
+
+def merged(original, duplicates):
+    """Поля оригинала, которые нужно дополнить из дубликатов (пустой dict — ничего)."""
+    categories = list(original.get("categories") or [])
+    summary = original.get("summary")
+    title = original.get("title")
+    for dup in sorted(duplicates, key=survivor_rank):
+        categories += [c for c in dup.get("categories") or [] if c not in categories]
+        summary = summary or dup.get("summary")
+        title = title or dup.get("title")
+    update = {}
+    if categories != list(original.get("categories") or []):
+        update["categories"] = categories
+    if summary != original.get("summary"):
+        update["summary"] = summary
+    if title != original.get("title"):
+        update["title"] = title
+    return update
+
+async def merge_duplicates(db, rows, duplicates):
+    by_id = {row["id"]: row for row in rows}
+    for original_id, dups in duplicates.items():
+        update = merged(by_id[original_id], dups)
+        if update:
+            await db.table("bookmarks").update(update).eq("id", original_id).execute()
+    dup_ids = [dup["id"] for dups in duplicates.values() for dup in dups]
+    for i in range(0, len(dup_ids), BATCH_SIZE):
+        await db.table("bookmarks").delete().in_("id", dup_ids[i:i + BATCH_SIZE]).execute()
+    return len(dup_ids)
+
+async def write(db, payload):
+    for i in range(0, len(payload), BATCH_SIZE):
+        await db.rpc("set_bookmarks_url_normalized", {"p_rows": payload[i:i + BATCH_SIZE]}).execute()
+
+async def backfill(dry_run: bool = False):
+    db = await get_db()
+    rows = await load_rows(db)
+    changes, duplicates = plan(rows)
+    duplicate_count = sum(len(dups) for dups in duplicates.values())
+    for original_id, dups in list(duplicates.items())[:50]:
+        dup_ids = ", ".join(f"#{dup['id']}" for dup in dups)
+        logger.warning(f"🔁 Дубликаты #{original_id}: {dup_ids} ({dups[0]['url']})")
+    logger.info(f"Закладок: {len(rows)}, к обновлению: {len(changes)}, дубликатов к слиянию: {duplicate_count}")
+    if dry_run:
+        return
+    if duplicates:
+        removed = await merge_duplicates(db, rows, duplicates)
+        logger.success(f"Дубликаты слиты в оригиналы и удалены: {removed}.")
+    if not changes:
+        return
+
+    # Сначала снимаем старые ключи, потом пишем новые: итоговый набор уникален,
+    # а промежуточные состояния не упираются в уникальный индекс
+    await write(db, [{"id": i, "url_normalized": None} for i in changes])
+    await write(db, [{"id": i, "url_normalized": key} for i, key in changes.items() if key is not None])
+    logger.success(f"url_normalized заполнен для {len(changes)} закладок.")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(backfill(dry_run="--dry-run" in sys.argv))
+    except KeyboardInterrupt:
+        print("\n\nПрограмма прервана пользователем (Ctrl+C)")
+    except Exception as e:
+        logger.exception("Произошла глобальная ошибка в работе программы:")
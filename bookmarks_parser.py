@@ -0,0 +1,150 @@
+import codecs
+import html
+import os
+import re
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Union
+
+# --- Потоковый разбор экспорта закладок Chrome (Netscape Bookmark File) ---
+# Файл читается кусками и проходится один раз: стек <DL> даёт полный путь папок ссылки.
+CHUNK_SIZE = 64 * 1024
+SKIP_SCHEMES = ("chrome://", "about:", "javascript:")
+FOLDER_SEPARATOR = "/"
+
+
+def folders_from_env(default: Iterable[str]) -> List[str]:
+    """Целевые папки из BOOKMARK_TARGET_FOLDERS (через запятую) или значение по умолчанию."""
+    raw = os.getenv("BOOKMARK_TARGET_FOLDERS")
+    if not raw:
+        return list(default)
+    return [name.strip() for name in raw.split(",") if name.strip()]
+
+
+TARGET_FOLDERS = folders_from_env(["Разработка", "Полезное"])
+
+
+# Из разметки нужны только ссылки, заголовки папок и границы <DL>; <DT> и <p> не закрываются и пропускаются.
+# Текст ссылки или папки не может пересечь структурный тег: незакрытый <A> теряет только себя,
+# а не поглощает соседние ссылки до следующего </A>.
+_TEXT = r"([^<]*(?:<(?!/?(?:a|h3|dl|dt)\b)[^<]*)*)"
+_TOKEN = re.compile(
+    rf"<(?:a\b([^>]*)>{_TEXT}</a>|h3\b[^>]*>{_TEXT}</h3>|(dl)\b[^>]*>|(/dl)>)",
+    re.IGNORECASE,
+)
+_ATTR = re.compile(r"\b(href|add_date)\s*=\s*\"([^\"]*)\"", re.IGNORECASE)
+
+
+def _unescape(text: str) -> str:
+    return html.unescape(text) if "&" in text else text
+
+
+class _NetscapeBookmarkParser:
+    """
+    Однопроходный токенизатор формата Netscape Bookmark File.
+    <H3>Папка</H3> объявляет папку, следующий за ним <DL> открывает её содержимое, </DL> закрывает.
+    Незавершённый на границе куска токен остаётся в буфере до следующего куска.
+    """
+
+    def __init__(self):
+        self.path: List[str] = []
+        self.links: List[dict] = []
+        self._dl_stack: List[bool] = []  # открыл ли этот <DL> именованную папку
+        self._pending_folder: Optional[str] = None
+        self._buffer = ""
+
+    def feed(self, chunk: str):
+        data = self._buffer + chunk
+        pos = 0
+        for match in _TOKEN.finditer(data):
+            attrs, title, folder, dl_open, dl_close = match.groups()
+            if attrs is not None:
+                found = {k.lower(): v for k, v in _ATTR.findall(attrs)}
+                self.links.append({
+                    "url": _unescape(found.get("href", "")),
+                    "title": _unescape(title).strip(),
+                    "add_date": found.get("add_date"),
+                    "folders": tuple(self.path),
+                })
+            elif folder is not None:
+                self._pending_folder = _unescape(folder).strip()
+            elif dl_open:
+                opened = self._pending_folder is not None
+                if opened:
+                    self.path.append(self._pending_folder)
+                self._dl_stack.append(opened)
+                self._pending_folder = None
+            elif dl_close and self._dl_stack:
+                if self._dl_stack.pop() and self.path:
+                    self.path.pop()
+            pos = match.end()
+        self._buffer = data[pos:]
+
+    def close(self):
+        self._buffer = ""
+
+
+def _chunks(source: Union[str, bytes, IO]) -> Iterator[str]:
+    if isinstance(source, str):
+        for i in range(0, len(source), CHUNK_SIZE):
+            yield source[i:i + CHUNK_SIZE]
+        return
+    if isinstance(source, bytes):
+        yield source.decode("utf-8", errors="ignore")
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _add_date(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def iter_chrome_bookmarks(source: Union[str, bytes, IO]) -> Iterator[dict]:
+    """
+    Все ссылки экспорта по порядку: {"url", "title", "add_date", "folders"},
+    folders — кортеж папок от корня. source — строка, bytes или открытый файл.
+    """
+    parser = _NetscapeBookmarkParser()
+    for chunk in _chunks(source):
+        parser.feed(chunk)
+        links, parser.links = parser.links, []
+        for link in links:
+            link["add_date"] = _add_date(link["add_date"])
+            yield link
+    parser.close()
+    for link in parser.links:
+        link["add_date"] = _add_date(link["add_date"])
+        yield link
+
+
+def parse_chrome_bookmarks(source: Union[str, bytes, IO], target_folders: Optional[Iterable[str]] = None) -> List[dict]:
+    """
+    Уникальные ссылки из целевых папок (на любой глубине вложенности) с полным путём папки.
+    Пустой список папок — без фильтра. Дубликаты URL схлопываются, остаётся самая свежая версия.
+    """
+    targets = set(TARGET_FOLDERS if target_folders is None else target_folders)
+    extracted: Dict[str, dict] = {}
+    for link in iter_chrome_bookmarks(source):
+        url = link["url"]
+        if not url or url.startswith(SKIP_SCHEMES):
+            continue
+        if targets and not targets.intersection(link["folders"]):
+            continue
+        known = extracted.get(url)
+        if known is None or link["add_date"] > known["add_date"]:
+            extracted[url] = {
+                "url": url,
+                "title": link["title"],
+                "add_date": link["add_date"],
+                "folder": FOLDER_SEPARATOR.join(link["folders"]),
+            }
+    return list(extracted.values())
@@ -3,6 +3,9 @@ import os
 from supabase import create_client
 from dotenv import load_dotenv
 
+from url_canon import normalize_url
+from import_watermarks import ImportWatermarks
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -20,6 +23,7 @@ def bulk_import():
     total = len(new_links)
     if total == 0:
         print("No new links to import.")
+        ImportWatermarks().commit_pending()
         return
 
     print("Starting import of " + str(total) + " items...")
@@ -30,23 +34,32 @@ def bulk_import():
         data.append({
             "title": item["title"],
             "url": item["url"],
+            "url_normalized": normalize_url(item["url"]),
             "date_add": item["add_date"],
             "is_processed": False
         })
 
-    batch_size = 50
+    batch_size = 500
     count = 0
+    added = 0
     for i in range(0, len(data), batch_size):
         batch = data[i : i + batch_size]
         try:
-            supabase.table("bookmarks").insert(batch).execute()
+            # Уже существующие URL пропускаются уникальным индексом url_normalized
+            res = supabase.table("bookmarks") \
+                .upsert(batch, on_conflict="url_normalized", ignore_duplicates=True) \
+                .execute()
             count += len(batch)
+            added += len(res.data or [])
             print("Progress: " + str(count) + "/" + str(total))
         except Exception as e:
             print("Error: " + str(e))
-            break
+            print("Import watermark not advanced: rerun extract_bookmarks.py to retry these links.")
+            return
 
-    print("Done! Imported: " + str(count))
+    print("Done! Imported: " + str(added) + ", skipped as duplicates: " + str(count - added))
+    # Водяной знак extract_bookmarks.py двигается только после записи всех пачек
+    ImportWatermarks().commit_pending()
 
 if __name__ == "__main__":
     bulk_import()
\ No newline at end of file
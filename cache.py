@@ -0,0 +1,75 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set, Tuple
+
+from loguru import logger
+
+
+class AsyncTTLCache:
+    """
+    Кэш в памяти процесса с ограниченным временем жизни записей.
+
+    Загрузка выполняется в режиме single-flight: сколько бы запросов ни
+    пришло за просроченным ключом одновременно, в базу уйдёт один.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._values: Dict[Hashable, Tuple[float, Any]] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+
+    def _fresh(self, key: Hashable):
+        entry = self._values.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry
+        return None
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._fresh(key)
+        if entry:
+            return entry[1]
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Пока ждали блокировку, значение мог загрузить соседний запрос
+            entry = self._fresh(key)
+            if entry:
+                return entry[1]
+            value = await loader()
+            self._values[key] = (time.monotonic(), value)
+            return value
+
+    async def get_or_stale(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Как get(), но просроченное значение отдаётся сразу, а обновление идёт в фоне.
+        Ждать загрузку приходится только при самом первом обращении к ключу.
+        """
+        entry = self._values.get(key)
+        if entry is None:
+            return await self.get(key, loader)
+        if not self._fresh(key):
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            if not lock.locked():
+                task = asyncio.create_task(self.get(key, loader))
+                self._refreshing.add(task)
+                task.add_done_callback(self._refresh_done)
+        return entry[1]
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refreshing.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Фоновое обновление кэша не удалось: {task.exception()}")
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Свежее значение без загрузки (default, если его нет или оно просрочено)."""
+        entry = self._fresh(key)
+        return entry[1] if entry else default
+
+    def set(self, key: Hashable, value: Any):
+        self._values[key] = (time.monotonic(), value)
+
+    def invalidate(self, key: Hashable = None):
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
@@ -0,0 +1,85 @@
+import hashlib
+import os
+from typing import Optional, Tuple
+
+from loguru import logger
+
+from db import get_db
+from storage_backends import get_storage
+from storage_ops import STORAGE_BUCKET, artifact_upload
+
+# --- Контентно-адресуемое хранение ассетов ---
+# Включается STORAGE_CAS=1: объект лежит по хэшу содержимого (cas/ab/abcdef....png),
+# одинаковые скриншоты и страницы хранятся один раз и повторно не загружаются.
+CAS_ENABLED = os.getenv("STORAGE_CAS", "0") == "1"
+CAS_PREFIX = "cas/"
+BLOBS_TABLE = "asset_blobs"
+REFS_TABLE = "asset_refs"
+
+EXTENSIONS = {"image/png": ".png", "image/jpg": ".jpg", "image/jpeg": ".jpg",
+              "text/html": ".html", "text/markdown": ".md"}
+
+
+def content_hash(data: bytes) -> str:
+    """sha256 исходного (несжатого) содержимого."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def cas_path(digest: str, content_type: str) -> str:
+    return f"{CAS_PREFIX}{digest[:2]}/{digest}{EXTENSIONS.get(content_type, '')}"
+
+
+def is_cas_path(path: Optional[str]) -> bool:
+    return bool(path) and path.startswith(CAS_PREFIX)
+
+
+def digest_from_path(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+async def put_blob(data: bytes, content_type: str, bucket: str = STORAGE_BUCKET) -> Tuple[str, str, bool]:
+    """
+    Кладёт содержимое в CAS, если его там ещё нет.
+    Возвращает (путь, хэш, загружали ли байты).
+    """
+    digest = content_hash(data)
+    path = cas_path(digest, content_type)
+    db = await get_db()
+
+    existing = await db.table(BLOBS_TABLE).select("hash").eq("bucket", bucket).eq("hash", digest).limit(1).execute()
+    if existing.data:
+        logger.debug(f"♻️ CAS: {path} уже в хранилище, загрузка пропущена.")
+        return path, digest, False
+
+    body, options = artifact_upload(data, content_type)
+    await get_storage(bucket).upload(path, body, options)
+    # Строку пишем после загрузки: запись в таблице гарантирует, что объект есть в бакете
+    await db.table(BLOBS_TABLE).upsert(
+        {"bucket": bucket, "hash": digest, "path": path, "size": len(body), "content_type": content_type},
+        on_conflict="bucket,hash", ignore_duplicates=True
+    ).execute()
+    return path, digest, True
+
+
+async def put_file(file_path: str, content_type: str) -> Tuple[str, str, bool]:
+    with open(file_path, "rb") as f:
+        return await put_blob(f.read(), content_type)
+
+
+def stage_file(bundle, file_path: str, content_type: str) -> str:
+    """Ставит загрузку файла в CAS в пакет StorageBundle и сразу возвращает его путь."""
+    with open(file_path, "rb") as f:
+        data = f.read()
+    path = cas_path(content_hash(data), content_type)
+    bundle.call(path, lambda: put_blob(data, content_type))
+    return path
+
+
+async def link_asset(bookmark_id: int, kind: str, path: str):
+    """Привязывает объект CAS к закладке (kind: image, html, markdown)."""
+    db = await get_db()
+    await db.table(REFS_TABLE).upsert(
+        {"bookmark_id": bookmark_id, "kind": kind, "hash": digest_from_path(path), "path": path},
+        on_conflict="bookmark_id,kind"
+    ).execute()
+
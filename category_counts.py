@@ -0,0 +1,125 @@
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from db import get_db
+
+# --- Пересчёт счётчиков категорий одним проходом ---
+PAGE_SIZE = 1000
+CATEGORY_COLUMNS = "id, name, slug, parent_category, bookmarks_count"
+
+
+def build_parent_map(categories: List[dict]) -> Dict[str, Optional[str]]:
+    return {c["name"]: c.get("parent_category") for c in categories}
+
+
+def with_ancestors(names: Iterable[str], parents: Dict[str, Optional[str]]) -> Set[str]:
+    """
+    Категории закладки вместе со всеми их родителями.
+    Закладка учитывается в родителе один раз, даже если у неё несколько дочерних категорий.
+    """
+    result: Set[str] = set()
+    for name in names:
+        while name and name not in result:
+            result.add(name)
+            name = parents.get(name)
+    return result
+
+
+def aggregate_counts(category_lists: Iterable[Iterable[str]], parents: Dict[str, Optional[str]]) -> Counter:
+    counts: Counter = Counter()
+    for names in category_lists:
+        counts.update(with_ancestors(names or [], parents))
+    return counts
+
+
+async def fetch_categories(db) -> List[dict]:
+    categories, offset = [], 0
+    while True:
+        res = await db.table("categories").select(CATEGORY_COLUMNS) \
+            .order("id").range(offset, offset + PAGE_SIZE - 1).execute()
+        rows = res.data or []
+        categories.extend(rows)
+        if len(rows) < PAGE_SIZE:
+            return categories
+        offset += PAGE_SIZE
+
+
+async def stream_bookmark_categories(db, page_size: Optional[int] = None):
+    """Категории всех закладок одним проходом по ключу id (без OFFSET и без лимита PostgREST в 1000 строк)."""
+    page_size = page_size or PAGE_SIZE
+    last_id = 0
+    while True:
+        res = await db.table("bookmarks").select("id, categories") \
+            .gt("id", last_id).order("id").limit(page_size).execute()
+        rows = res.data or []
+        for row in rows:
+            yield row.get("categories") or []
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+async def compute_counts(db=None):
+    """Считает фактические счётчики. Возвращает (категории, {имя: число})."""
+    db = db or await get_db()
+    categories = await fetch_categories(db)
+    parents = build_parent_map(categories)
+
+    counts: Counter = Counter()
+    async for names in stream_bookmark_categories(db):
+        counts.update(with_ancestors(names, parents))
+    return categories, counts
+
+
+async def repair_counts(db) -> Dict[str, int]:
+    """
+    Пересчёт и запись одной транзакцией в базе (функция recount_category_counts):
+    счётчики из Python-прохода могли бы затереть изменения триггеров между чтением и записью.
+    """
+    res = await db.rpc("recount_category_counts", {}).execute()
+    return {row["category_name"]: row["new_count"] for row in res.data or []}
+
+
+async def recount_all(db=None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Полный пересчёт bookmarks_count. Возвращает {имя: новое значение} для изменившихся категорий.
+    dry_run — только посчитать одним проходом по bookmarks, ничего не записывая.
+    """
+    started = time.perf_counter()
+    db = db or await get_db()
+    if dry_run:
+        categories, counts = await compute_counts(db)
+        unknown = set(counts) - {c["name"] for c in categories}
+        if unknown:
+            logger.warning(f"Категории закладок, которых нет в таблице categories ({len(unknown)}): {sorted(unknown)[:20]}")
+        changed = {c["name"]: counts.get(c["name"], 0)
+                   for c in categories if (c.get("bookmarks_count") or 0) != counts.get(c["name"], 0)}
+    else:
+        changed = await repair_counts(db)
+
+    logger.success(f"📊 Пересчёт категорий: изменилось {len(changed)} за {time.perf_counter() - started:.2f} сек.")
+    return changed
+
+
+async def check_drift(db=None, repair: bool = False) -> Dict[str, tuple]:
+    """
+    Сверяет счётчики, которые ведут триггеры (миграция incremental_category_counts),
+    с полным пересчётом. Возвращает {имя: (в таблице, фактически)}.
+    repair — пересчитать заново в базе одной транзакцией (сверка могла устареть).
+    """
+    db = db or await get_db()
+    categories, counts = await compute_counts(db)
+    drift = {c["name"]: (c.get("bookmarks_count") or 0, counts.get(c["name"], 0))
+             for c in categories if (c.get("bookmarks_count") or 0) != counts.get(c["name"], 0)}
+    if not drift:
+        logger.info("✅ Счётчики категорий сходятся с полным пересчётом.")
+        return drift
+
+    logger.warning(f"⚠️ Расхождение счётчиков в {len(drift)} категориях: {dict(list(drift.items())[:10])}")
+    if repair:
+        fixed = await repair_counts(db)
+        logger.success(f"Исправлено {len(fixed)} счётчиков.")
+    return drift
@@ -0,0 +1,254 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from cache import AsyncTTLCache
+from category_counts import fetch_categories
+from category_hierarchy import HIERARCHY
+from db import get_db
+
+# --- Нормализация категорий, которые возвращает ИИ ---
+# Индекс строится один раз из HIERARCHY и таблицы categories и живёт в памяти процесса.
+FUZZY_THRESHOLD = float(os.getenv("CATEGORY_FUZZY_THRESHOLD", "0.6"))
+# Нечёткое совпадение — только опечатки: не больше одной правки на каждые FUZZY_CHARS_PER_EDIT символов.
+# Метки короче FUZZY_MIN_LENGTH нечётко не сопоставляются ('Go', 'Qt', 'C#').
+FUZZY_CHARS_PER_EDIT = 8
+FUZZY_MIN_LENGTH = 5
+# Заглушка, когда ИИ не вернул категорий; известна нормализатору, чтобы не считаться новой
+FALLBACK_CATEGORY = "Разное"
+INDEX_TTL_SECONDS = float(os.getenv("CATEGORY_INDEX_TTL_SECONDS", "600"))
+
+# Частые варианты написания, которые не выводятся из названий категорий
+ALIASES = {
+    "JS": "JavaScript",
+    "TS": "TypeScript",
+    "Golang": "Go",
+    "Postgres": "PostgreSQL",
+    "K8s": "Kubernetes",
+    "Vue": "Vue.js",
+    "Nuxt": "Nuxt.js",
+    "Node": "Node.js",
+    "NodeJS": "Node.js",
+    "Next": "Next.js",
+    "Express": "Express.js",
+    "Rails": "Ruby on Rails",
+    "Shell": "Bash/Shell",
+    "Bash": "Bash/Shell",
+    "GCP": "Google Cloud (GCP)",
+    "Azure": "Microsoft Azure",
+    "LLM": "LLMs (Large Language Models)",
+    "NLP": "NLP (Обработка Естественного Языка)",
+    "Machine Learning": "Искусственный Интеллект и Машинное Обучение",
+    "Машинное обучение": "Искусственный Интеллект и Машинное Обучение",
+    "AI": "Искусственный Интеллект и Машинное Обучение",
+    "ИИ": "Искусственный Интеллект и Машинное Обучение",
+    "DevOps": "Инфраструктура и DevOps",
+    "Security": "Безопасность (Cybersecurity)",
+    "Кибербезопасность": "Безопасность (Cybersecurity)",
+    "Tailwind": "CSS Frameworks (Tailwind CSS, Bootstrap)",
+    "UX": "UX Дизайн",
+    "UI": "UI Дизайн",
+}
+
+_CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh", "з": "z", "и": "i",
+    "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s",
+    "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "iu", "я": "ia",
+}
+_TRANSLIT = str.maketrans(_CYRILLIC)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """
+    Ключ сравнения: регистр, кириллица → латиница, диакритика и пунктуация убираются.
+    '+' и '#' значимы (C, C++, C#), поэтому заменяются словами.
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower().replace("ё", "е")
+    text = text.replace("+", " plus ").replace("#", " sharp ").translate(_TRANSLIT)
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return "-".join(_WORD.findall(text))
+
+
+def trigrams(key: str) -> Set[str]:
+    """Триграммы в духе pg_trgm: каждое слово дополняется пробелами по краям."""
+    result: Set[str] = set()
+    for word in key.split("-"):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Расстояние Дамерау–Левенштейна (перестановка соседних букв — одна правка).
+    При превышении limit возвращает limit + 1, не досчитывая матрицу.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def derived_aliases(name: str) -> List[str]:
+    """
+    Варианты, которые читаются из самого названия:
+    'Google Cloud (GCP)' → 'Google Cloud', 'GCP'; 'Bash/Shell' → 'Bash', 'Shell'.
+    """
+    base = re.sub(r"\s*\(.*?\)", "", name).strip()
+    inner = [part.strip() for group in re.findall(r"\((.*?)\)", name) for part in group.split(",")]
+    variants = [base, *inner]
+    if "/" in base:
+        variants.extend(part.strip() for part in base.split("/"))
+    return [v for v in variants if v and v != name]
+
+
+class CategoryNormalizer:
+    """
+    Приводит свободные метки ИИ к каноническим категориям.
+    Порядок проверки: точное название → slug → алиас → нечёткое совпадение по триграммам.
+    """
+
+    def __init__(self, hierarchy: Dict[str, List[str]] = HIERARCHY, categories: Iterable[dict] = (),
+                 aliases: Dict[str, str] = ALIASES, threshold: float = FUZZY_THRESHOLD):
+        self.threshold = threshold
+        self.suggestions: Counter = Counter()
+        self._exact: Dict[str, str] = {}
+
+        names = [FALLBACK_CATEGORY, *hierarchy]
+        for children in hierarchy.values():
+            names.extend(children)
+        rows = list(categories)
+        names.extend(row["name"] for row in rows if row.get("name"))
+        for name in names:
+            self._exact.setdefault(fold(name), name)
+        for row in rows:
+            if row.get("slug") and row.get("name"):
+                self._exact.setdefault(fold(row["slug"]), row["name"])
+
+        canonical = set(self._exact.values())
+        for alias, target in aliases.items():
+            if target in canonical:
+                self._exact.setdefault(fold(alias), target)
+
+        # Производный алиас, который подходит к нескольким категориям, неоднозначен — его не берём
+        claims: Dict[str, Set[str]] = {}
+        for name in canonical:
+            for alias in derived_aliases(name):
+                claims.setdefault(fold(alias), set()).add(name)
+        for key, owners in claims.items():
+            if key and len(owners) == 1:
+                self._exact.setdefault(key, next(iter(owners)))
+
+        self._keys: List[Tuple[str, str, Set[str]]] = []
+        self._by_trigram: Dict[str, List[int]] = {}
+        for key, name in self._exact.items():
+            grams = trigrams(key)
+            for gram in grams:
+                self._by_trigram.setdefault(gram, []).append(len(self._keys))
+            self._keys.append((key, name, grams))
+
+    def __len__(self):
+        return len(set(self._exact.values()))
+
+    def fuzzy(self, label: str) -> Optional[Tuple[str, float]]:
+        """
+        Исправление опечаток: кандидаты отбираются по сходству триграмм (|A∩B| / |A∪B| ≥ порога),
+        а принимаются, только если отличаются от метки на несколько правок.
+        'Kubernets' → 'Kubernetes', но 'Spring Boot' не станет 'Spring', а 'Data' — 'Data Lake'.
+        При равных кандидатах на разные категории совпадения нет.
+        """
+        key = fold(label)
+        compact = key.replace("-", "")
+        if len(compact) < FUZZY_MIN_LENGTH:
+            return None
+        grams = trigrams(key)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._by_trigram.get(gram, ()))
+
+        limit = max(1, len(compact) // FUZZY_CHARS_PER_EDIT)
+        best: Dict[int, Set[str]] = {}
+        best_scores: Dict[str, float] = {}
+        for idx, common in shared.items():
+            candidate_key, name, candidate_grams = self._keys[idx]
+            score = common / (len(grams) + len(candidate_grams) - common)
+            if score < self.threshold:
+                continue
+            distance = edit_distance(compact, candidate_key.replace("-", ""), limit)
+            if distance <= limit:
+                best.setdefault(distance, set()).add(name)
+                best_scores[name] = max(score, best_scores.get(name, 0.0))
+        if not best:
+            return None
+        names = best[min(best)]
+        if len(names) > 1:
+            logger.debug(f"Неоднозначная метка '{label}': {sorted(names)}")
+            return None
+        name = next(iter(names))
+        return name, best_scores[name]
+
+    def match(self, label: str) -> Optional[str]:
+        key = fold(label)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._exact[key]
+        found = self.fuzzy(label)
+        return found[0] if found else None
+
+    def normalize(self, labels: Iterable[str]) -> List[str]:
+        """
+        Канонические категории без повторов, в исходном порядке.
+        Неизвестные метки сохраняются как есть и записываются в предложения новых категорий.
+        """
+        result: List[str] = []
+        for label in labels or []:
+            label = (label or "").strip()
+            if not label:
+                continue
+            name = self.match(label)
+            if name is None:
+                self.suggestions[label] += 1
+                logger.info(f"💡 Предложение новой категории: '{label}' (встречалась {self.suggestions[label]} раз)")
+                name = label
+            elif name != label:
+                logger.debug(f"🏷️ Категория '{label}' → '{name}'")
+            if name not in result:
+                result.append(name)
+        return result
+
+
+_index_cache = AsyncTTLCache(ttl=INDEX_TTL_SECONDS)
+
+
+async def _load_normalizer() -> CategoryNormalizer:
+    categories = await fetch_categories(await get_db())
+    normalizer = CategoryNormalizer(categories=categories)
+    logger.info(f"🏷️ Индекс категорий построен: {len(normalizer)} категорий")
+    return normalizer
+
+
+async def get_normalizer() -> CategoryNormalizer:
+    """Общий индекс процесса; перестраивается раз в CATEGORY_INDEX_TTL_SECONDS, чтобы подхватить новые категории."""
+    try:
+        return await _index_cache.get("index", _load_normalizer)
+    except Exception as e:
+        logger.warning(f"Не удалось загрузить категории из базы, нормализуем только по HIERARCHY: {e}")
+        return CategoryNormalizer()
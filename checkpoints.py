@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+
+from loguru import logger
+
+# Промежуточные результаты конвейера храним рядом с временными скриншотами
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", os.path.join("temp_screenshots", "checkpoints"))
+
+# Этапы в порядке выполнения: скрапинг -> обработка картинки -> markdown
+STAGES = ("crawled", "rendered", "converted")
+
+
+class StageCheckpoint:
+    """
+    Чекпоинт обработки одной закладки на локальном диске.
+
+    Хранит артефакты уже пройденных этапов (сырой скриншот, HTML, готовую
+    картинку, markdown) и маркер последнего этапа, чтобы повторная попытка
+    начиналась с упавшего этапа, а не со скрапинга.
+    """
+
+    def __init__(self, bookmark_id: int, base_dir: str = CHECKPOINT_DIR):
+        self.bookmark_id = bookmark_id
+        self.dir = os.path.join(base_dir, str(bookmark_id))
+        os.makedirs(self.dir, exist_ok=True)
+        self.raw_path = os.path.join(self.dir, "raw.png")
+        self.proc_path = os.path.join(self.dir, "screenshot.png")
+        self.html_path = os.path.join(self.dir, "page.html")
+        self.md_path = os.path.join(self.dir, "page.md")
+        self._meta_path = os.path.join(self.dir, "meta.json")
+        self.meta = self._load_meta()
+
+    def _load_meta(self) -> dict:
+        if not os.path.exists(self._meta_path):
+            return {}
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Чекпоинт #{self.bookmark_id} повреждён, начинаем заново: {e}")
+            return {}
+
+    @property
+    def stage(self):
+        return self.meta.get("stage")
+
+    def _artifacts_for(self, stage: str):
+        """Файлы, без которых следующие этапы не пройдут; кортеж — достаточно любого из них."""
+        return {
+            # Сырой скриншот удаляется после обработки — тогда его заменяет готовая картинка
+            "crawled": [self.html_path, (self.raw_path, self.proc_path)],
+            "rendered": [self.html_path, self.proc_path],
+            "converted": [self.proc_path, self.md_path],
+        }[stage]
+
+    def reached(self, stage: str) -> bool:
+        """Этап уже пройден и его артефакты на месте."""
+        if self.stage not in STAGES:
+            return False
+        if STAGES.index(self.stage) < STAGES.index(stage):
+            return False
+        return all(
+            any(os.path.exists(p) for p in item) if isinstance(item, tuple) else os.path.exists(item)
+            for item in self._artifacts_for(stage)
+        )
+
+    def mark(self, stage: str, **meta):
+        """Фиксирует пройденный этап (запись атомарная через временный файл)."""
+        self.meta.update(meta)
+        self.meta["stage"] = stage
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self._meta_path)
+
+    def clear(self):
+        """Удаляет все артефакты чекпоинта."""
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.meta = {}
@@ -0,0 +1,86 @@
+import asyncio
+import os
+
+from loguru import logger
+
+# Прямое подключение к Postgres (не PostgREST) — нужно только для LISTEN
+DATABASE_URL = os.getenv("DATABASE_URL")
+QUEUE_CHANNEL = os.getenv("CONVEYOR_CHANNEL", "bookmarks_queue")
+# Страховочный опрос на случай потерянных уведомлений
+SAFETY_POLL_INTERVAL = float(os.getenv("CONVEYOR_SAFETY_POLL", "300"))
+# Интервал опроса, если LISTEN недоступен (старое поведение)
+FALLBACK_POLL_INTERVAL = 30.0
+RECONNECT_DELAY = 5.0
+
+
+class QueueListener:
+    """
+    Будильник конвейера на Postgres LISTEN/NOTIFY.
+
+    Триггер на bookmarks шлёт NOTIFY при вставке, и ожидающий воркер
+    просыпается сразу. Опрос остаётся только как редкая страховка.
+    """
+
+    def __init__(self, dsn: str = DATABASE_URL, channel: str = QUEUE_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.connected = False
+        self._event = asyncio.Event()
+        self._task = None
+
+    @property
+    def poll_interval(self) -> float:
+        return SAFETY_POLL_INTERVAL if self.connected else FALLBACK_POLL_INTERVAL
+
+    async def start(self):
+        if not self.dsn:
+            logger.warning("DATABASE_URL не задан: LISTEN/NOTIFY отключён, конвейер работает опросом.")
+            return
+        self._task = asyncio.create_task(self._listen_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+
+    async def _listen_loop(self):
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.channel}")
+                    self.connected = True
+                    logger.info(f"👂 Подписка на канал '{self.channel}' активна.")
+                    # Пока были отключены, могли пропустить уведомления — перепроверим очередь
+                    self._event.set()
+                    async for _ in conn.notifies():
+                        self._event.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.connected = False
+                logger.warning(f"LISTEN отвалился ({e}), переподключение через {RECONNECT_DELAY} сек...")
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def wake(self):
+        """Будит ожидающий воркер вручную (например, при остановке)."""
+        self._event.set()
+
+    def clear(self):
+        """Сбрасывает флаг перед чтением очереди, чтобы не потерять уведомление во время запроса."""
+        self._event.clear()
+
+    async def wait(self, timeout: float = None) -> bool:
+        """Ждёт уведомление не дольше timeout секунд. True — пришло уведомление."""
+        timeout = self.poll_interval if timeout is None else min(timeout, self.poll_interval)
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
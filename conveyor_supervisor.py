@@ -0,0 +1,179 @@
+import asyncio
+import math
+import os
+import signal
+import sys
+import time
+
+from loguru import logger
+
+from category_counts import check_drift
+from db import get_db
+
+# --- Настройка ---
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conveyor_worker.py")
+MIN_WORKERS = int(os.getenv("CONVEYOR_MIN_WORKERS", "1"))
+MAX_WORKERS = int(os.getenv("CONVEYOR_MAX_WORKERS", str(os.cpu_count() or 2)))
+# Сколько закладок в очереди «приходится» на одного воркера при масштабировании
+BACKLOG_PER_WORKER = int(os.getenv("CONVEYOR_BACKLOG_PER_WORKER", "50"))
+SCALE_INTERVAL = float(os.getenv("CONVEYOR_SCALE_INTERVAL", "30"))
+# Сколько ждать, пока воркеры доделают текущие закладки при остановке
+DRAIN_TIMEOUT = float(os.getenv("CONVEYOR_DRAIN_TIMEOUT", "180"))
+RESTART_BACKOFF_MAX = 60.0
+# Как часто сверять инкрементальные счётчики категорий с полным пересчётом (0 — не сверять)
+CATEGORY_DRIFT_INTERVAL = float(os.getenv("CATEGORY_DRIFT_INTERVAL_HOURS", "6")) * 3600
+
+
+def desired_worker_count(backlog: int, min_workers: int = MIN_WORKERS, max_workers: int = MAX_WORKERS,
+                         per_worker: int = BACKLOG_PER_WORKER) -> int:
+    """Сколько воркеров нужно под текущую очередь (в пределах [min, max])."""
+    wanted = math.ceil(backlog / per_worker) if backlog > 0 else 0
+    return max(min_workers, min(max_workers, wanted))
+
+
+async def count_backlog() -> int:
+    """Размер очереди конвейера (по частичному индексу bookmarks_conveyor_queue_idx)."""
+    db = await get_db()
+    res = await db.table("bookmarks") \
+        .select("id", count="exact", head=True) \
+        .eq("categories", "[]") \
+        .eq("dead_letter", False) \
+        .execute()
+    return res.count or 0
+
+
+class ConveyorSupervisor:
+    """
+    Запускает N процессов conveyor_worker.py, перезапускает упавшие
+    и подстраивает N под размер очереди. По SIGTERM передаёт сигнал
+    воркерам и ждёт, пока они доделают текущие закладки.
+    """
+
+    def __init__(self):
+        self.workers = {}       # slot -> asyncio.subprocess.Process
+        self.retiring = set()   # слоты, которые гасим при уменьшении N
+        self.restarts = {}      # slot -> число перезапусков подряд
+        self.stopping = asyncio.Event()
+        self._next_slot = 0
+        # Ссылки на задачи-наблюдатели: иначе сборщик мусора может снять их посреди ожидания
+        self._watchers = set()
+
+    async def spawn(self, slot: int = None):
+        if slot is None:
+            slot = self._next_slot
+            self._next_slot += 1
+        env = dict(os.environ, CONVEYOR_WORKER_ID=f"w{slot}")
+        proc = await asyncio.create_subprocess_exec(sys.executable, WORKER_SCRIPT, env=env)
+        self.workers[slot] = proc
+        logger.info(f"▶️ Воркер w{slot} запущен (pid {proc.pid}).")
+        task = asyncio.create_task(self._watch(slot, proc))
+        self._watchers.add(task)
+        task.add_done_callback(self._watchers.discard)
+
+    async def _watch(self, slot: int, proc):
+        started = time.monotonic()
+        code = await proc.wait()
+        if self.workers.get(slot) is proc:
+            del self.workers[slot]
+
+        if self.stopping.is_set() or slot in self.retiring:
+            self.retiring.discard(slot)
+            self.restarts.pop(slot, None)
+            logger.info(f"⏹ Воркер w{slot} завершился (код {code}).")
+            return
+
+        # Долго проработавший воркер начинает отсчёт перезапусков заново
+        if time.monotonic() - started > RESTART_BACKOFF_MAX:
+            self.restarts[slot] = 0
+        attempt = self.restarts.get(slot, 0) + 1
+        self.restarts[slot] = attempt
+        delay = min(RESTART_BACKOFF_MAX, 2 ** (attempt - 1))
+        logger.error(f"💥 Воркер w{slot} упал (код {code}). Перезапуск через {delay:.0f} сек (попытка {attempt}).")
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=delay)
+            return
+        except asyncio.TimeoutError:
+            pass
+        await self.spawn(slot)
+
+    def _active_slots(self):
+        return sorted(s for s in self.workers if s not in self.retiring)
+
+    async def scale_to(self, target: int):
+        active = self._active_slots()
+        if len(active) < target:
+            for _ in range(target - len(active)):
+                await self.spawn()
+        elif len(active) > target:
+            # Гасим самые новые слоты, старые продолжают работу
+            for slot in active[target:]:
+                self.retiring.add(slot)
+                logger.info(f"🔽 Уменьшаем флот: мягко останавливаем w{slot}.")
+                self.workers[slot].send_signal(signal.SIGTERM)
+
+    async def _scale_loop(self):
+        while not self.stopping.is_set():
+            try:
+                backlog = await count_backlog()
+                target = desired_worker_count(backlog)
+                if target != len(self._active_slots()):
+                    logger.info(f"📊 Очередь: {backlog}, воркеров: {len(self._active_slots())} -> {target}.")
+                await self.scale_to(target)
+            except Exception as e:
+                logger.error(f"Не удалось оценить очередь: {e}")
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=SCALE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _drift_loop(self):
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=CATEGORY_DRIFT_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await check_drift(repair=True)
+            except Exception as e:
+                logger.error(f"Не удалось сверить счётчики категорий: {e}")
+
+    async def drain(self):
+        """Плавная остановка: SIGTERM всем воркерам и ожидание до DRAIN_TIMEOUT."""
+        procs = list(self.workers.values())
+        if not procs:
+            return
+        logger.warning(f"🛑 Остановка флота: ждём завершения {len(procs)} воркеров (до {DRAIN_TIMEOUT:.0f} сек)...")
+        for proc in procs:
+            if proc.returncode is None:
+                proc.send_signal(signal.SIGTERM)
+        _, pending = await asyncio.wait([asyncio.create_task(p.wait()) for p in procs], timeout=DRAIN_TIMEOUT)
+        if pending:
+            logger.error(f"⏱ {len(pending)} воркеров не успели завершиться — принудительная остановка.")
+            for proc in procs:
+                if proc.returncode is None:
+                    proc.kill()
+            await asyncio.gather(*(p.wait() for p in procs))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stopping.set)
+        # Без учётных данных Supabase падаем сразу, а не в цикле масштабирования
+        await get_db()
+
+        logger.info(f"🚦 Супервизор конвейера запущен: от {MIN_WORKERS} до {MAX_WORKERS} воркеров.")
+        await self.scale_to(MIN_WORKERS)
+        scaler = asyncio.create_task(self._scale_loop())
+        drift_checker = asyncio.create_task(self._drift_loop()) if CATEGORY_DRIFT_INTERVAL > 0 else None
+
+        await self.stopping.wait()
+        scaler.cancel()
+        if drift_checker:
+            drift_checker.cancel()
+        await self.drain()
+        logger.success("Супервизор остановлен, все воркеры завершены.")
+
+
+if __name__ == "__main__":
+    asyncio.run(ConveyorSupervisor().run())
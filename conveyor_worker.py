@@ -1,65 +1,123 @@
 import asyncio
+import os
+import signal
 import time
 import sys
+from datetime import datetime, timezone
 from loguru import logger
-from backend_logic import process_bookmark_full_cycle, supabase
+from backend_logic import process_bookmark_full_cycle
+from db import get_db
+from conveyor_events import QueueListener
+from write_buffer import BookmarkWriteBuffer
+
+# Идентификатор воркера (выдаёт супервизор) и аренда взятой закладки
+WORKER_ID = os.getenv("CONVEYOR_WORKER_ID", str(os.getpid()))
+CLAIM_LEASE_SECONDS = int(os.getenv("CONVEYOR_CLAIM_LEASE", "900"))
+
+# Флаг плавной остановки: текущую закладку доделываем, новых не берём
+stop_event = asyncio.Event()
+
+def request_stop():
+    if not stop_event.is_set():
+        logger.warning(f"🛑 [{WORKER_ID}] Сигнал остановки: доделываем текущую закладку и выходим.")
+    stop_event.set()
+
+async def sleep_or_stop(seconds: float):
+    """Пауза, которую прерывает сигнал остановки."""
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+async def claim_next_bookmark():
+    """
+    Атомарно берёт одну закладку из очереди (FOR UPDATE SKIP LOCKED в RPC).
+    Взятой закладке ставится leased_until = now() + аренда, поэтому
+    соседние воркеры её не видят, а после падения воркера она вернётся в очередь.
+    Результат попытки снимает аренду (leased_until = null).
+    """
+    db = await get_db()
+    res = await db.rpc("claim_bookmarks", {"p_limit": 1, "p_lease_seconds": CLAIM_LEASE_SECONDS}).execute()
+    return res.data[0] if res.data else None
+
+async def seconds_until_next_retry(now: datetime):
+    """
+    Сколько ждать до ближайшей отложенной попытки (None — отложенных нет).
+    Арендованные закладки сюда не попадают: аренда живёт в leased_until.
+    """
+    db = await get_db()
+    res = await db.table("bookmarks") \
+        .select("next_attempt_at") \
+        .eq("categories", "[]") \
+        .eq("dead_letter", False) \
+        .gt("next_attempt_at", now.strftime("%Y-%m-%dT%H:%M:%SZ")) \
+        .order("next_attempt_at", desc=False) \
+        .limit(1) \
+        .execute()
+    if not res.data:
+        return None
+    next_at = datetime.fromisoformat(res.data[0]["next_attempt_at"])
+    return max(1.0, (next_at - now).total_seconds())
 
 async def run_conveyor():
     """Воркер для точечной обработки закладок с categories=[]."""
     logger.info("🚀 Хирургический конвейер V2 запущен.")
-    logger.info("🎯 Цель: ВСЕ закладки с categories=[], игнорируя старые ошибки.")
-    
-    # Память воркера, чтобы не крутить одну и ту же ошибку по кругу в рамках одного запуска
-    attempted_ids = set()
+    logger.info("🎯 Цель: закладки с categories=[], у которых подошло время попытки (dead-letter пропускаем).")
 
-    while True:
+    # Плавная остановка по SIGTERM/SIGINT (деплой, супервизор)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, request_stop)
+
+    # Просыпаемся по NOTIFY о новых закладках, опрос — только страховка
+    listener = QueueListener()
+    await listener.start()
+    stop_event_waiter = asyncio.create_task(stop_event.wait())
+    stop_event_waiter.add_done_callback(lambda _: listener.wake())
+
+    # Результаты пишем пачками; буфер сбрасывается и при остановке
+    writer = BookmarkWriteBuffer(await get_db())
+    await writer.start()
+
+    while not stop_event.is_set():
         try:
-            # 1. Запрашиваем только те, где категории пустые []
-            query = supabase.table("bookmarks") \
-                .select("id, url") \
-                .eq("categories", "[]") \
-                .order("id", desc=False)
-            
-            # Если у нас уже есть список 'отказников', исключаем их из текущего запроса,
-            # чтобы найти следующую годную закладку.
-            if attempted_ids:
-                query = query.not_.in_("id", list(attempted_ids))
-                
-            response = query.limit(1).execute()
-            bookmarks = response.data
-
-            if not bookmarks:
-                if attempted_ids:
-                    logger.info(f"🏁 Все доступные цели ({len(attempted_ids)}) были опробованы. Новых нет.")
-                else:
-                    logger.info("😴 Очередь пуста. Жду 30 секунд...")
-                await asyncio.sleep(30)
-                # Очищаем память раз в цикл сна, чтобы дать шанс на переповтор через время
-                attempted_ids.clear()
+            listener.clear()
+            # 1. Берём закладку с пустыми категориями, у которой подошло время попытки
+            now_dt = datetime.now(timezone.utc)
+            bookmark = await claim_next_bookmark()
+
+            if not bookmark:
+                timeout = listener.poll_interval
+                retry_in = await seconds_until_next_retry(now_dt)
+                if retry_in is not None:
+                    timeout = min(timeout, retry_in)
+                logger.info(f"😴 Очередь пуста. Жду уведомления (не дольше {timeout:.0f} сек)...")
+                await listener.wait(timeout)
                 continue
 
-            bookmark = bookmarks[0]
             b_id = bookmark["id"]
             url = bookmark["url"]
 
-            # Запоминаем, что мы взялись за этот ID
-            attempted_ids.add(b_id)
-
-            # 2. Запускаем цикл обработки
+            # 2. Запускаем цикл обработки. При ошибке цикл сам запишет attempts/next_attempt_at,
+            # так что эта закладка не вернётся в выборку раньше срока.
             try:
-                # Теперь с 'llama-3.1-8b-instant' и обрезкой текста всё должно летать
-                await process_bookmark_full_cycle(b_id, url)
+                await process_bookmark_full_cycle(b_id, url, attempts=bookmark.get("attempts") or 0, writer=writer)
             except Exception as e:
                 logger.error(f"❌ Ошибка на #{b_id}: {e}")
 
             # 3. ПАУЗА (Groq RPM safety)
             wait_time = 3.0
             logger.info(f"⏳ Пауза {wait_time} сек...")
-            await asyncio.sleep(wait_time)
+            await sleep_or_stop(wait_time)
 
         except Exception as main_e:
             logger.critical(f"🚨 КРИТИЧЕСКАЯ ОШИБКА: {main_e}")
-            await asyncio.sleep(10)
+            await sleep_or_stop(10)
+
+    stop_event_waiter.cancel()
+    await writer.close()
+    await listener.stop()
+    logger.warning(f"🛑 [{WORKER_ID}] Конвейер остановлен, незавершённых закладок нет.")
 
 if __name__ == "__main__":
     try:
@@ -1,41 +1,46 @@
 import os
 import uuid
+import asyncio
 from collections import defaultdict
 
 from dotenv import load_dotenv
-from supabase import create_client, Client
 from loguru import logger
 
+import cas
+from storage_backends import get_storage
+from storage_ops import artifact_upload
+
 NEW_PROCESSED_BOOKMARKS_DIR = "photo"
 
 # Выгружаем переменные окружения
 load_dotenv()
 
-# Подключение к Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 PROXY_URL = os.getenv("PROXY_URL")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Supabase credentials not found in .env file")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+GALLERY_BUCKET = "photogallery"
 
 # Constants
 TARGET_WIDTH = 1280
 TARGET_HEIGHT = 720
 TEMP_DIR = "temp_screenshots"
 
-def upload_to_supabase(file_path: str, storage_path: str):
-    """Uploads file to Supabase Storage."""
+async def upload_to_supabase(file_path: str) -> str:
+    """
+    Uploads file to storage (STORAGE_BACKEND). With STORAGE_CAS=1 it is stored under its
+    content hash and files already stored are skipped; otherwise under a new image/<uuid>.jpg.
+    """
     with open(file_path, "rb") as f:
-        supabase.storage.from_("photogallery").upload(
-            path=storage_path,
-            file=f,
-            file_options={"content-type": "image/jpg", "upsert": "true"}
-        )
+        data = f.read()
+    if cas.CAS_ENABLED:
+        storage_path, _, uploaded = await cas.put_blob(data, "image/jpg", bucket=GALLERY_BUCKET)
+        if not uploaded:
+            logger.debug(f"{file_path} already stored as {storage_path}")
+        return storage_path
+    storage_path = f"image/{uuid.uuid4().hex}.jpg"
+    body, options = artifact_upload(data, "image/jpg")
+    await get_storage(GALLERY_BUCKET).upload(storage_path, body, options)
+    return storage_path
 
-def count_file_types():
+async def count_file_types():
     file_type_counts = defaultdict(int)
     total_files = 0
 
@@ -50,11 +55,9 @@ def count_file_types():
             if ext: # Only count if there is an extension
                 file_type_counts[ext] += 1
                 if ext == ".jpg":
-                    unique_id = uuid.uuid4().hex
                     file_path = os.path.join(root, file)
-                    storage_path = f"image/{unique_id}.jpg"
-                    # print(file_path, storage_path)
-                    upload_to_supabase(file_path, storage_path)
+                    storage_path = await upload_to_supabase(file_path)
+                    logger.info(f"{file_path} -> {GALLERY_BUCKET}/{storage_path}")
             else:
                 file_type_counts["no_extension"] += 1 # Files without an extension
             total_files += 1
@@ -62,7 +65,7 @@ def count_file_types():
     return file_type_counts, total_files
 
 if __name__ == "__main__":
-    counts, total = count_file_types()
+    counts, total = asyncio.run(count_file_types())
     print(f"Analysis of file types in '{NEW_PROCESSED_BOOKMARKS_DIR}':")
     for ext, count in sorted(counts.items()):
         print(f"  {ext}: {count}")
@@ -34,39 +34,149 @@ export type Database = {
   }
   public: {
     Tables: {
+      asset_blobs: {
+        Row: {
+          bucket: string
+          content_type: string | null
+          created_at: string
+          hash: string
+          path: string
+          size: number | null
+        }
+        Insert: {
+          bucket?: string
+          content_type?: string | null
+          created_at?: string
+          hash: string
+          path: string
+          size?: number | null
+        }
+        Update: {
+          bucket?: string
+          content_type?: string | null
+          created_at?: string
+          hash?: string
+          path?: string
+          size?: number | null
+        }
+        Relationships: []
+      }
+      asset_refs: {
+        Row: {
+          bookmark_id: number
+          hash: string
+          kind: string
+          path: string
+          updated_at: string
+        }
+        Insert: {
+          bookmark_id: number
+          hash: string
+          kind: string
+          path: string
+          updated_at?: string
+        }
+        Update: {
+          bookmark_id?: number
+          hash?: string
+          kind?: string
+          path?: string
+          updated_at?: string
+        }
+        Relationships: [
+          {
+            foreignKeyName: "asset_refs_bookmark_id_fkey"
+            columns: ["bookmark_id"]
+            isOneToOne: false
+            referencedRelation: "bookmarks"
+            referencedColumns: ["id"]
+          },
+        ]
+      }
+      bookmark_categories: {
+        Row: {
+          bookmark_id: number
+          category_id: number
+        }
+        Insert: {
+          bookmark_id: number
+          category_id: number
+        }
+        Update: {
+          bookmark_id?: number
+          category_id?: number
+        }
+        Relationships: [
+          {
+            foreignKeyName: "bookmark_categories_bookmark_id_fkey"
+            columns: ["bookmark_id"]
+            isOneToOne: false
+            referencedRelation: "bookmarks"
+            referencedColumns: ["id"]
+          },
+          {
+            foreignKeyName: "bookmark_categories_category_id_fkey"
+            columns: ["category_id"]
+            isOneToOne: false
+            referencedRelation: "categories"
+            referencedColumns: ["id"]
+          },
+        ]
+      }
       bookmarks: {
         Row: {
+          attempts: number
           categories: Json | null
           date_add: number | null
+          dead_letter: boolean
           id: number
           inserted_at: string
           is_processed: boolean | null
+          last_error: string | null
+          leased_until: string | null
+          next_attempt_at: string | null
           processing_error: string | null
+          processing_stage: string | null
           summary: string | null
           title: string
           url: string
+          url_normalized: string | null
         }
         Insert: {
+          attempts?: number
           categories?: Json | null
           date_add?: number | null
+          dead_letter?: boolean
           id?: number
           inserted_at?: string
           is_processed?: boolean | null
+          last_error?: string | null
+          leased_until?: string | null
+          next_attempt_at?: string | null
           processing_error?: string | null
+          processing_stage?: string | null
           summary?: string | null
           title: string
           url: string
+          url_normalized?: string | null
         }
         Update: {
+          attempts?: number
           categories?: Json | null
           date_add?: number | null
+          dead_letter?: boolean
           id?: number
           inserted_at?: string
           is_processed?: boolean | null
+          last_error?: string | null
+          leased_until?: string | null
+          next_attempt_at?: string | null
           processing_error?: string | null
+          processing_stage?: string | null
           summary?: string | null
           title?: string
           url?: string
+          url_normalized?: string | null
         }
         Relationships: []
       }
@@ -0,0 +1,52 @@
+import asyncio
+import os
+from typing import Optional, TYPE_CHECKING
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+# --- Асинхронный доступ к Supabase (PostgREST + Storage) ---
+load_dotenv()
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+_client: Optional["AsyncClient"] = None
+_client_lock = asyncio.Lock()
+
+
+async def get_db() -> "AsyncClient":
+    """
+    Общий асинхронный клиент Supabase на процесс.
+
+    Клиент создаётся один раз, и его HTTP-сессии PostgREST и Storage
+    (keep-alive пул httpx) переиспользуются всеми запросами, поэтому
+    медленный ответ базы или загрузка файла не блокируют event loop.
+    """
+    from supabase import acreate_client
+
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                if not SUPABASE_URL or not SUPABASE_KEY:
+                    raise ValueError("Учетные данные Supabase не найдены в файле .env")
+                _client = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+    return _client
+
+
+def use_service_role():
+    """
+    Скриптам обслуживания — сервисный ключ, если он задан (SUPABASE_SERVICE_ROLE_KEY):
+    перезапись объектов Storage не упирается в RLS. Вызывать до первого get_db().
+    """
+    global SUPABASE_KEY
+    if _client is not None:
+        raise RuntimeError("Клиент Supabase уже создан с обычным ключом")
+    SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or SUPABASE_KEY
+
+
+def public_url(path: str, bucket: str = "screenshots") -> str:
+    """Публичный URL объекта Storage (считается локально, без запроса к API)."""
+    return f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/public/{bucket}/{path}"
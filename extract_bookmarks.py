@@ -1,57 +1,54 @@
+import glob
 import json
 import os
-from bs4 import BeautifulSoup
+import sys
 
-TARGET_FOLDERS = ["Услуги", "Разработка", "Полезное"]
-INPUT_FILE = "bookmarks/bookmarks_10.02.2026.html"
+from bookmarks_parser import folders_from_env, parse_chrome_bookmarks
+from import_watermarks import DEFAULT_SOURCE, ImportWatermarks, file_digest
+
+# Использование: python extract_bookmarks.py [файл.html] [--source=chrome] [--force]
+# Без файла берётся самый свежий экспорт bookmarks/bookmarks_*.html.
+# Повторный запуск на том же файле ничего не делает, на новом — извлекает только ссылки
+# новее прошлого импорта этого источника; --force — полный проход по файлу.
+TARGET_FOLDERS = folders_from_env(["Услуги", "Разработка", "Полезное"])
+EXPORTS_GLOB = "bookmarks/bookmarks_*.html"
 OUTPUT_FILE = "bookmarks/temp_extracted_links.json"
 
-def extract_links():
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: {INPUT_FILE} not found.")
+def latest_export():
+    exports = glob.glob(EXPORTS_GLOB)
+    return max(exports, key=os.path.getmtime) if exports else None
+
+def parse_args(argv):
+    files = [arg for arg in argv if not arg.startswith("--")]
+    source = next((arg.split("=", 1)[1] for arg in argv if arg.startswith("--source=")), DEFAULT_SOURCE)
+    return (files[0] if files else latest_export()), source, "--force" in argv
+
+def extract_links(argv=None):
+    input_file, source, force = parse_args(sys.argv[1:] if argv is None else argv)
+    if not input_file or not os.path.exists(input_file):
+        print(f"Error: {input_file or EXPORTS_GLOB} not found.")
         return
 
-    with open(INPUT_FILE, 'r', encoding='utf-8', errors='ignore') as f:
-        soup = BeautifulSoup(f, 'html.parser')
-
-    extracted_data = {}
-    all_folders = soup.find_all('h3')
-    
-    for h3 in all_folders:
-        folder_name = h3.get_text().strip()
-        if folder_name in TARGET_FOLDERS:
-            print(f"Reading folder: {folder_name}")
-            parent_dl = h3.find_next('dl')
-            if parent_dl:
-                links = parent_dl.find_all('a')
-                count = 0
-                for a in links:
-                    url = a.get('href')
-                    if not url or url.startswith('chrome://') or url.startswith('about:'):
-                        continue
-                    
-                    title = a.get_text().strip()
-                    try:
-                        add_date = int(a.get('add_date', 0))
-                    except:
-                        add_date = 0
-                    
-                    if url in extracted_data:
-                        if add_date > extracted_data[url]['add_date']:
-                            extracted_data[url] = {"title": title, "add_date": add_date}
-                    else:
-                        extracted_data[url] = {"title": title, "add_date": add_date}
-                    count += 1
-                print(f"Found links: {count}")
-
-    final_list = [{"url": url, "title": info["title"], "add_date": info["add_date"]} for url, info in extracted_data.items()]
+    watermarks = ImportWatermarks()
+    print(f"Reading {input_file} (source: {source}), folders: {', '.join(TARGET_FOLDERS)}")
+    with open(input_file, 'rb') as f:
+        digest = file_digest(f)
+        if not force and watermarks.is_unchanged(source, digest, TARGET_FOLDERS):
+            print("File unchanged since last import, nothing to extract. Use --force to rescan.")
+            return
+        links = parse_chrome_bookmarks(f, TARGET_FOLDERS)
+
+    new_links = watermarks.filter_new(source, links, TARGET_FOLDERS, force=force)
+    final_list = [{"url": link["url"], "title": link["title"], "add_date": link["add_date"]} for link in new_links]
 
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
         json.dump(final_list, f, ensure_ascii=False, indent=2)
+    # Знак только откладывается: его двинет bulk_import_bookmarks.py после успешной записи в базу
+    watermarks.stage(source, digest, links, TARGET_FOLDERS)
 
     print("\nExtraction complete!")
-    print(f"Total unique links: {len(final_list)}")
+    print(f"Links in target folders: {len(links)}, new since last import: {len(final_list)}")
     print(f"Saved to: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    extract_links()
\ No newline at end of file
+    extract_links()
@@ -1,14 +1,20 @@
 import json
 import os
+import sys
 from supabase import create_client
 from dotenv import load_dotenv
 
+from url_canon import normalize_url
+from url_bloom import load_or_create, sync_from_rows
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 EXTRACTED_FILE = "bookmarks/temp_extracted_links.json"
 NEW_LINKS_FILE = "bookmarks/new_links_to_import.json"
+LOOKUP_BATCH_SIZE = 100 # URL-ы уходят в query string, поэтому пачки небольшие
+SYNC_PAGE_SIZE = 1000
 
 def filter_links():
     if not os.path.exists(EXTRACTED_FILE):
@@ -21,25 +27,36 @@ def filter_links():
     print(f"Loaded {len(extracted_links)} links.")
 
     supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    existing_urls = set()
-    offset = 0
-    limit = 1000
-    
+
+    # Проверяем только ссылки из файла, по уникальному индексу url_normalized
+    by_key = {}
+    for item in extracted_links:
+        key = normalize_url(item['url'])
+        if key and key not in by_key:
+            by_key[key] = item
+
+    # Фильтр Блума догоняем по закладкам, добавленным после прошлого запуска.
+    # «Точно нет» — новая ссылка без запроса к базе; «возможно» — проверка по url_normalized
+    bloom = load_or_create(rebuild="--rebuild-bloom" in sys.argv)
     while True:
-        res = supabase.table("bookmarks").select("url").range(offset, offset + limit - 1).execute()
-        if not res.data: break
-        for row in res.data:
-            existing_urls.add(row['url'].rstrip('/'))
-        if len(res.data) < limit: break
-        offset += limit
+        res = supabase.table("bookmarks").select("id, url_normalized, url") \
+            .gt("id", bloom.max_id).order("id").limit(SYNC_PAGE_SIZE).execute()
+        sync_from_rows(bloom, res.data or [])
+        if len(res.data or []) < SYNC_PAGE_SIZE: break
 
-    print(f"Found {len(existing_urls)} URLs in DB.")
+    keys = [key for key in by_key if bloom.contains_key(key)]
+    print(f"Bloom filter: {len(by_key) - len(keys)} definitely new, {len(keys)} to check in DB")
 
-    new_links = []
-    for item in extracted_links:
-        url = item['url'].rstrip('/')
-        if url not in existing_urls:
-            new_links.append(item)
+    existing_keys = set()
+    for i in range(0, len(keys), LOOKUP_BATCH_SIZE):
+        res = supabase.table("bookmarks").select("url_normalized") \
+            .in_("url_normalized", keys[i:i + LOOKUP_BATCH_SIZE]).execute()
+        existing_keys.update(row['url_normalized'] for row in res.data or [])
+    bloom.save()
+
+    print(f"Already in DB: {len(existing_keys)}")
+
+    new_links = [item for key, item in by_key.items() if key not in existing_keys]
 
     with open(NEW_LINKS_FILE, 'w', encoding='utf-8') as f:
         json.dump(new_links, f, ensure_ascii=False, indent=2)
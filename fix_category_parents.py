@@ -5,6 +5,8 @@ from supabase import create_client, AsyncClient
 from loguru import logger
 from slugify import slugify
 
+from category_counts import recount_all
+
 # --- Настройка ---
 load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -55,7 +57,7 @@ async def fix_missing_parents():
             "name": name,
             "slug": generate_slug(name),
             "parent_category": None,  # Они становятся категориями верхнего уровня
-            "bookmarks_count": 0      # Временно ставим 0, обновим позже
+            "bookmarks_count": 0      # Временно ставим 0, пересчитаем ниже
         })
 
     try:
@@ -68,21 +70,12 @@ async def fix_missing_parents():
         logger.error(f"Не удалось вставить отсутствующих родителей: {e}")
         return  # Останавливаемся, если не можем их вставить
 
-    # 5. Обновляем счетчики для вновь созданных родителей
-    logger.info("Обновление счетчиков закладок для новых родительских категорий...")
-    for parent_name in missing_parent_names:
-        # Суммируем счетчики всех дочерних элементов этого родителя
-        children_sum = sum(
-            cat.get('bookmarks_count', 0) or 0
-            for cat in all_categories
-            if cat.get('parent_category') == parent_name
-        )
-
-        logger.info(f"Обновление счетчика для '{parent_name}' на {children_sum}...")
-        try:
-            supabase.table("categories").update({"bookmarks_count": children_sum}).eq("name", parent_name).execute()
-        except Exception as e:
-            logger.error(f"Не удалось обновить счетчик для '{parent_name}': {e}")
+    # 5. Пересчитываем счетчики одним проходом (родитель учитывает каждую закладку один раз)
+    logger.info("Пересчет счетчиков закладок с учетом новых родительских категорий...")
+    try:
+        await recount_all()
+    except Exception as e:
+        logger.error(f"Не удалось пересчитать счетчики: {e}")
 
     logger.success("Скрипт завершил работу.")
 
@@ -20,7 +20,7 @@ export const useBookmarks = () => {
     // Query 2: Get paginated data
     const { data, error } = await client
       .from('bookmarks')
-      .select('*')
+      .select('*, asset_refs(kind, path)')
       .eq('is_processed', true) // Filter for processed bookmarks
       .order('date_add', { ascending: false })
       .range((page - 1) * PAGE_SIZE, page * PAGE_SIZE - 1)
@@ -34,47 +34,20 @@ export const useBookmarks = () => {
   }
 
   const getBookmarksByCategory = async (slug: string, page = 1) => {
-    // First, get the category name from the slug
-    const { data: categoryData, error: categoryError } = await client
-      .from('categories')
-      .select('name')
-      .eq('slug', slug)
-      .single()
-
-    if (categoryError || !categoryData) {
-      console.error('Error fetching category:', categoryError)
-      return { data: [], count: 0 }
-    }
-
-    const categoryName = [categoryData.name]
-
-    // Query 1: Get total count for category
-    const { count: totalCount, error: countError } = await client
-      .from('bookmarks')
-      .select('*', { count: 'exact', head: true })
-      .eq('is_processed', true)
-      .contains('categories', `"${categoryName}"`)
-
-    if (countError) {
-      console.error('Error fetching total bookmark count by category:', countError)
-      return { data: [], count: 0 }
-    }
-
-    // Then, get the bookmarks that contain this category
-    const { data, error } = await client
-      .from('bookmarks')
-      .select('*')
-      .eq('is_processed', true)
-      .contains('categories', `"${categoryName}"`)
-      .order('date_add', { ascending: false })
-      .range((page - 1) * PAGE_SIZE, page * PAGE_SIZE - 1)
-
-    if (error) {
+    // Один вызов FastAPI: категория, страница закладок и общее число (slug и счётчик кэшируются на бэкенде)
+    try {
+      const response = await fetch(
+        `http://127.0.0.1:8000/api/categories/${encodeURIComponent(slug)}/bookmarks?page=${page}&page_size=${PAGE_SIZE}`
+      )
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`)
+      }
+      const { category, items, count } = await response.json()
+      return { data: items, count: count ?? 0, category }
+    } catch (error) {
       console.error('Error fetching bookmarks by category:', error)
-      return { data: [], count: 0 }
+      return { data: [], count: 0, category: null }
     }
-
-    return { data, count: totalCount ?? 0 }
   }
 
   return {
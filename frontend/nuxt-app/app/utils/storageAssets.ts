@@ -0,0 +1,20 @@
+// Ссылки на ассеты закладок в Storage (скриншоты и другие файлы по публичному URL).
+// Базовый URL берётся из runtimeConfig (nuxt.config.ts) и следует STORAGE_BACKEND.
+// HTML и markdown хранятся сжатыми gzip без Content-Encoding — их текст читается через API
+// (GET /api/bookmarks/{id}/html|markdown), а не по этим ссылкам
+export const storageAssetUrl = (path: string): string =>
+  `${useRuntimeConfig().public.storagePublicUrl}/${path}`
+
+type AssetRef = { kind: string; path: string }
+
+// При контентно-адресуемом хранении (STORAGE_CAS) путь ассета берётся из asset_refs,
+// иначе — классическая раскладка по id закладки
+export const bookmarkAssetPath = (
+  bookmark: { id: number; asset_refs?: AssetRef[] | null },
+  kind: 'image' | 'html' | 'markdown'
+): string => {
+  const ref = bookmark.asset_refs?.find(r => r.kind === kind)
+  if (ref) return ref.path
+  const fallback = { image: `image/${bookmark.id}.png`, html: `html/${bookmark.id}.html`, markdown: `markdown/${bookmark.id}.md` }
+  return fallback[kind]
+}
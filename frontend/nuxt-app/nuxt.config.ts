@@ -17,6 +17,16 @@ export default defineNuxtConfig({
       exclude: ['/'],
     }
   },
+  runtimeConfig: {
+    public: {
+      // Откуда браузер берёт ассеты бакета screenshots: Supabase Storage или каталог,
+      // который раздаёт FastAPI на /storage при STORAGE_BACKEND=local.
+      // Переопределяется при запуске через NUXT_PUBLIC_STORAGE_PUBLIC_URL
+      storagePublicUrl: process.env.STORAGE_BACKEND === 'local'
+        ? `${process.env.STORAGE_LOCAL_PUBLIC_URL || 'http://127.0.0.1:8000/storage'}/screenshots`
+        : `${process.env.SUPABASE_URL || 'http://127.0.0.1:54321'}/storage/v1/object/public/screenshots`,
+    },
+  },
   compatibilityDate: '2025-07-15',
   devtools: { enabled: true }
 })
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import time
+from typing import IO, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+# Водяные знаки импорта закладок: для каждого источника (профиль браузера) и набора папок
+# помним дайджест последнего импортированного файла и максимальный add_date обработанных ссылок.
+WATERMARKS_PATH = os.getenv("IMPORT_WATERMARKS_PATH", os.path.join("bookmarks", "import_watermarks.json"))
+DEFAULT_SOURCE = "chrome"
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(source: IO) -> str:
+    """sha256 открытого бинарного файла; позиция чтения возвращается в начало."""
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(DIGEST_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+class ImportWatermarks:
+    """
+    Состояние инкрементального импорта в JSON-файле.
+
+    Знак ведётся отдельно для каждой пары (источник, набор целевых папок): API и CLI
+    с разными папками не затирают друг друга, а новый набор папок начинает с полного прохода.
+    Неизменившийся файл пропускается целиком, из изменившегося берутся только ссылки
+    новее водяного знака. force=True — полный повторный проход.
+
+    advance() двигает знак сразу (когда запись в базу уже прошла), stage() откладывает
+    его до commit_pending() — для CLI, где запись делает отдельный скрипт.
+    """
+
+    def __init__(self, path: str = WATERMARKS_PATH):
+        self.path = path
+        self.marks: Dict[str, dict] = {}
+        self.pending: Dict[str, dict] = {}
+        self._load()
+
+    @staticmethod
+    def key(source: str, folders: Iterable[str]) -> str:
+        return json.dumps([source, *sorted(folders)], ensure_ascii=False)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Файл водяных знаков {self.path} повреждён, импорт будет полным: {e}")
+            return
+        self.marks = data.get("marks", {})
+        self.pending = data.get("pending", {})
+
+    def _current(self, source: str, folders: Iterable[str]) -> Optional[dict]:
+        return self.marks.get(self.key(source, folders))
+
+    def is_unchanged(self, source: str, digest: str, folders: Iterable[str]) -> bool:
+        mark = self._current(source, folders)
+        return bool(mark) and mark.get("digest") == digest
+
+    def since(self, source: str, folders: Iterable[str]) -> int:
+        """add_date, начиная с которого ссылки считаются новыми (0 — брать всё)."""
+        mark = self._current(source, folders)
+        return mark.get("max_add_date", 0) if mark else 0
+
+    def filter_new(self, source: str, links: List[dict], folders: Iterable[str], force: bool = False) -> List[dict]:
+        if force:
+            return links
+        since = self.since(source, folders)
+        # Ссылки без ADD_DATE сравнить не с чем — они всегда идут дальше, дубликаты отсечёт база
+        return [link for link in links if link["add_date"] > since or not link["add_date"]] if since else links
+
+    @staticmethod
+    def _mark(source: str, digest: str, links: Iterable[dict], folders: Iterable[str]) -> dict:
+        return {
+            "source": source,
+            "digest": digest,
+            "max_add_date": max([0, *(link["add_date"] for link in links)]),
+            "folders": sorted(folders),
+            "updated_at": int(time.time()),
+        }
+
+    def _apply(self, key: str, mark: dict):
+        """Знак не уменьшается, даже если в файле ссылки старее."""
+        old = self.marks.get(key) or {}
+        self.marks[key] = {**mark, "max_add_date": max(mark["max_add_date"], old.get("max_add_date", 0))}
+
+    def advance(self, source: str, digest: str, links: Iterable[dict], folders: Iterable[str]):
+        """Запоминает импортированный файл."""
+        self._apply(self.key(source, folders), self._mark(source, digest, links, folders))
+        self._save()
+
+    def stage(self, source: str, digest: str, links: Iterable[dict], folders: Iterable[str]):
+        """Запоминает извлечённый файл, не двигая знак: это сделает commit_pending() после записи в базу."""
+        self.pending[self.key(source, folders)] = self._mark(source, digest, links, folders)
+        self._save()
+
+    def commit_pending(self) -> int:
+        """Двигает отложенные знаки. Возвращает их число."""
+        committed = len(self.pending)
+        for key, mark in self.pending.items():
+            self._apply(key, mark)
+        self.pending = {}
+        self._save()
+        return committed
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"marks": self.marks, "pending": self.pending}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -2,13 +2,14 @@ import os
 import asyncio
 import uuid
 import json
-from typing import List
+import base64
+from typing import Optional
 from datetime import datetime
 
 from transformers import AutoTokenizer
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
@@ -18,9 +19,19 @@ from llm.model import get_llm_completion # Изменяем импорт, доб
 
 
 import backend_logic as logic
+from scheduler import scheduler, Priority, SchedulerOverloaded
+from cache import AsyncTTLCache
+from menu_builder import load_menu
+from url_canon import normalize_url
+from import_watermarks import DEFAULT_SOURCE, ImportWatermarks, file_digest
+from category_counts import fetch_categories
+from db import get_db
+from storage_backends import get_storage, STORAGE_BACKEND, LOCAL_STORAGE_DIR
+from storage_ops import StorageBundle, artifact_upload
+import cas
 from models import (
-    Bookmark, BookmarkCreate, ResnapRequest, CommitScreenshotRequest, 
-    CategoriesResponse, CreateCategoryRequest, ProcessUrlRequest, 
+    Bookmark, BookmarkCreate, BookmarkEdit, BookmarkPage, ResnapRequest, CommitScreenshotRequest, 
+    CategoriesResponse, CategoryPage, CreateCategoryRequest, ProcessUrlRequest, 
     FinalizeBookmarkRequest, ProcessUrlResponse, AIAnalysisResult, 
     RegenerateSummaryRequest
 )
@@ -37,6 +48,11 @@ app = FastAPI(title="Bookmark Manager")
 async def startup_event():
     logger.info("Приложение FastAPI запускается...")
     await initialize_llm_providers(LLM_PROVIDER_ORDER)
+    await get_db() # Создаём общий асинхронный клиент Supabase заранее
+    try:
+        await menu_cache.get("menu", load_menu) # Прогреваем меню до первого запроса
+    except Exception as e:
+        logger.warning(f"Не удалось прогреть меню категорий: {e}")
     logger.info("Приложение FastAPI запущено.")
 
 # Настройка CORS
@@ -48,6 +64,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(SchedulerOverloaded)
+async def scheduler_overloaded_handler(request, exc: SchedulerOverloaded):
+    """Быстрый отказ вместо падения под нагрузкой: клиент повторит запрос позже."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Server is busy: {exc}", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # Загружаем токенизатор для Llama 3 (он же для Llama 4)
 tokenizer = AutoTokenizer.from_pretrained("unsloth/llama-3-8b-instruct-bnb-4bit")
 
@@ -57,33 +82,128 @@ tokenizer = AutoTokenizer.from_pretrained("unsloth/llama-3-8b-instruct-bnb-4bit"
 def read_root():
     return {"status": "ok"}
 
-@app.get("/bookmarks", response_model=List[Bookmark])
-def get_bookmarks():
-    response = logic.supabase.table('bookmarks').select('*').order('id', desc=True).execute()
+# Поля, которые можно запросить через ?fields=
+BOOKMARK_FIELDS = {"id", "title", "url", "date_add", "summary", "categories", "is_processed", "processing_error", "inserted_at"}
+DEFAULT_BOOKMARK_FIELDS = ["id", "title", "url", "date_add", "summary", "categories", "is_processed"]
+
+def encode_cursor(date_add, bookmark_id: int) -> str:
+    raw = json.dumps([date_add, bookmark_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_add, bookmark_id = json.loads(base64.urlsafe_b64decode(padded))
+        if date_add is not None:
+            date_add = int(date_add)
+        return date_add, int(bookmark_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/bookmarks", response_model=BookmarkPage)
+async def get_bookmarks(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    is_processed: Optional[bool] = None,
+    category: Optional[str] = None,
+):
+    """
+    Страница закладок по ключу (date_add DESC, id DESC).
+    Курсор next_cursor передаётся в следующий запрос; время ответа не зависит от глубины.
+    """
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(DEFAULT_BOOKMARK_FIELDS)
+    unknown = set(selected) - BOOKMARK_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # Ключ пагинации нужен всегда, чтобы построить курсор
+    columns = list(dict.fromkeys(selected + ["date_add", "id"]))
+
+    db = await get_db()
+    select = ",".join(columns)
+    if category:
+        # Фильтр по индексу bookmark_categories вместо сканирования jsonb через contains
+        select += ",bookmark_categories!inner(categories!inner(name))"
+    query = db.table('bookmarks').select(select)
+    if is_processed is not None:
+        query = query.eq("is_processed", is_processed)
+    if category:
+        query = query.eq("bookmark_categories.categories.name", category)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        # Порядок Postgres для DESC — NULLS FIRST: сначала закладки без даты, затем по убыванию даты
+        if last_date is None:
+            query = query.or_(f"and(date_add.is.null,id.lt.{last_id}),date_add.not.is.null")
+        else:
+            query = query.or_(f"date_add.lt.{last_date},and(date_add.eq.{last_date},id.lt.{last_id})")
+
+    response = await query \
+        .order("date_add", desc=True) \
+        .order("id", desc=True) \
+        .limit(limit + 1) \
+        .execute()
     if response.data is None:
         raise HTTPException(status_code=500, detail="Could not fetch bookmarks")
-    return response.data
 
-@app.post("/bookmarks", response_model=Bookmark, status_code=201)
-def create_bookmark(bookmark: BookmarkCreate):
-    bookmark_dict = bookmark.model_dump(mode='json')
-    response = logic.supabase.table('bookmarks').insert(bookmark_dict).execute()
+    rows = response.data
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["date_add"], rows[-1]["id"])
+    items = [{k: row.get(k) for k in selected} for row in rows]
+    return {"items": items, "next_cursor": next_cursor}
+
+async def write_bookmark(query):
+    """Запись закладки; конфликт уникального url_normalized — 409, а не 500."""
+    try:
+        response = await query.execute()
+    except Exception as e:
+        if getattr(e, "code", None) == "23505":
+            raise HTTPException(status_code=409, detail="Bookmark with this URL already exists")
+        raise
     if not response.data:
-         raise HTTPException(status_code=500, detail="Could not create bookmark")
+         raise HTTPException(status_code=500, detail="Could not save bookmark")
     return response.data[0]
 
+@app.post("/bookmarks", response_model=Bookmark, status_code=201)
+async def create_bookmark(bookmark: BookmarkCreate):
+    bookmark_dict = bookmark.model_dump(mode='json')
+    bookmark_dict["url_normalized"] = normalize_url(bookmark_dict["url"])
+    db = await get_db()
+    return await write_bookmark(db.table('bookmarks').insert(bookmark_dict))
+
+@app.post("/api/bookmarks", status_code=201)
+async def add_bookmark(bookmark: BookmarkEdit):
+    """Сохранение новой закладки из попапа: ключ дедупликации считается здесь, как и при импорте."""
+    row = {**bookmark.model_dump(), "url_normalized": normalize_url(bookmark.url), "is_processed": True}
+    db = await get_db()
+    return await write_bookmark(db.table("bookmarks").insert(row))
+
+@app.put("/api/bookmarks/{id}")
+async def update_bookmark(id: int, bookmark: BookmarkEdit):
+    """Правка закладки из попапа; при смене url пересчитывается url_normalized."""
+    row = {**bookmark.model_dump(), "url_normalized": normalize_url(bookmark.url)}
+    db = await get_db()
+    return await write_bookmark(db.table("bookmarks").update(row).eq("id", id))
+
 @app.post("/api/resnap")
 async def resnap_bookmark(request: ResnapRequest):
     unique_id = uuid.uuid4().hex
     raw_path = os.path.join(logic.TEMP_DIR, f"{unique_id}_raw.png")
     proc_path = os.path.join(logic.TEMP_DIR, f"{unique_id}.png")
     try:
-        await logic.take_screenshot(str(request.url), raw_path)
+        async with scheduler.slot(Priority.INTERACTIVE):
+            await logic.take_screenshot(str(request.url), raw_path)
         await logic.process_image(raw_path, proc_path)
-        temp_path = f"temp/{unique_id}.png"
-        logic.upload_to_supabase(proc_path, temp_path, "image/png")
-        url = logic.supabase.storage.from_("screenshots").get_public_url(temp_path)
-        return {"temp_url": url, "temp_filename": temp_path}
+        if cas.CAS_ENABLED:
+            # Тот же кадр, что уже в хранилище, повторно не загружается
+            temp_path, _, _ = await cas.put_file(proc_path, "image/png")
+        else:
+            temp_path = f"temp/{unique_id}.png"
+            await logic.upload_to_supabase(proc_path, temp_path, "image/png")
+        return {"temp_url": get_storage().public_url(temp_path), "temp_filename": temp_path}
+    except SchedulerOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -91,22 +211,95 @@ async def resnap_bookmark(request: ResnapRequest):
             if os.path.exists(f): os.remove(f)
 
 @app.post("/api/commit-screenshot")
-def commit_screenshot(request: CommitScreenshotRequest):
+async def commit_screenshot(request: CommitScreenshotRequest):
+    if cas.is_cas_path(request.temp_filename):
+        await cas.link_asset(request.bookmark_id, "image", request.temp_filename)
+        return {"status": "success"}
     final_path = f"image/{request.bookmark_id}.png"
+    storage = get_storage()
     try:
-        logic.supabase.storage.from_("screenshots").move(request.temp_filename, final_path)
+        await storage.move(request.temp_filename, final_path)
         return {"status": "success"}
     except:
-        data = logic.supabase.storage.from_("screenshots").download(request.temp_filename)
-        logic.supabase.storage.from_("screenshots").upload(final_path, data, {"content-type": "image/png", "upsert": "true"})
-        logic.supabase.storage.from_("screenshots").remove([request.temp_filename])
+        data, options = artifact_upload(await storage.download(request.temp_filename), "image/png")
+        await storage.upload(final_path, data, options)
+        await storage.remove([request.temp_filename])
         return {"status": "success"}
 
 @app.get("/api/categories", response_model=CategoriesResponse)
-def get_categories():
-    res = logic.supabase.table("categories").select("name").order("name").execute()
+async def get_categories():
+    db = await get_db()
+    res = await db.table("categories").select("name").order("name").execute()
     return {"categories": [r["name"] for r in res.data] if res.data else []}
 
+# Меню категорий: отдаётся из памяти, просроченное обновляется в фоне (клиент не ждёт пересборку)
+MENU_CACHE_TTL = float(os.getenv("MENU_CACHE_TTL", "60"))
+menu_cache = AsyncTTLCache(ttl=MENU_CACHE_TTL)
+
+@app.get("/api/menu")
+async def get_menu():
+    """Вложенное меню категорий со счётчиками закладок."""
+    try:
+        return await menu_cache.get_or_stale("menu", load_menu)
+    except Exception as e:
+        logger.error(f"Menu Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Страница категории: slug → категория и число закладок берутся из памяти,
+# в базу уходит один запрос за страницей (count считается, только если его нет в кэше)
+CATEGORY_SLUG_TTL = float(os.getenv("CATEGORY_SLUG_TTL", "300"))
+CATEGORY_COUNT_TTL = float(os.getenv("CATEGORY_COUNT_TTL", "60"))
+# Внеочередное перечитывание карты по неизвестному slug — не чаще раза в столько секунд
+CATEGORY_RELOAD_INTERVAL = float(os.getenv("CATEGORY_RELOAD_INTERVAL", "30"))
+category_slug_cache = AsyncTTLCache(ttl=CATEGORY_SLUG_TTL)
+category_count_cache = AsyncTTLCache(ttl=CATEGORY_COUNT_TTL)
+category_reload_guard = AsyncTTLCache(ttl=CATEGORY_RELOAD_INTERVAL)
+
+async def load_category_slugs() -> dict:
+    db = await get_db()
+    return {c["slug"]: c for c in await fetch_categories(db) if c.get("slug")}
+
+async def resolve_category(slug: str) -> Optional[dict]:
+    category = (await category_slug_cache.get_or_stale("slugs", load_category_slugs)).get(slug)
+    if category is None and not category_reload_guard.peek("reload"):
+        # Категория могла появиться после загрузки карты — перечитываем, но одним запросом
+        # на все неизвестные slug за интервал: битые ссылки и перебор URL не читают таблицу каждый раз
+        category_reload_guard.set("reload", True)
+        category_slug_cache.invalidate("slugs")
+        category = (await category_slug_cache.get("slugs", load_category_slugs)).get(slug)
+    return category
+
+@app.get("/api/categories/{slug}/bookmarks", response_model=CategoryPage)
+async def get_category_page(slug: str, page: int = Query(1, ge=1), page_size: int = Query(16, ge=1, le=100)):
+    """Метаданные категории, страница обработанных закладок и их общее число за один вызов."""
+    category = await resolve_category(slug)
+    if category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    count = category_count_cache.peek(category["id"])
+    db = await get_db()
+    query = db.table("bookmarks").select(
+        "*, asset_refs(kind, path), bookmark_categories!inner(category_id)",
+        count="exact" if count is None else None,
+    )
+    res = await query \
+        .eq("is_processed", True) \
+        .eq("bookmark_categories.category_id", category["id"]) \
+        .order("date_add", desc=True) \
+        .order("id", desc=True) \
+        .range((page - 1) * page_size, page * page_size - 1) \
+        .execute()
+    if count is None:
+        count = res.count or 0
+        category_count_cache.set(category["id"], count)
+
+    items = [{k: v for k, v in row.items() if k != "bookmark_categories"} for row in res.data or []]
+    return {
+        "category": {k: category.get(k) for k in ("id", "name", "slug", "parent_category", "bookmarks_count")},
+        "items": items,
+        "count": count,
+    }
+
 @app.post("/api/process-url", response_model=ProcessUrlResponse)
 async def process_url(request: ProcessUrlRequest):
     unique_id = uuid.uuid4().hex
@@ -116,7 +309,8 @@ async def process_url(request: ProcessUrlRequest):
     md_path = os.path.join(logic.TEMP_DIR, f"{unique_id}.md")
     
     try:
-        title, html_content = await logic.take_screenshot(str(request.url), raw_path)
+        async with scheduler.slot(Priority.INTERACTIVE):
+            title, html_content = await logic.take_screenshot(str(request.url), raw_path)
         if html_content:
             with open(html_path, "w", encoding="utf-8") as f: f.write(html_content)
         
@@ -131,24 +325,40 @@ async def process_url(request: ProcessUrlRequest):
             except: pass
 
         try:
-            ai_data = await logic.analyze_markdown_content(markdown_text, fire=request.fire) if markdown_text else {"summary": "", "categories": []}
+            if markdown_text:
+                async with scheduler.slot(Priority.INTERACTIVE):
+                    ai_data = await logic.analyze_markdown_content(markdown_text, fire=request.fire)
+            else:
+                ai_data = {"summary": "", "categories": []}
         except LLMUnavailableError:
             logger.warning("ИИ недоступен для ручного запроса. Возвращаем пустые поля.")
             ai_data = {"summary": "", "categories": []}
+        except SchedulerOverloaded:
+            # Скриншот уже снят — не выбрасываем работу, просто отдаём без подсказок ИИ
+            logger.warning("Очередь ИИ переполнена для ручного запроса. Возвращаем пустые поля.")
+            ai_data = {"summary": "", "categories": []}
         
         # Uploads
         paths = {"img": f"temp/{unique_id}.png", "html": f"temp/{unique_id}.html", "md": f"temp/{unique_id}.md"}
-        if os.path.exists(proc_path): logic.upload_to_supabase(proc_path, paths["img"], "image/png")
-        if os.path.exists(html_path): logic.upload_to_supabase(html_path, paths["html"], "text/html")
-        if os.path.exists(md_path): logic.upload_to_supabase(md_path, paths["md"], "text/markdown")
+        uploads = StorageBundle()
+        for key, file_path, content_type in [("img", proc_path, "image/png"), ("html", html_path, "text/html"), ("md", md_path, "text/markdown")]:
+            if not os.path.exists(file_path): continue
+            if cas.CAS_ENABLED:
+                paths[key] = cas.stage_file(uploads, file_path, content_type)
+            else:
+                uploads.upload(file_path, paths[key], content_type)
+        await uploads.run()
 
         return {
             "status": "success", "message": "Processed", "suggested_title": title,
-            "temp_url": logic.supabase.storage.from_("screenshots").get_public_url(paths["img"]),
+            "temp_url": get_storage().public_url(paths["img"]),
             "temp_screenshot_path": paths["img"], "temp_html_path": paths["html"],
             "temp_markdown_path": paths["md"], "uuid": unique_id,
-            "suggested_summary": ai_data["summary"], "suggested_categories": ai_data["categories"]
+            "suggested_summary": ai_data["summary"], "suggested_categories": ai_data["categories"],
+            "storage_errors": uploads.errors
         }
+    except SchedulerOverloaded:
+        raise
     except Exception as e:
         logger.error(f"API Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -157,96 +367,171 @@ async def process_url(request: ProcessUrlRequest):
             if os.path.exists(f): os.remove(f)
 
 @app.post("/api/finalize-bookmark")
-def finalize_bookmark(request: FinalizeBookmarkRequest):
+async def finalize_bookmark(request: FinalizeBookmarkRequest):
     id = request.bookmark_id
     try:
-        if request.temp_screenshot_path:
-            try: logic.supabase.storage.from_("screenshots").move(request.temp_screenshot_path, f"image/{id}.png")
-            except: pass
-        if request.temp_html_path:
-            try: logic.supabase.storage.from_("screenshots").move(request.temp_html_path, f"html/{id}.html")
-            except: pass
-        if request.temp_markdown_path:
-            try: logic.supabase.storage.from_("screenshots").move(request.temp_markdown_path, f"markdown/{id}.md")
-            except: pass
-        return {"status": "success"}
+        moves = StorageBundle()
+        for kind, temp_path, final_path in [
+            ("image", request.temp_screenshot_path, f"image/{id}.png"),
+            ("html", request.temp_html_path, f"html/{id}.html"),
+            ("markdown", request.temp_markdown_path, f"markdown/{id}.md"),
+        ]:
+            if not temp_path: continue
+            if cas.is_cas_path(temp_path):
+                # Объект CAS уже на месте — достаточно ссылки из закладки
+                moves.call(temp_path, lambda kind=kind, path=temp_path: cas.link_asset(id, kind, path))
+            else:
+                moves.move(temp_path, final_path)
+        await moves.run()
+        # Ошибки по каждому объекту: клиент видит, какой файл не доехал
+        return {"status": "partial" if moves.errors else "success", "errors": moves.errors}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+IMPORT_BATCH_SIZE = 500
+
 @app.post("/api/bookmarks/import")
-async def import_bookmarks(file: UploadFile = File(...)):
-    """Массовый импорт закладок из HTML-файла."""
+async def import_bookmarks(
+    file: UploadFile = File(...),
+    source: str = Form(DEFAULT_SOURCE),
+    force: bool = Form(False),
+):
+    """
+    Массовый импорт закладок из HTML-файла.
+    Инкрементальный: тот же файл повторно не разбирается, из нового берутся только ссылки
+    новее водяного знака источника. force=true — полный проход по файлу.
+    """
     try:
-        content = await file.read()
-        html_text = content.decode('utf-8', errors='ignore')
-        
-        # 1. Парсим ссылки из HTML (Разработка и Полезное)
-        extracted_links = logic.parse_chrome_bookmarks(html_text)
-        if not extracted_links:
-            return {"status": "success", "added": 0, "message": "No links found in target folders"}
+        watermarks = ImportWatermarks()
+        digest = file_digest(file.file)
+        if not force and watermarks.is_unchanged(source, digest, logic.TARGET_FOLDERS):
+            return {"status": "success", "added": 0, "message": "File unchanged since last import"}
+
+        # 1. Парсим ссылки из HTML (целевые папки) потоком, не читая файл в память целиком
+        extracted_links = logic.parse_chrome_bookmarks(file.file)
+        new_links = watermarks.filter_new(source, extracted_links, logic.TARGET_FOLDERS, force=force)
+        if not new_links:
+            watermarks.advance(source, digest, extracted_links, logic.TARGET_FOLDERS)
+            return {"status": "success", "added": 0, "total_found": len(extracted_links),
+                    "message": "No new links since last import"}
             
-        # 2. Получаем существующие URL, чтобы избежать дублей
-        existing_res = logic.supabase.table("bookmarks").select("url").execute()
-        existing_urls = {r["url"] for r in existing_res.data} if existing_res.data else set()
-        
-        # 3. Фильтруем новые
-        to_insert = []
-        for item in extracted_links:
-            if item["url"] not in existing_urls:
-                to_insert.append({
-                    "url": item["url"],
-                    "title": item["title"],
-                    "date_add": item["add_date"],
-                    "is_processed": False
-                })
-        
-        # 4. Bulk Insert (пачками по 100)
-        if to_insert:
-            batch_size = 100
-            for i in range(0, len(to_insert), batch_size):
-                batch = to_insert[i:i + batch_size]
-                logic.supabase.table("bookmarks").insert(batch).execute()
-        
-        return {"status": "success", "added": len(to_insert), "total_found": len(extracted_links)}
+        # 2. Дубликаты отсекает уникальный индекс по url_normalized: база не выгружается,
+        #    стоимость импорта зависит только от размера файла
+        rows = [{
+            "url": item["url"],
+            "url_normalized": normalize_url(item["url"]),
+            "title": item["title"],
+            "date_add": item["add_date"],
+            "is_processed": False
+        } for item in new_links]
+
+        added = 0
+        db = await get_db()
+        for i in range(0, len(rows), IMPORT_BATCH_SIZE):
+            res = await db.table("bookmarks") \
+                .upsert(rows[i:i + IMPORT_BATCH_SIZE], on_conflict="url_normalized", ignore_duplicates=True) \
+                .execute()
+            added += len(res.data or [])
+
+        # Знак двигаем только после успешной записи: при ошибке следующий импорт повторит эти ссылки
+        watermarks.advance(source, digest, extracted_links, logic.TARGET_FOLDERS)
+        return {"status": "success", "added": added, "total_found": len(extracted_links), "checked": len(new_links)}
     except Exception as e:
         logger.error(f"Import Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Статус конвейера: один агрегирующий RPC на всех клиентов раз в CONVEYOR_STATUS_TTL секунд
+CONVEYOR_STATUS_TTL = float(os.getenv("CONVEYOR_STATUS_TTL", "2"))
+SSE_HEARTBEAT_INTERVAL = 15.0
+conveyor_status_cache = AsyncTTLCache(ttl=CONVEYOR_STATUS_TTL)
+
+async def fetch_conveyor_status() -> dict:
+    db = await get_db()
+    res = await db.rpc("conveyor_status", {}).execute()
+    data = res.data or {}
+    return {
+        "total": data.get("total", 0),
+        "processed": data.get("processed", 0),
+        "errors": data.get("errors", 0),
+    }
+
+async def get_cached_conveyor_status() -> dict:
+    return await conveyor_status_cache.get("status", fetch_conveyor_status)
+
 @app.get("/api/system/conveyor-status")
-def get_conveyor_status():
+async def get_conveyor_status():
     """Возвращает статистику обработки для индикатора прогресса."""
     try:
-        # Всего
-        total_res = logic.supabase.table("bookmarks").select("id", count="exact").execute()
-        total_count = total_res.count if total_res.count is not None else 0
-        
-        # Обработано
-        proc_res = logic.supabase.table("bookmarks").select("id", count="exact").eq("is_processed", True).execute()
-        proc_count = proc_res.count if proc_res.count is not None else 0
-        
-        # Ошибки
-        err_res = logic.supabase.table("bookmarks").select("id", count="exact").not_.is_("processing_error", "null").execute()
-        err_count = err_res.count if err_res.count is not None else 0
-        
-        return {
-            "total": total_count,
-            "processed": proc_count,
-            "errors": err_count
-        }
+        return await get_cached_conveyor_status()
     except Exception as e:
         logger.error(f"Status Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/system/conveyor-status/stream")
+async def stream_conveyor_status(request: Request):
+    """SSE-поток статуса конвейера: событие уходит клиенту только при изменении счётчиков."""
+    async def events():
+        last_sent = None
+        last_beat = asyncio.get_running_loop().time()
+        while not await request.is_disconnected():
+            try:
+                status = await get_cached_conveyor_status()
+                if status != last_sent:
+                    last_sent = status
+                    last_beat = asyncio.get_running_loop().time()
+                    yield f"data: {json.dumps(status)}\n\n"
+            except Exception as e:
+                logger.error(f"Status stream Error: {e}")
+            now = asyncio.get_running_loop().time()
+            if now - last_beat >= SSE_HEARTBEAT_INTERVAL:
+                last_beat = now
+                yield ": ping\n\n"
+            await asyncio.sleep(CONVEYOR_STATUS_TTL)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/system/scheduler")
+def get_scheduler_status():
+    """Загрузка планировщика тяжёлых задач и метрики ожидания в очереди."""
+    return scheduler.snapshot()
+
 @app.delete("/api/bookmarks/{id}")
 async def delete_bookmark(id: int):
     try:
-        logic.supabase.table("bookmarks").delete().eq("id", id).execute()
-        files = [f"html/{id}.html", f"markdown/{id}.md", f"image/{id}.png"]
-        logic.supabase.storage.from_("screenshots").remove(files)
-        return {"status": "success"}
+        db = await get_db()
+        await db.table("bookmarks").delete().eq("id", id).execute()
+        removal = StorageBundle()
+        for path in [f"html/{id}.html", f"markdown/{id}.md", f"image/{id}.png"]:
+            removal.remove(path)
+        results = await removal.run()
+        return {"status": "success", "files": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+TEXT_ARTIFACTS = {
+    "html": (lambda id: f"html/{id}.html", "text/html; charset=utf-8"),
+    "markdown": (lambda id: f"markdown/{id}.md", "text/markdown; charset=utf-8"),
+}
+
+@app.get("/api/bookmarks/{id}/{kind}")
+async def get_bookmark_text(id: int, kind: str):
+    """
+    Сохранённые HTML/markdown закладки. В Storage они лежат в gzip без заголовка
+    Content-Encoding, поэтому читать их нужно здесь, а не по публичной ссылке.
+    """
+    if kind not in TEXT_ARTIFACTS:
+        raise HTTPException(status_code=404, detail="Unknown artifact kind")
+    default_path, media_type = TEXT_ARTIFACTS[kind]
+    db = await get_db()
+    refs = await db.table("asset_refs").select("path").eq("bookmark_id", id).eq("kind", kind).limit(1).execute()
+    path = refs.data[0]["path"] if refs.data else default_path(id)
+    try:
+        text = await logic.download_text_artifact(path)
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать {path}: {e}")
+        raise HTTPException(status_code=404, detail=f"{kind} not found")
+    return Response(content=text, media_type=media_type)
+
 # Джин не трогай этот ендпойнт, ето писал Босс, ему это нужно
 @app.post("/api/regenerate_summary")
 async def regen_summary(request: RegenerateSummaryRequest, background_tasks: BackgroundTasks):
@@ -503,5 +788,9 @@ async def boss():
 
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
+if STORAGE_BACKEND == "local":
+    # Офлайн-режим: объекты локального хранилища отдаёт сам API
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount("/storage", StaticFiles(directory=LOCAL_STORAGE_DIR), name="storage")
 @app.get("/app")
 async def serve_frontend(): return FileResponse("static/index.html")
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from typing import List, Optional
+
+from loguru import logger
+
+from category_counts import fetch_categories
+from db import get_db
+
+# --- Иерархическое меню категорий со счётчиками ---
+MENU_FIELDS = ("id", "name", "slug", "parent_category", "bookmarks_count")
+
+
+def build_menu(categories: List[dict]) -> List[dict]:
+    """
+    Вложенное меню из строк таблицы categories: корни с дочерними категориями, по алфавиту.
+    В меню попадают только категории с закладками; дочерняя без родителя в меню не показывается.
+    """
+    nodes = {
+        c["name"]: {**{k: c.get(k) for k in MENU_FIELDS}, "children": []}
+        for c in sorted(categories, key=lambda c: c["name"])
+        if (c.get("bookmarks_count") or 0) > 0
+    }
+    menu = []
+    for node in nodes.values():
+        parent = node["parent_category"]
+        if parent is None:
+            menu.append(node)
+        elif parent in nodes and parent != node["name"]:
+            nodes[parent]["children"].append(node)
+    return menu
+
+
+def menu_digest(menu: List[dict]) -> str:
+    """Хэш содержимого меню (порядок ключей и форматирование не влияют)."""
+    payload = json.dumps(menu, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _file_digest(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return menu_digest(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def write_menu(menu: List[dict], path: str) -> bool:
+    """Перезаписывает JSON только если меню изменилось. Возвращает True, если файл обновлён."""
+    if _file_digest(path) == menu_digest(menu):
+        logger.info(f"Меню не изменилось, {path} не перезаписан.")
+        return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(menu, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    logger.success(f"Меню сохранено в {path} ({len(menu)} корневых категорий).")
+    return True
+
+
+async def load_menu(db=None) -> List[dict]:
+    db = db or await get_db()
+    return build_menu(await fetch_categories(db))
@@ -1,6 +1,6 @@
 # models.py
 from pydantic import BaseModel, HttpUrl, Field, AliasChoices
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 class AIAnalysisResult(BaseModel):
     categories: List[str] = Field(
@@ -17,6 +17,18 @@ class BookmarkCreate(BaseModel):
 class Bookmark(BookmarkCreate):
     id: int
 
+class BookmarkEdit(BaseModel):
+    """Закладка из попапа: новая (уже обработанная /api/process-url) или правка существующей."""
+    title: str
+    url: str
+    summary: Optional[str] = None
+    date_add: Optional[int] = None
+    categories: List[str] = []
+
+class BookmarkPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
 class ResnapRequest(BaseModel):
     url: HttpUrl
     bookmark_id: int
@@ -28,6 +40,11 @@ class CommitScreenshotRequest(BaseModel):
 class CategoriesResponse(BaseModel):
     categories: List[str]
 
+class CategoryPage(BaseModel):
+    category: Dict[str, Any]
+    items: List[Dict[str, Any]]
+    count: int
+
 class CreateCategoryRequest(BaseModel):
     name: str
     context_slug: Optional[str] = None
@@ -47,6 +64,7 @@ class ProcessUrlResponse(BaseModel):
     uuid: str
     suggested_summary: Optional[str] = None
     suggested_categories: List[str] = []
+    storage_errors: Dict[str, str] = {}
 
 class FinalizeBookmarkRequest(BaseModel):
     bookmark_id: int
@@ -0,0 +1,66 @@
+import asyncio
+import sys
+
+from loguru import logger
+
+from db import use_service_role
+from storage_backends import get_storage
+from storage_ops import artifact_upload, is_compressed
+
+# Перепаковка уже загруженных HTML/markdown в gzip (см. storage_ops.artifact_upload).
+# Работает с хранилищем из STORAGE_BACKEND; с Supabase — под SUPABASE_SERVICE_ROLE_KEY, если он задан.
+# Запуск: python recompress_artifacts.py [--dry-run]
+
+BUCKET = "screenshots"
+FOLDERS = {"html": "text/html", "markdown": "text/markdown"}
+PAGE_SIZE = 1000
+
+
+async def list_folder(storage, folder: str):
+    """Все объекты папки бакета (постранично)."""
+    offset = 0
+    while True:
+        page = await storage.list(folder, limit=PAGE_SIZE, offset=offset)
+        for item in page:
+            if item["name"] != ".emptyFolderPlaceholder":
+                yield item
+        if len(page) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+
+
+async def recompress(dry_run: bool = False):
+    storage = get_storage(BUCKET)
+    total_before = total_after = done = skipped = failed = 0
+
+    for folder, content_type in FOLDERS.items():
+        async for item in list_folder(storage, folder):
+            path = f"{folder}/{item['name']}"
+            try:
+                data = await storage.download(path)
+                if is_compressed(data):
+                    skipped += 1
+                    continue
+                packed, options = artifact_upload(data, content_type, compress=True)
+                total_before += len(data)
+                total_after += len(packed)
+                if not dry_run:
+                    await storage.upload(path, packed, options)
+                done += 1
+                if done % 100 == 0:
+                    logger.info(f"📦 Перепаковано {done} объектов...")
+            except Exception as e:
+                failed += 1
+                logger.error(f"Не удалось перепаковать {path}: {e}")
+
+    ratio = total_before / total_after if total_after else 0
+    mode = " (dry-run, ничего не записано)" if dry_run else ""
+    logger.success(
+        f"Готово{mode}: сжато {done}, уже были сжаты {skipped}, ошибок {failed}. "
+        f"{total_before / 1e6:.1f} МБ -> {total_after / 1e6:.1f} МБ (x{ratio:.1f})."
+    )
+
+
+if __name__ == "__main__":
+    use_service_role()
+    asyncio.run(recompress(dry_run="--dry-run" in sys.argv))
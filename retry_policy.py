@@ -0,0 +1,88 @@
+import asyncio
+import os
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from llm.model import LLMUnavailableError
+
+# --- Настройки повторов конвейера ---
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "6"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "60"))       # секунды до первого повтора
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", str(6 * 3600)))  # потолок задержки
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+# HTTP-статусы страницы/API, которые имеет смысл повторить позже
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# Ошибки Chromium, после которых повтор бессмысленен
+PERMANENT_NET_ERRORS = ("ERR_NAME_NOT_RESOLVED", "ERR_INVALID_URL", "ERR_UNSAFE_PORT", "ERR_BLOCKED_BY_CLIENT")
+
+
+def classify_error(exc: BaseException) -> str:
+    """Делит ошибки цикла на временные (повторяем с паузой) и постоянные (сразу в dead-letter)."""
+    if isinstance(exc, LLMUnavailableError):
+        return TRANSIENT
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return TRANSIENT
+    if isinstance(exc, httpx.HTTPStatusError):
+        return TRANSIENT if exc.response.status_code in RETRYABLE_STATUSES else PERMANENT
+    # Исключения Playwright не импортируем, чтобы модуль не тянул браузерный стек
+    if type(exc).__name__ == "TimeoutError":
+        return TRANSIENT
+
+    message = str(exc)
+    status_match = re.search(r"Page returned status (\d+)", message)
+    if status_match:
+        return TRANSIENT if int(status_match.group(1)) in RETRYABLE_STATUSES else PERMANENT
+    if "Page content is too short" in message:
+        return PERMANENT
+    if any(code in message for code in PERMANENT_NET_ERRORS):
+        return PERMANENT
+    # Неизвестное считаем временным: лимит попыток всё равно отправит его в dead-letter
+    return TRANSIENT
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY, rng=random) -> float:
+    """Экспоненциальная задержка с джиттером (equal jitter) для попытки номер attempt (с 1)."""
+    delay = min(cap, base * (2 ** max(0, attempt - 1)))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+def plan_failure(exc: BaseException, attempts: int, now: datetime = None,
+                 max_attempts: int = RETRY_MAX_ATTEMPTS, rng=random) -> dict:
+    """
+    Возвращает поля для обновления закладки после неудачной попытки.
+
+    :param attempts: сколько попыток было сделано ДО этой
+    """
+    now = now or datetime.now(timezone.utc)
+    attempt = attempts + 1
+    message = str(exc) or type(exc).__name__
+
+    # Недоступность ИИ — не вина закладки, поэтому лимит попыток на неё не действует
+    exhausted = attempt >= max_attempts and not isinstance(exc, LLMUnavailableError)
+    if classify_error(exc) == PERMANENT or exhausted:
+        # Dead-letter: больше не берём в работу, ошибка видна в статусе конвейера
+        return {
+            "attempts": attempt,
+            "last_error": message,
+            "processing_error": message,
+            "next_attempt_at": None,
+            "leased_until": None,
+            "dead_letter": True,
+            "is_processed": True,
+        }
+
+    next_at = now + timedelta(seconds=backoff_delay(attempt, rng=rng))
+    return {
+        "attempts": attempt,
+        "last_error": message,
+        "next_attempt_at": next_at.isoformat(),
+        "leased_until": None,
+        "dead_letter": False,
+        "is_processed": False,
+    }
@@ -0,0 +1,292 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from enum import IntEnum
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: места считаются только внутри процесса
+    fcntl = None
+
+# --- Настройки планировщика тяжёлых задач (браузер, прокси, LLM) ---
+# Ёмкость на весь хост: API и все воркеры конвейера делят её через файлы-замки в HEAVY_SLOTS_DIR
+HEAVY_CAPACITY = int(os.getenv("HEAVY_CAPACITY", "3"))
+INTERACTIVE_RESERVED = int(os.getenv("INTERACTIVE_RESERVED", "1"))
+HEAVY_SLOTS_DIR = os.getenv("HEAVY_SLOTS_DIR", os.path.join("temp_screenshots", ".heavy_slots"))
+# Как часто ожидающий проверяет, не освободил ли место другой процесс
+HEAVY_SLOT_POLL = float(os.getenv("HEAVY_SLOT_POLL", "0.2"))
+# Файл-маяк: через него ждущие интерактивные запросы API сигналят воркерам конвейера в других процессах
+INTERACTIVE_BEACON = os.getenv("INTERACTIVE_BEACON", os.path.join("temp_screenshots", ".interactive"))
+INTERACTIVE_BEACON_TTL = float(os.getenv("INTERACTIVE_BEACON_TTL", "5"))
+# Контроль допуска: сколько интерактивных запросов может ждать и как долго
+HEAVY_QUEUE_DEPTH = int(os.getenv("HEAVY_QUEUE_DEPTH", "10"))
+HEAVY_QUEUE_TIMEOUT = float(os.getenv("HEAVY_QUEUE_TIMEOUT", "60"))
+# Сколько последних замеров ожидания хранить для метрик
+METRICS_WINDOW = 500
+
+
+class Priority(IntEnum):
+    """Классы приоритета: чем меньше значение, тем важнее задача."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class SchedulerOverloaded(Exception):
+    """Очередь тяжёлых задач переполнена — запрос нужно отклонить и повторить позже."""
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class HostSlots:
+    """
+    Места тяжёлых задач, общие для всех процессов хоста: файл-замок (flock) на каждое место.
+    Замок снимает ядро при завершении процесса, поэтому упавший воркер места не уносит.
+    """
+
+    def __init__(self, directory: str, capacity: int):
+        self.directory = directory
+        self.capacity = capacity
+        os.makedirs(directory, exist_ok=True)
+        self._fds: Dict[int, int] = {}
+
+    def _path(self, index: int) -> str:
+        return os.path.join(self.directory, f"slot-{index}.lock")
+
+    def _try_lock(self, index: int) -> Optional[int]:
+        fd = os.open(self._path(index), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return None
+        return fd
+
+    def try_acquire(self, indices: Iterable[int]) -> Optional[int]:
+        """Занимает первое свободное место из indices; None — все заняты."""
+        for index in indices:
+            if index in self._fds:
+                continue
+            fd = self._try_lock(index)
+            if fd is not None:
+                self._fds[index] = fd
+                return index
+        return None
+
+    def release(self, index: int):
+        fd = self._fds.pop(index, None)
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def in_use(self) -> int:
+        """Сколько мест занято на хосте (всеми процессами)."""
+        busy = len(self._fds)
+        for index in range(self.capacity):
+            if index in self._fds:
+                continue
+            fd = self._try_lock(index)
+            if fd is None:
+                busy += 1
+            else:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+        return busy
+
+
+class PriorityScheduler:
+    """
+    Общий планировщик тяжёлых этапов с двумя классами приоритета.
+
+    Ёмкость общая для хоста (HostSlots): сколько бы процессов API и воркеров ни было
+    запущено, тяжёлых задач одновременно не больше capacity.
+    Часть мест (reserved) всегда держится под интерактивные запросы, остальные
+    фон занимает свободно, пока они есть. Фоновые задачи не стартуют, только пока
+    интерактивный запрос ждёт места — в этом процессе или, через файл-маяк, в соседнем.
+    Для интерактивного класса действует контроль допуска: при переполненной
+    очереди или слишком долгом ожидании выбрасывается SchedulerOverloaded.
+    """
+
+    def __init__(self, capacity: int = HEAVY_CAPACITY, reserved: int = INTERACTIVE_RESERVED,
+                 beacon_path: str = INTERACTIVE_BEACON, beacon_ttl: float = INTERACTIVE_BEACON_TTL,
+                 queue_depth: int = HEAVY_QUEUE_DEPTH, queue_timeout: float = HEAVY_QUEUE_TIMEOUT,
+                 slots_dir: Optional[str] = HEAVY_SLOTS_DIR, poll_interval: float = HEAVY_SLOT_POLL):
+        self.capacity = max(1, capacity)
+        # Фону оставляем хотя бы одно место, иначе конвейер встанет навсегда
+        self.reserved = max(0, min(reserved, self.capacity - 1))
+        self.beacon_path = beacon_path
+        self.beacon_ttl = beacon_ttl
+        self.poll_interval = poll_interval
+        self.slots = HostSlots(slots_dir, self.capacity) if slots_dir and fcntl else None
+        self._held: Dict[Priority, List[int]] = {p: [] for p in Priority}
+        self.running = {Priority.INTERACTIVE: 0, Priority.BACKGROUND: 0}
+        self.waiting = {Priority.INTERACTIVE: 0, Priority.BACKGROUND: 0}
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self._cond = asyncio.Condition()
+        self._beacon_task = None
+        # Метрики: время ожидания места и время удержания места по классам
+        self._wait_times = {p: deque(maxlen=METRICS_WINDOW) for p in Priority}
+        self._hold_times = deque(maxlen=METRICS_WINDOW)
+        self.admitted = {p: 0 for p in Priority}
+        self.rejected = {p: 0 for p in Priority}
+
+    # --- Межпроцессный сигнал ---
+
+    def _touch_beacon(self):
+        if not self.beacon_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.beacon_path) or ".", exist_ok=True)
+            with open(self.beacon_path, "a"):
+                pass
+            os.utime(self.beacon_path, None)
+        except OSError as e:
+            logger.warning(f"Не удалось обновить маяк планировщика: {e}")
+
+    async def _beacon_loop(self):
+        """Держит маяк свежим, пока в процессе интерактивный запрос ждёт места."""
+        while self.waiting[Priority.INTERACTIVE] > 0:
+            self._touch_beacon()
+            await asyncio.sleep(self.beacon_ttl / 2)
+        self._beacon_task = None
+
+    def _signal_waiting(self):
+        if self._beacon_task is None:
+            self._touch_beacon()
+            self._beacon_task = asyncio.create_task(self._beacon_loop())
+
+    def external_pressure(self) -> bool:
+        """True, если интерактивный запрос ждёт места в другом процессе (свежий маяк)."""
+        if not self.beacon_path:
+            return False
+        try:
+            return time.time() - os.path.getmtime(self.beacon_path) < self.beacon_ttl
+        except OSError:
+            return False
+
+    # --- Выдача мест ---
+
+    def _total_running(self) -> int:
+        return self.running[Priority.INTERACTIVE] + self.running[Priority.BACKGROUND]
+
+    def _can_start(self, priority: Priority) -> bool:
+        if priority == Priority.INTERACTIVE:
+            return self._total_running() < self.capacity
+        if self.waiting[Priority.INTERACTIVE] > 0 or self.external_pressure():
+            return False
+        return self._total_running() < self.capacity - self.reserved
+
+    def _slot_indices(self, priority: Priority) -> List[int]:
+        """Фону доступны только общие места, интерактиву — сначала зарезервированные."""
+        shared = list(range(self.reserved, self.capacity))
+        return list(range(self.reserved)) + shared if priority == Priority.INTERACTIVE else shared
+
+    def _try_start(self, priority: Priority) -> bool:
+        if not self._can_start(priority):
+            return False
+        if self.slots is None:
+            return True
+        index = self.slots.try_acquire(self._slot_indices(priority))
+        if index is None:
+            return False
+        self._held[priority].append(index)
+        return True
+
+    def estimate_retry_after(self) -> int:
+        """Грубая оценка, через сколько секунд освободится место для нового запроса."""
+        avg_hold = sum(self._hold_times) / len(self._hold_times) if self._hold_times else 10.0
+        queued = self.waiting[Priority.INTERACTIVE] + 1
+        return max(1, math.ceil(avg_hold * queued / self.capacity))
+
+    def _reject(self, priority: Priority, reason: str):
+        self.rejected[priority] += 1
+        retry_after = self.estimate_retry_after()
+        logger.warning(f"Планировщик перегружен ({reason}), Retry-After={retry_after}с")
+        raise SchedulerOverloaded(reason, retry_after)
+
+    async def acquire(self, priority: Priority):
+        started = time.perf_counter()
+        deadline = started + self.queue_timeout if priority == Priority.INTERACTIVE else None
+        async with self._cond:
+            if (priority == Priority.INTERACTIVE and not self._can_start(priority)
+                    and self.waiting[priority] >= self.queue_depth):
+                self._reject(priority, "queue is full")
+            self.waiting[priority] += 1
+            try:
+                while not self._try_start(priority):
+                    if priority == Priority.INTERACTIVE:
+                        self._signal_waiting()
+                    timeout = min(self.beacon_ttl / 2, self.poll_interval) if self.slots else self.beacon_ttl / 2
+                    if deadline is not None:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self._reject(priority, "queue wait timeout")
+                        timeout = min(timeout, remaining)
+                    # Маяк и места соседних процессов не будят Condition, поэтому ждущие перепроверяют по таймауту
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting[priority] -= 1
+            self.running[priority] += 1
+            self.admitted[priority] += 1
+            self._wait_times[priority].append(time.perf_counter() - started)
+
+    async def release(self, priority: Priority):
+        async with self._cond:
+            self.running[priority] -= 1
+            if self._held[priority]:
+                self.slots.release(self._held[priority].pop())
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.BACKGROUND):
+        """Занимает одно место на время тяжёлого этапа."""
+        await self.acquire(priority)
+        held_from = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._hold_times.append(time.perf_counter() - held_from)
+            await self.release(priority)
+
+    @staticmethod
+    def _percentile(values, pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)
+        return round(ordered[max(0, index)], 3)
+
+    def snapshot(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "reserved_interactive": self.reserved,
+            "host_running": self.slots.in_use() if self.slots else self._total_running(),
+            "queue_depth": self.queue_depth,
+            "queue_timeout": self.queue_timeout,
+            "running": {p.name.lower(): n for p, n in self.running.items()},
+            "waiting": {p.name.lower(): n for p, n in self.waiting.items()},
+            "admitted": {p.name.lower(): n for p, n in self.admitted.items()},
+            "rejected": {p.name.lower(): n for p, n in self.rejected.items()},
+            "queue_wait_seconds": {
+                p.name.lower(): {
+                    "p50": self._percentile(self._wait_times[p], 50),
+                    "p95": self._percentile(self._wait_times[p], 95),
+                    "max": round(max(self._wait_times[p]), 3) if self._wait_times[p] else 0.0,
+                }
+                for p in Priority
+            },
+        }
+
+
+# Единый планировщик процесса: им пользуются и API (main.py), и конвейер
+scheduler = PriorityScheduler()
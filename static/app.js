@@ -4,9 +4,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Функция для загрузки закладок
     const loadBookmarks = () => {
-        fetch('/bookmarks')
+        fetch('/bookmarks?fields=id,title,url')
             .then(response => response.json())
-            .then(bookmarks => {
+            .then(page => {
+                const bookmarks = page.items;
                 bookmarksList.innerHTML = ''; // Очищаем список
                 if (bookmarks.length === 0) {
                     bookmarksList.innerHTML = '<li>Пока нет ни одной закладки.</li>';
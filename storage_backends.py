@@ -0,0 +1,336 @@
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from db import get_db, public_url
+
+# --- Бэкенды хранилища ассетов ---
+# supabase — бакет Supabase Storage (по умолчанию)
+# local    — каталог на диске, для разработки и офлайн-бенчмарков без Supabase
+# cached   — Supabase с локальным LRU-кэшем чтения/записи на диске
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+LOCAL_STORAGE_DIR = os.getenv("STORAGE_LOCAL_DIR", os.path.join("temp_screenshots", "storage"))
+LOCAL_STORAGE_PUBLIC_URL = os.getenv("STORAGE_LOCAL_PUBLIC_URL", "http://127.0.0.1:8000/storage")
+CACHE_DIR = os.getenv("STORAGE_CACHE_DIR", os.path.join("temp_screenshots", "storage_cache"))
+CACHE_MAX_BYTES = int(float(os.getenv("STORAGE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+# При переполнении кэш ужимается до этой доли max_bytes, чтобы не пересканировать каталог на каждой записи
+CACHE_EVICT_TO = 0.9
+# Как часто индекс перечитывается с диска, даже если свой объём процесса в норме (файлы соседей)
+CACHE_RESCAN_SECONDS = float(os.getenv("STORAGE_CACHE_RESCAN_SECONDS", "30"))
+
+
+class StorageBackend(ABC):
+    """Абстрактное хранилище объектов одного бакета (пути вида image/1.png)."""
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+
+    @abstractmethod
+    async def upload(self, path: str, data: bytes, file_options: Dict[str, Any]):
+        """Загружает объект (с перезаписью, если в file_options upsert)."""
+        pass
+
+    @abstractmethod
+    async def download(self, path: str) -> bytes:
+        pass
+
+    @abstractmethod
+    async def move(self, src: str, dst: str):
+        pass
+
+    @abstractmethod
+    async def remove(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Удаляет объекты. Возвращает [{"name": путь}] реально удалённых, как Storage API."""
+        pass
+
+    @abstractmethod
+    async def list(self, folder: str, limit: int = 1000, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Страница объектов папки, отсортированная по имени:
+        [{"name", "id", "updated_at", "metadata": {"size", "eTag"}}]; у подпапок id и metadata — None.
+        """
+        pass
+
+    @abstractmethod
+    def public_url(self, path: str) -> str:
+        pass
+
+    async def changed_since(self, since: Optional[str]) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Объекты, изменённые после since ([{"name", "size", "sha256", "updated_at"}]),
+        и общее число объектов бакета — без постраничного обхода папок.
+        None — бэкенд так не умеет, и инвентарь обходит бакет через list().
+        """
+        return None
+
+
+class SupabaseStorage(StorageBackend):
+    async def _bucket(self):
+        return (await get_db()).storage.from_(self.bucket)
+
+    async def upload(self, path, data, file_options):
+        await (await self._bucket()).upload(path=path, file=data, file_options=file_options)
+
+    async def download(self, path):
+        return await (await self._bucket()).download(path)
+
+    async def move(self, src, dst):
+        await (await self._bucket()).move(src, dst)
+
+    async def remove(self, paths):
+        return await (await self._bucket()).remove(paths) or []
+
+    async def list(self, folder, limit=1000, offset=0):
+        return await (await self._bucket()).list(folder, {
+            "limit": limit, "offset": offset, "sortBy": {"column": "name", "order": "asc"},
+        })
+
+    def public_url(self, path):
+        return public_url(path, self.bucket)
+
+    async def changed_since(self, since):
+        # storage.objects через RPC (миграция storage_objects_changed): один запрос вместо обхода бакета
+        res = await (await get_db()).rpc("storage_objects_changed", {"p_bucket": self.bucket, "p_since": since}).execute()
+        data = res.data or {}
+        return data.get("objects") or [], data.get("total") or 0
+
+
+class LocalStorage(StorageBackend):
+    """Бакет как каталог <root>/<bucket>/ на диске."""
+
+    def __init__(self, bucket: str, root: str = LOCAL_STORAGE_DIR, base_url: str = LOCAL_STORAGE_PUBLIC_URL):
+        super().__init__(bucket)
+        self.root = os.path.abspath(os.path.join(root, bucket))
+        self.base_url = base_url
+        os.makedirs(self.root, exist_ok=True)
+
+    def file_path(self, path: str) -> str:
+        full = os.path.abspath(os.path.join(self.root, path))
+        if not full.startswith(self.root + os.sep):
+            raise ValueError(f"Путь выходит за пределы бакета: {path}")
+        return full
+
+    def _write(self, path: str, data: bytes):
+        full = self.file_path(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        tmp = f"{full}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, full)
+
+    def _read(self, path: str) -> bytes:
+        with open(self.file_path(path), "rb") as f:
+            return f.read()
+
+    async def upload(self, path, data, file_options):
+        if os.path.exists(self.file_path(path)) and str(file_options.get("upsert", "false")).lower() != "true":
+            raise FileExistsError(f"Объект уже существует: {path}")
+        await asyncio.to_thread(self._write, path, data)
+
+    async def download(self, path):
+        return await asyncio.to_thread(self._read, path)
+
+    async def move(self, src, dst):
+        full_dst = self.file_path(dst)
+        os.makedirs(os.path.dirname(full_dst), exist_ok=True)
+        os.replace(self.file_path(src), full_dst)
+
+    async def remove(self, paths):
+        removed = []
+        for path in paths:
+            try:
+                os.remove(self.file_path(path))
+                removed.append({"name": path})
+            except FileNotFoundError:
+                pass
+        return removed
+
+    async def list(self, folder, limit=1000, offset=0):
+        base = self.file_path(folder) if folder else self.root
+        if not os.path.isdir(base):
+            return []
+        names = sorted(os.listdir(base))[offset:offset + limit]
+        items = []
+        for name in names:
+            full = os.path.join(base, name)
+            if os.path.isdir(full):
+                items.append({"name": name, "id": None, "metadata": None})
+            elif not name.endswith(".tmp"):
+                stat = os.stat(full)
+                items.append({
+                    "name": name, "id": name,
+                    "updated_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+                    "metadata": {"size": stat.st_size, "eTag": f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'},
+                })
+        return items
+
+    def public_url(self, path):
+        return f"{self.base_url.rstrip('/')}/{self.bucket}/{path}"
+
+
+class CachedStorage(StorageBackend):
+    """
+    Удалённое хранилище с локальным LRU-кэшем на диске (write-through).
+
+    Запись идёт в удалённый бакет и сразу в кэш; чтение сначала из кэша.
+    Объём кэша ограничен max_bytes: при переполнении вытесняются давно
+    не читанные объекты. Индекс LRU восстанавливается по mtime при старте.
+
+    Каталог кэша общий для всех процессов (API, воркеры конвейера), а индекс в памяти
+    у каждого свой. Поэтому порядок LRU ведётся через mtime файлов (чтение его обновляет),
+    и индекс перечитывается с диска при переполнении и не реже раза в rescan_interval:
+    объём считается по файлам всех процессов, а вытесняются давно не читанные кем-либо.
+    Между пересканированиями общий объём может ненадолго превысить max_bytes, а файл,
+    удалённый соседом, просто читается заново.
+    """
+
+    def __init__(self, remote: StorageBackend, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 rescan_interval: float = CACHE_RESCAN_SECONDS):
+        super().__init__(remote.bucket)
+        self.remote = remote
+        self.cache = LocalStorage(remote.bucket, root=cache_dir)
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self._scanned_at = 0.0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        self._rescan()
+        self._evict()
+
+    def _rescan(self):
+        # При равных mtime (грубая точность ФС) порядок решает собственный индекс процесса
+        rank = {path: i for i, path in enumerate(self._entries)}
+        self._scanned_at = time.monotonic()
+        found = []
+        for dirpath, _, files in os.walk(self.cache.root):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                full = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(full)
+                except FileNotFoundError:
+                    continue  # вытеснен соседним процессом
+                path = os.path.relpath(full, self.cache.root).replace(os.sep, "/")
+                found.append((stat.st_mtime_ns, rank.get(path, -1), path, stat.st_size))
+        self._entries = OrderedDict((path, size) for _, _, path, size in sorted(found))
+        self._size = sum(self._entries.values())
+
+    def _remember(self, path: str, size: int):
+        self._forget(path)
+        self._entries[path] = size
+        self._size += size
+        self._evict()
+
+    def _forget(self, path: str):
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._size -= size
+
+    def _evict(self):
+        if self._size <= self.max_bytes and time.monotonic() - self._scanned_at < self.rescan_interval:
+            return
+        self._rescan()
+        if self._size <= self.max_bytes:
+            return
+        target = self.max_bytes * CACHE_EVICT_TO
+        while self._size > target and self._entries:
+            path, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self.cache.file_path(path))
+            except FileNotFoundError:
+                pass
+
+    async def _store(self, path: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        try:
+            await self.cache.upload(path, data, {"upsert": "true"})
+            self._remember(path, len(data))
+        except OSError as e:
+            # Кэш — только ускорение: сбой диска не должен ронять запрос
+            logger.warning(f"Кэш хранилища: не удалось записать {path}: {e}")
+
+    async def upload(self, path, data, file_options):
+        await self.remote.upload(path, data, file_options)
+        await self._store(path, data)
+
+    async def download(self, path):
+        if path in self._entries:
+            try:
+                data = await self.cache.download(path)
+                self._entries.move_to_end(path)
+                os.utime(self.cache.file_path(path))
+                self.hits += 1
+                return data
+            except FileNotFoundError:
+                self._forget(path)
+        self.misses += 1
+        data = await self.remote.download(path)
+        await self._store(path, data)
+        return data
+
+    async def move(self, src, dst):
+        await self.remote.move(src, dst)
+        if src in self._entries:
+            size = self._entries[src]
+            self._forget(src)
+            try:
+                await self.cache.move(src, dst)
+                self._remember(dst, size)
+            except OSError:
+                pass
+
+    async def remove(self, paths):
+        removed = await self.remote.remove(paths)
+        await self.cache.remove([p for p in paths if p in self._entries])
+        for path in paths:
+            self._forget(path)
+        return removed
+
+    async def list(self, folder, limit=1000, offset=0):
+        return await self.remote.list(folder, limit, offset)
+
+    async def changed_since(self, since):
+        return await self.remote.changed_since(since)
+
+    def public_url(self, path):
+        return self.remote.public_url(path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"objects": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+_backends: Dict[str, StorageBackend] = {}
+
+
+def create_storage(bucket: str, kind: Optional[str] = None) -> StorageBackend:
+    kind = kind or STORAGE_BACKEND
+    if kind == "local":
+        return LocalStorage(bucket)
+    if kind == "cached":
+        return CachedStorage(SupabaseStorage(bucket))
+    if kind == "supabase":
+        return SupabaseStorage(bucket)
+    raise ValueError(f"Неизвестный STORAGE_BACKEND: {kind}")
+
+
+def get_storage(bucket: str = "screenshots") -> StorageBackend:
+    """Хранилище бакета по STORAGE_BACKEND (один экземпляр на процесс)."""
+    if bucket not in _backends:
+        _backends[bucket] = create_storage(bucket)
+        logger.info(f"🗄 Хранилище '{bucket}': {_backends[bucket].__class__.__name__}.")
+    return _backends[bucket]
@@ -0,0 +1,219 @@
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+# --- Инвентарь объектов хранилища ---
+# Локальный манифест {путь: размер, sha256, updated_at} бакета screenshots.
+# Обновляется инкрементально: из базы берутся только объекты, изменённые после прошлого
+# обновления (storage.objects через RPC), полный обход бакета — только при расхождении
+# числа объектов или у бэкендов без changed_since. Аудит и поиск сирот работают по манифесту.
+INVENTORY_PATH = os.getenv("STORAGE_INVENTORY_PATH", os.path.join("temp_screenshots", "storage_inventory.json"))
+INVENTORY_FOLDERS = ["", "image", "html", "markdown", "temp", "cas"]
+LIST_PAGE_SIZE = 1000
+# temp/* старше этого срока считаем брошенными (process_url без finalize)
+TEMP_MAX_AGE = float(os.getenv("STORAGE_TEMP_MAX_AGE_HOURS", "24")) * 3600
+
+# Раскладка ассетов закладки: image/{id}.png, html/{id}.html, markdown/{id}.md
+# и {id}.png в корне (так грузит конвейер)
+BOOKMARK_ASSET_RE = re.compile(r"^(?:(?P<folder>image|html|markdown)/)?(?P<id>\d+)\.(?:png|html|md)$")
+EXPECTED_FOLDER_EXT = {"image": ".png", "html": ".html", "markdown": ".md", None: ".png"}
+# Общие объекты, которые выглядят как ассеты закладки, но сиротами не бывают:
+# image/102.png — заглушка скриншота во фронтенде (BookmarkCard.vue)
+SHARED_PATHS = {"image/102.png"}
+
+
+def bookmark_id_of(path: str) -> Optional[int]:
+    """id закладки, которой принадлежит объект, или None для чужих путей."""
+    match = BOOKMARK_ASSET_RE.match(path)
+    if not match or not path.endswith(EXPECTED_FOLDER_EXT[match.group("folder")]):
+        return None
+    return int(match.group("id"))
+
+
+def content_hash_of(path: str, sha256: Optional[str]) -> Optional[str]:
+    """sha256 содержимого: из метаданных объекта, а у объектов CAS — из имени."""
+    if sha256:
+        return sha256
+    if path.startswith("cas/"):
+        return os.path.splitext(os.path.basename(path))[0]
+    return None
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class StorageInventory:
+    def __init__(self, storage, path: str = INVENTORY_PATH):
+        self.storage = storage
+        self.path = path
+        self.objects: Dict[str, dict] = {}
+        self.refreshed_at: Optional[str] = None
+        # Наибольший updated_at из storage.objects: с него начинается следующее обновление
+        self.cursor: Optional[str] = None
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("bucket") == self.storage.bucket:
+            self.objects = data.get("objects", {})
+            self.refreshed_at = data.get("refreshed_at")
+            self.cursor = data.get("cursor")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"bucket": self.storage.bucket, "refreshed_at": self.refreshed_at,
+                       "cursor": self.cursor, "objects": self.objects}, f)
+        os.replace(tmp, self.path)
+
+    async def _walk(self, folder: str):
+        """Все объекты папки, включая вложенные (cas/ab/...)."""
+        offset = 0
+        while True:
+            page = await self.storage.list(folder, limit=LIST_PAGE_SIZE, offset=offset)
+            for item in page:
+                name = item["name"]
+                if name == ".emptyFolderPlaceholder":
+                    continue
+                path = f"{folder}/{name}" if folder else name
+                if item.get("id") is None:
+                    # Подпапки корня обходятся отдельно по INVENTORY_FOLDERS
+                    if folder:
+                        async for sub in self._walk(path):
+                            yield sub
+                    continue
+                yield path, item
+            if len(page) < LIST_PAGE_SIZE:
+                break
+            offset += LIST_PAGE_SIZE
+
+    def _apply(self, path: str, entry: dict, stats: Dict[str, int]):
+        old = self.objects.get(path)
+        if old is None:
+            stats["added"] += 1
+        elif old != entry:
+            stats["changed"] += 1
+        else:
+            return
+        self.objects[path] = entry
+
+    def _drop_missing(self, seen: Set[str], stats: Dict[str, int]):
+        for path in set(self.objects) - seen:
+            del self.objects[path]
+            stats["removed"] += 1
+
+    async def _refresh_from_changes(self, full: bool, stats: Dict[str, int]) -> bool:
+        """Обновление по storage.objects. False — бэкенд так не умеет, нужен обход бакета."""
+        since = None if full else self.cursor
+        changes = await self.storage.changed_since(since)
+        if changes is None:
+            return False
+        rows, total = changes
+        for row in rows:
+            self._apply(row["name"], {"size": row.get("size") or 0,
+                                      "sha256": content_hash_of(row["name"], row.get("sha256")),
+                                      "updated_at": row.get("updated_at")}, stats)
+            if row.get("updated_at") and (self.cursor is None or row["updated_at"] > self.cursor):
+                self.cursor = row["updated_at"]
+        if since is None:
+            self._drop_missing({row["name"] for row in rows}, stats)
+        elif len(self.objects) != total:
+            # Удалённые объекты в выборку по updated_at не попадают — берём полный список одним запросом
+            logger.info(f"🗂 Число объектов разошлось ({len(self.objects)} в манифесте, {total} в бакете), полная сверка.")
+            return await self._refresh_from_changes(True, stats)
+        return True
+
+    async def _refresh_by_walk(self, stats: Dict[str, int]):
+        seen: Set[str] = set()
+        for folder in INVENTORY_FOLDERS:
+            async for path, item in self._walk(folder):
+                meta = item.get("metadata") or {}
+                seen.add(path)
+                self._apply(path, {"size": meta.get("size") or meta.get("contentLength") or 0,
+                                   "sha256": content_hash_of(path, meta.get("sha256")),
+                                   "updated_at": item.get("updated_at")}, stats)
+        self._drop_missing(seen, stats)
+
+    async def refresh(self, full: bool = False) -> Dict[str, int]:
+        """
+        Применяет к манифесту только разницу с бакетом: объекты, изменённые после прошлого
+        обновления (full=True — сверка со всем бакетом). Бэкенды без changed_since
+        (или без прав на него) обходятся целиком.
+        """
+        stats = {"added": 0, "changed": 0, "removed": 0, "total": 0}
+        try:
+            from_changes = await self._refresh_from_changes(full, stats)
+        except Exception as e:
+            # RPC закрыт для anon/authenticated: без сервисного ключа остаётся обход бакета
+            logger.warning(f"Выборка изменений бакета недоступна ({e}), обходим бакет целиком.")
+            from_changes = False
+        if not from_changes:
+            await self._refresh_by_walk(stats)
+        stats["total"] = len(self.objects)
+        self.refreshed_at = datetime.now(timezone.utc).isoformat()
+        self.save()
+        logger.info(f"🗂 Инвентарь '{self.storage.bucket}': +{stats['added']} ~{stats['changed']} -{stats['removed']}, всего {stats['total']}.")
+        return stats
+
+    def forget(self, paths: Iterable[str]):
+        for path in paths:
+            self.objects.pop(path, None)
+
+    def summary(self) -> Dict[str, dict]:
+        """Число объектов и объём по папкам — мгновенно, по манифесту."""
+        result: Dict[str, dict] = {}
+        for path, entry in self.objects.items():
+            folder = path.split("/", 1)[0] if "/" in path else "/"
+            bucket = result.setdefault(folder, {"count": 0, "bytes": 0})
+            bucket["count"] += 1
+            bucket["bytes"] += entry.get("size") or 0
+        return result
+
+    def find_orphans(self, bookmark_ids: Set[int], referenced_hashes: Optional[Set[str]] = None,
+                     now: Optional[float] = None, temp_max_age: float = TEMP_MAX_AGE) -> List[str]:
+        """
+        Объекты, которым нет хозяина: ассеты удалённых закладок, брошенные temp/*
+        и (если известны ссылки) старые объекты CAS без asset_refs. SHARED_PATHS не трогаются.
+        """
+        now = time.time() if now is None else now
+        orphans = []
+        for path, entry in self.objects.items():
+            if path in SHARED_PATHS:
+                continue
+            if path.startswith("temp/"):
+                updated = _timestamp(entry.get("updated_at"))
+                if updated is not None and now - updated > temp_max_age:
+                    orphans.append(path)
+            elif path.startswith("cas/"):
+                # Свежий объект CAS может ещё ждать finalize — его не трогаем
+                updated = _timestamp(entry.get("updated_at"))
+                if referenced_hashes is not None and updated is not None and now - updated > temp_max_age:
+                    digest = os.path.splitext(os.path.basename(path))[0]
+                    if digest not in referenced_hashes:
+                        orphans.append(path)
+            else:
+                bookmark_id = bookmark_id_of(path)
+                if bookmark_id is not None and bookmark_id not in bookmark_ids:
+                    orphans.append(path)
+        return sorted(orphans)
+
+    def find_missing_images(self, processed_ids: Set[int], referenced_images: Optional[Set[int]] = None) -> List[int]:
+        """Обработанные закладки без скриншота ни в image/, ни в корне, ни в CAS."""
+        have = {bookmark_id_of(p) for p in self.objects if p.endswith(".png")}
+        have |= referenced_images or set()
+        return sorted(i for i in processed_ids if i not in have)
@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional
+
+from loguru import logger
+
+from storage_backends import get_storage
+
+# --- Пакетные операции со Storage ---
+STORAGE_BUCKET = "screenshots"
+# Сколько запросов к Storage одного пакета идут одновременно
+STORAGE_CONCURRENCY = int(os.getenv("STORAGE_CONCURRENCY", "8"))
+
+# Текстовые артефакты (HTML, markdown) храним в gzip: страницы по 0.3–2 МБ сжимаются в 5–10 раз
+COMPRESS_TEXT_ARTIFACTS = os.getenv("STORAGE_COMPRESS_TEXT", "1") == "1"
+COMPRESSIBLE_TYPES = {"text/html", "text/markdown"}
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_compressed(data: bytes) -> bool:
+    return data[:2] == GZIP_MAGIC
+
+
+def compress_artifact(data: bytes) -> bytes:
+    """gzip без метки времени: одинаковый текст даёт одинаковые байты."""
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def decode_artifact(data: bytes) -> bytes:
+    """Распаковывает артефакт, если он сжат (по сигнатуре gzip); старые объекты отдаёт как есть."""
+    return gzip.decompress(data) if is_compressed(data) else data
+
+
+def artifact_upload(data: bytes, content_type: str, compress: bool = COMPRESS_TEXT_ARTIFACTS):
+    """
+    Готовит тело и file_options для загрузки артефакта.
+    В пользовательских метаданных объекта — sha256 несжатого содержимого (по нему
+    storage_inventory сравнивает объекты) и отметка сжатия (content-encoding),
+    а не HTTP-заголовок: иначе Storage и браузер начнут распаковывать сами.
+    """
+    metadata = {"sha256": hashlib.sha256(decode_artifact(data)).hexdigest()}
+    options = {"content-type": content_type, "upsert": "true", "metadata": metadata}
+    if compress and content_type in COMPRESSIBLE_TYPES and not is_compressed(data):
+        data = compress_artifact(data)
+        metadata["content-encoding"] = "gzip"
+    return data, options
+
+
+class StorageBundle:
+    """
+    Набор загрузок, перемещений и удалений в бакете, выполняемый одним заходом.
+
+    Операции идут параллельно через хранилище бакета (storage_backends.get_storage()),
+    поэтому этап хранения запроса занимает одно время ответа вместо трёх.
+    Ошибка одной операции не отменяет остальные: run() возвращает
+    словарь {путь в бакете: текст ошибки или None}.
+    """
+
+    def __init__(self, bucket: str = STORAGE_BUCKET, concurrency: int = STORAGE_CONCURRENCY):
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self._uploads = []  # (file_path, storage_path, content_type)
+        self._moves = []    # (src, dst)
+        self._removes = []  # storage_path
+        self._calls = []    # (storage_path, фабрика корутины) — произвольные операции
+        self.results: Dict[str, Optional[str]] = {}
+
+    def upload(self, file_path: str, storage_path: str, content_type: str):
+        self._uploads.append((file_path, storage_path, content_type))
+        return self
+
+    def move(self, src: str, dst: str):
+        self._moves.append((src, dst))
+        return self
+
+    def remove(self, storage_path: str):
+        self._removes.append(storage_path)
+        return self
+
+    def call(self, storage_path: str, factory):
+        """Добавляет произвольную асинхронную операцию над объектом (например, загрузку в CAS)."""
+        self._calls.append((storage_path, factory))
+        return self
+
+    def __len__(self):
+        return len(self._uploads) + len(self._moves) + len(self._removes) + len(self._calls)
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return {path: error for path, error in self.results.items() if error}
+
+    async def _upload(self, storage, file_path: str, storage_path: str, content_type: str):
+        with open(file_path, "rb") as f:
+            data, options = artifact_upload(f.read(), content_type)
+        await storage.upload(storage_path, data, options)
+
+    async def run(self) -> Dict[str, Optional[str]]:
+        if not len(self):
+            return {}
+        storage = get_storage(self.bucket)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def guarded(path: str, coro):
+            async with semaphore:
+                try:
+                    await coro
+                    self.results[path] = None
+                except Exception as e:
+                    self.results[path] = str(e) or e.__class__.__name__
+
+        tasks = [guarded(dst, self._upload(storage, src, dst, ctype)) for src, dst, ctype in self._uploads]
+        tasks += [guarded(dst, storage.move(src, dst)) for src, dst in self._moves]
+        tasks += [guarded(path, factory()) for path, factory in self._calls]
+        if self._removes:
+            # Удаление в Storage и так пакетное: один запрос на все пути
+            tasks.append(self._run_remove(storage, semaphore))
+        await asyncio.gather(*tasks)
+
+        if self.errors:
+            logger.warning(f"⚠️ Storage: {len(self.errors)} из {len(self.results)} операций не удались: {self.errors}")
+        return self.results
+
+    async def _run_remove(self, storage, semaphore):
+        async with semaphore:
+            try:
+                removed = await storage.remove(self._removes)
+            except Exception as e:
+                for path in self._removes:
+                    self.results[path] = str(e) or e.__class__.__name__
+                return
+        # API возвращает только реально удалённые объекты — остальных в бакете не было
+        removed_names = {item.get("name") for item in removed or [] if isinstance(item, dict)}
+        for path in self._removes:
+            self.results[path] = None if path in removed_names else "not found"
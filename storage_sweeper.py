@@ -0,0 +1,134 @@
+import asyncio
+import sys
+
+from loguru import logger
+
+from db import get_db, use_service_role
+from storage_backends import get_storage
+from storage_inventory import StorageInventory
+from storage_ops import StorageBundle
+
+# Сверка хранилища с таблицей bookmarks: сироты и закладки без скриншотов.
+# Запуск: python storage_sweeper.py [--delete] [--refresh | --full-refresh]
+#   --delete        удалить найденных сирот (пачками)
+#   --refresh       сначала применить к манифесту изменения бакета с прошлого обновления
+#   --full-refresh  сверить манифест со всем бакетом
+# По умолчанию работа идёт по сохранённому манифесту (он строится при первом запуске).
+
+BUCKET = "screenshots"
+PAGE_SIZE = 1000
+REMOVE_BATCH = 1000
+
+
+async def load_bookmark_ids(db):
+    """Все id закладок и id обработанных (постранично по ключу id)."""
+    all_ids, processed = set(), set()
+    last_id = 0
+    while True:
+        res = await db.table("bookmarks").select("id,is_processed") \
+            .gt("id", last_id).order("id").limit(PAGE_SIZE).execute()
+        rows = res.data or []
+        for row in rows:
+            all_ids.add(row["id"])
+            if row.get("is_processed"):
+                processed.add(row["id"])
+        if len(rows) < PAGE_SIZE:
+            return all_ids, processed
+        last_id = rows[-1]["id"]
+
+
+async def load_asset_refs(db):
+    """Хэши объектов CAS, на которые есть ссылки, и id закладок со скриншотом в CAS."""
+    hashes, image_ids = set(), set()
+    offset = 0
+    try:
+        while True:
+            res = await db.table("asset_refs").select("bookmark_id,kind,hash") \
+                .order("bookmark_id").order("kind").range(offset, offset + PAGE_SIZE - 1).execute()
+            rows = res.data or []
+            for row in rows:
+                hashes.add(row["hash"])
+                if row["kind"] == "image":
+                    image_ids.add(row["bookmark_id"])
+            if len(rows) < PAGE_SIZE:
+                return hashes, image_ids
+            offset += PAGE_SIZE
+    except Exception as e:
+        # Без таблицы ссылок объекты CAS не трогаем вовсе
+        logger.warning(f"asset_refs недоступна ({e}): объекты CAS пропускаются.")
+        return None, set()
+
+
+async def still_referenced(db, paths):
+    """
+    Объекты CAS из пачки, на которые успела появиться ссылка после загрузки asset_refs
+    (finalize во время обхода) — их удалять нельзя.
+    """
+    hashes = {path.rsplit("/", 1)[-1].split(".")[0]: path for path in paths if path.startswith("cas/")}
+    if not hashes:
+        return set()
+    res = await db.table("asset_refs").select("hash").in_("hash", list(hashes)).execute()
+    return {hashes[row["hash"]] for row in res.data or []}
+
+
+async def delete_orphans(inventory: StorageInventory, orphans):
+    db = await get_db()
+    deleted = 0
+    for i in range(0, len(orphans), REMOVE_BATCH):
+        batch = orphans[i:i + REMOVE_BATCH]
+        referenced = await still_referenced(db, batch)
+        if referenced:
+            logger.info(f"Пропущено объектов CAS с новыми ссылками: {len(referenced)}.")
+        bundle = StorageBundle(bucket=BUCKET)
+        for path in batch:
+            if path not in referenced:
+                bundle.remove(path)
+        results = await bundle.run()
+        # "not found" — объекта уже нет, из манифеста его тоже убираем
+        gone = [path for path, error in results.items() if error in (None, "not found")]
+        inventory.forget(gone)
+        deleted += sum(1 for path in gone if results[path] is None)
+
+        cas_hashes = [path.rsplit("/", 1)[-1].split(".")[0] for path in gone if path.startswith("cas/")]
+        if cas_hashes:
+            await db.table("asset_blobs").delete().eq("bucket", BUCKET).in_("hash", cas_hashes).execute()
+    inventory.save()
+    return deleted
+
+
+async def sweep(delete: bool = False, refresh: bool = False, full: bool = False):
+    inventory = StorageInventory(get_storage(BUCKET))
+    if refresh or full or not inventory.refreshed_at:
+        await inventory.refresh(full=full)
+    else:
+        logger.info(f"🗂 Инвентарь от {inventory.refreshed_at}: {len(inventory.objects)} объектов.")
+
+    for folder, info in sorted(inventory.summary().items()):
+        logger.info(f"   {folder}: {info['count']} объектов, {info['bytes'] / 1e6:.1f} МБ")
+
+    # id читаем после инвентаря: всё, что попало в манифест, уже имеет свою закладку
+    db = await get_db()
+    bookmark_ids, processed_ids = await load_bookmark_ids(db)
+    referenced_hashes, cas_image_ids = await load_asset_refs(db)
+
+    orphans = inventory.find_orphans(bookmark_ids, referenced_hashes)
+    missing = inventory.find_missing_images(processed_ids, cas_image_ids)
+    orphan_bytes = sum(inventory.objects[p].get("size") or 0 for p in orphans)
+
+    logger.info(f"🧹 Сирот: {len(orphans)} ({orphan_bytes / 1e6:.1f} МБ).")
+    for path in orphans[:20]:
+        logger.info(f"   {path}")
+    if missing:
+        logger.warning(f"🖼 Обработанных закладок без скриншота: {len(missing)} (первые: {missing[:20]}).")
+
+    if delete and orphans:
+        deleted = await delete_orphans(inventory, orphans)
+        logger.success(f"Удалено {deleted} объектов.")
+    elif orphans:
+        logger.info("Запустите с --delete, чтобы удалить сирот.")
+
+
+if __name__ == "__main__":
+    # storage_objects_changed и удаление чужих объектов доступны только сервисному ключу
+    use_service_role()
+    asyncio.run(sweep(delete="--delete" in sys.argv, refresh="--refresh" in sys.argv, full="--full-refresh" in sys.argv))
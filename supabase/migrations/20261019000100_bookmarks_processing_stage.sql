@@ -0,0 +1,4 @@
+-- Маркер последнего пройденного этапа конвейера (crawled / rendered / converted).
+-- Заполняется, когда обработка прервалась, и сбрасывается в NULL после успеха.
+alter table public.bookmarks
+    add column if not exists processing_stage text;
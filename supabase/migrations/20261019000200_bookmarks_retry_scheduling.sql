@@ -0,0 +1,11 @@
+-- Повторы конвейера с экспоненциальной паузой и dead-letter.
+alter table public.bookmarks
+    add column if not exists attempts integer not null default 0,
+    add column if not exists next_attempt_at timestamptz,
+    add column if not exists last_error text,
+    add column if not exists dead_letter boolean not null default false;
+
+-- Очередь конвейера: необработанные (categories = []) и не в dead-letter
+create index if not exists bookmarks_conveyor_queue_idx
+    on public.bookmarks (next_attempt_at nulls first, id)
+    where dead_letter = false and categories = '[]'::jsonb;
@@ -0,0 +1,17 @@
+-- Будильник конвейера: NOTIFY на канал bookmarks_queue при вставке закладок.
+-- Триггер уровня оператора, чтобы массовый импорт давал одно уведомление, а не тысячи.
+create or replace function public.notify_bookmarks_queue()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform pg_notify('bookmarks_queue', '');
+    return null;
+end;
+$$;
+
+drop trigger if exists bookmarks_queue_notify on public.bookmarks;
+create trigger bookmarks_queue_notify
+    after insert on public.bookmarks
+    for each statement
+    execute function public.notify_bookmarks_queue();
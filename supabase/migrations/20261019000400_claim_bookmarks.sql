@@ -0,0 +1,26 @@
+-- Атомарная выдача закладок воркерам конвейера.
+-- SKIP LOCKED не даёт двум воркерам взять одну строку, а next_attempt_at
+-- выступает арендой: если воркер умер, закладка вернётся в очередь после её истечения.
+create or replace function public.claim_bookmarks(p_limit integer default 1, p_lease_seconds integer default 900)
+returns table (id bigint, url text, attempts integer)
+language plpgsql
+as $$
+begin
+    return query
+    with picked as (
+        select b.id
+        from public.bookmarks b
+        where b.categories = '[]'::jsonb
+          and b.dead_letter = false
+          and (b.next_attempt_at is null or b.next_attempt_at <= now())
+        order by b.id
+        limit p_limit
+        for update skip locked
+    )
+    update public.bookmarks b
+       set next_attempt_at = now() + make_interval(secs => p_lease_seconds)
+      from picked
+     where b.id = picked.id
+    returning b.id::bigint, b.url::text, b.attempts::integer;
+end;
+$$;
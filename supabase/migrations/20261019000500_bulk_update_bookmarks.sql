@@ -0,0 +1,27 @@
+-- Пачечное обновление закладок одним запросом (буфер записи конвейера).
+-- p_rows: [{"id": 1, "summary": "...", ...}, ...]; обновляются только переданные поля.
+create or replace function public.bulk_update_bookmarks(p_rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    updated integer;
+begin
+    update public.bookmarks b
+       set title            = case when r ? 'title' then r->>'title' else b.title end,
+           summary          = case when r ? 'summary' then r->>'summary' else b.summary end,
+           categories       = case when r ? 'categories' then r->'categories' else b.categories end,
+           is_processed     = case when r ? 'is_processed' then (r->>'is_processed')::boolean else b.is_processed end,
+           processing_error = case when r ? 'processing_error' then r->>'processing_error' else b.processing_error end,
+           processing_stage = case when r ? 'processing_stage' then r->>'processing_stage' else b.processing_stage end,
+           attempts         = case when r ? 'attempts' then (r->>'attempts')::integer else b.attempts end,
+           next_attempt_at  = case when r ? 'next_attempt_at' then (r->>'next_attempt_at')::timestamptz else b.next_attempt_at end,
+           last_error       = case when r ? 'last_error' then r->>'last_error' else b.last_error end,
+           dead_letter      = case when r ? 'dead_letter' then (r->>'dead_letter')::boolean else b.dead_letter end
+      from jsonb_array_elements(p_rows) as e(r)
+     where b.id = (r->>'id')::bigint;
+
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
@@ -0,0 +1,8 @@
+-- Индекс под пагинацию GET /bookmarks по ключу (date_add DESC, id DESC).
+-- NULLS FIRST совпадает с порядком Postgres по умолчанию для DESC.
+create index if not exists bookmarks_date_add_id_idx
+    on public.bookmarks (date_add desc nulls first, id desc);
+
+create index if not exists bookmarks_processed_date_add_id_idx
+    on public.bookmarks (date_add desc nulls first, id desc)
+    where is_processed = true;
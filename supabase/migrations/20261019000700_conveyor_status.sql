@@ -0,0 +1,13 @@
+-- Статистика конвейера одним проходом вместо трёх count(*) по всей таблице
+create or replace function public.conveyor_status()
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'total', count(*),
+        'processed', count(*) filter (where is_processed),
+        'errors', count(*) filter (where processing_error is not null)
+    )
+    from public.bookmarks;
+$$;
@@ -0,0 +1,24 @@
+-- Контентно-адресуемое хранение ассетов (STORAGE_CAS=1, см. cas.py).
+-- asset_blobs: что уже лежит в бакете под cas/<hash>; проверяется перед загрузкой.
+create table if not exists public.asset_blobs (
+    bucket text not null default 'screenshots',
+    hash text not null,
+    path text not null,
+    size bigint,
+    content_type text,
+    created_at timestamptz not null default now(),
+    primary key (bucket, hash)
+);
+
+-- asset_refs: какой объект CAS принадлежит закладке (один на вид ассета)
+create table if not exists public.asset_refs (
+    bookmark_id bigint not null references public.bookmarks (id) on delete cascade,
+    kind text not null check (kind in ('image', 'html', 'markdown')),
+    hash text not null,
+    path text not null,
+    updated_at timestamptz not null default now(),
+    primary key (bookmark_id, kind)
+);
+
+-- Поиск закладок, ссылающихся на объект (и объектов без ссылок)
+create index if not exists asset_refs_hash_idx on public.asset_refs (hash);
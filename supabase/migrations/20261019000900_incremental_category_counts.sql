@@ -0,0 +1,119 @@
+-- Инкрементальные счётчики категорий: bookmarks_count меняется в той же транзакции,
+-- что и categories закладки (конвейер, create/delete_bookmark, импорт, правки из Nuxt).
+-- Закладка учитывается в категории и во всех её предках один раз, как в category_counts.recount_all().
+
+-- Категории вместе со всеми предками (union отсекает циклы в иерархии)
+create or replace function public.category_closure(p_names jsonb)
+returns setof text
+language sql
+stable
+as $$
+    with recursive up(name) as (
+        select c.name
+        from public.categories c
+        where c.name in (
+            select jsonb_array_elements_text(
+                case when jsonb_typeof(p_names) = 'array' then p_names else '[]'::jsonb end
+            )
+        )
+        union
+        select c.parent_category
+        from public.categories c
+        join up on c.name = up.name
+        where c.parent_category is not null
+    )
+    select name from up;
+$$;
+
+-- Ручная поправка для одной закладки: счётчики разницы между старым и новым набором
+create or replace function public.adjust_category_counts(p_old jsonb, p_new jsonb)
+returns void
+language sql
+as $$
+    update public.categories c
+    set bookmarks_count = coalesce(c.bookmarks_count, 0) + d.delta
+    from (
+        select name, sum(delta) as delta
+        from (
+            select name, 1 as delta from public.category_closure(p_new) as name
+            union all
+            select name, -1 from public.category_closure(p_old) as name
+        ) t
+        group by name
+        having sum(delta) <> 0
+    ) d
+    where c.name = d.name;
+$$;
+
+-- Триггеры уровня оператора: массовая вставка или bulk_update_bookmarks дают один UPDATE categories
+create or replace function public.bookmarks_category_counts()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' then
+        update public.categories c
+        set bookmarks_count = coalesce(c.bookmarks_count, 0) + d.delta
+        from (
+            select x.name, count(*) as delta
+            from new_rows n, lateral public.category_closure(n.categories) as x(name)
+            group by x.name
+        ) d
+        where c.name = d.name;
+    elsif tg_op = 'DELETE' then
+        update public.categories c
+        set bookmarks_count = coalesce(c.bookmarks_count, 0) - d.delta
+        from (
+            select x.name, count(*) as delta
+            from old_rows o, lateral public.category_closure(o.categories) as x(name)
+            group by x.name
+        ) d
+        where c.name = d.name;
+    else
+        -- Большинство UPDATE (аренда, попытки, summary) категории не трогают — они отсекаются сразу
+        update public.categories c
+        set bookmarks_count = coalesce(c.bookmarks_count, 0) + d.delta
+        from (
+            select name, sum(delta) as delta
+            from (
+                select x.name, 1 as delta
+                from old_rows o
+                join new_rows n on n.id = o.id
+                cross join lateral public.category_closure(n.categories) as x(name)
+                where o.categories is distinct from n.categories
+                union all
+                select x.name, -1
+                from old_rows o
+                join new_rows n on n.id = o.id
+                cross join lateral public.category_closure(o.categories) as x(name)
+                where o.categories is distinct from n.categories
+            ) t
+            group by name
+            having sum(delta) <> 0
+        ) d
+        where c.name = d.name;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists bookmarks_category_counts_ins on public.bookmarks;
+create trigger bookmarks_category_counts_ins
+    after insert on public.bookmarks
+    referencing new table as new_rows
+    for each statement
+    execute function public.bookmarks_category_counts();
+
+drop trigger if exists bookmarks_category_counts_upd on public.bookmarks;
+create trigger bookmarks_category_counts_upd
+    after update on public.bookmarks
+    referencing old table as old_rows new table as new_rows
+    for each statement
+    execute function public.bookmarks_category_counts();
+
+drop trigger if exists bookmarks_category_counts_del on public.bookmarks;
+create trigger bookmarks_category_counts_del
+    after delete on public.bookmarks
+    referencing old table as old_rows
+    for each statement
+    execute function public.bookmarks_category_counts();
@@ -0,0 +1,92 @@
+-- Нормализованная связь закладка–категория.
+-- bookmarks.categories (jsonb) остаётся источником правды для конвейера и ИИ;
+-- bookmark_categories ведут триггеры (dual-write), страницы категорий и счётчики читают её по индексу.
+create table if not exists public.bookmark_categories (
+    bookmark_id bigint not null references public.bookmarks (id) on delete cascade,
+    category_id bigint not null references public.categories (id) on delete cascade,
+    primary key (bookmark_id, category_id)
+);
+
+-- Страница категории: все закладки категории одним диапазоном индекса
+create index if not exists bookmark_categories_category_idx
+    on public.bookmark_categories (category_id, bookmark_id);
+
+-- Пересобирает связи для перечисленных закладок (используется триггером и backfill-скриптом)
+create or replace function public.sync_bookmark_categories(p_ids bigint[])
+returns integer
+language plpgsql
+as $$
+declare
+    inserted integer;
+begin
+    delete from public.bookmark_categories where bookmark_id = any(p_ids);
+
+    insert into public.bookmark_categories (bookmark_id, category_id)
+    select distinct b.id, c.id
+    from public.bookmarks b
+    cross join lateral jsonb_array_elements_text(
+        case when jsonb_typeof(b.categories) = 'array' then b.categories else '[]'::jsonb end
+    ) as e(name)
+    join public.categories c on c.name = e.name
+    where b.id = any(p_ids)
+    on conflict do nothing;
+
+    get diagnostics inserted = row_count;
+    return inserted;
+end;
+$$;
+
+create or replace function public.bookmarks_sync_categories()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' then
+        perform public.sync_bookmark_categories(array(
+            select id from new_rows where categories is not null and categories <> '[]'::jsonb
+        ));
+    else
+        perform public.sync_bookmark_categories(array(
+            select n.id from old_rows o join new_rows n on n.id = o.id
+            where o.categories is distinct from n.categories
+        ));
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists bookmarks_sync_categories_ins on public.bookmarks;
+create trigger bookmarks_sync_categories_ins
+    after insert on public.bookmarks
+    referencing new table as new_rows
+    for each statement
+    execute function public.bookmarks_sync_categories();
+
+drop trigger if exists bookmarks_sync_categories_upd on public.bookmarks;
+create trigger bookmarks_sync_categories_upd
+    after update on public.bookmarks
+    referencing old table as old_rows new table as new_rows
+    for each statement
+    execute function public.bookmarks_sync_categories();
+
+-- Новая категория сразу подхватывает закладки, у которых она уже указана
+create or replace function public.categories_link_bookmarks()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.bookmark_categories (bookmark_id, category_id)
+    select b.id, c.id
+    from new_rows c
+    join public.bookmarks b on b.categories ? c.name
+    on conflict do nothing;
+    return null;
+end;
+$$;
+
+drop trigger if exists categories_link_bookmarks on public.categories;
+create trigger categories_link_bookmarks
+    after insert on public.categories
+    referencing new table as new_rows
+    for each statement
+    execute function public.categories_link_bookmarks();
@@ -0,0 +1,27 @@
+-- Нормализованный URL для дедупликации при импорте (значение считает url_canon.normalize_url).
+-- Уникальный индекс позволяет импорту делать upsert ... on conflict do nothing
+-- вместо выгрузки всех URL из базы. NULL допускается и не конфликтует:
+-- строки без значения заполняет backfill_url_normalized.py.
+alter table public.bookmarks
+    add column if not exists url_normalized text;
+
+create unique index if not exists bookmarks_url_normalized_key
+    on public.bookmarks (url_normalized);
+
+-- Пачечная запись url_normalized для backfill: [{"id": 1, "url_normalized": "..."|null}, ...]
+create or replace function public.set_bookmarks_url_normalized(p_rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    updated integer;
+begin
+    update public.bookmarks b
+       set url_normalized = r->>'url_normalized'
+      from jsonb_array_elements(p_rows) as e(r)
+     where b.id = (r->>'id')::bigint;
+
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
@@ -0,0 +1,28 @@
+-- Полный пересчёт bookmarks_count одной транзакцией (category_counts.recount_all / check_drift(repair=True)).
+-- Пересчёт из Python читал закладки и писал categories разными запросами: триггеры
+-- incremental_category_counts, сработавшие между ними, затирались старым значением.
+-- Здесь запись в bookmarks блокируется до конца транзакции (SHARE не мешает чтению),
+-- поэтому подсчёт и UPDATE видят одно и то же состояние.
+create or replace function public.recount_category_counts()
+returns table (category_name text, new_count integer)
+language plpgsql
+as $$
+begin
+    lock table public.bookmarks in share mode;
+
+    return query
+    update public.categories c
+    set bookmarks_count = d.actual
+    from (
+        select cat.id, coalesce(t.cnt, 0)::integer as actual
+        from public.categories cat
+        left join (
+            select x.name, count(*) as cnt
+            from public.bookmarks b, lateral public.category_closure(b.categories) as x(name)
+            group by x.name
+        ) t on t.name = cat.name
+    ) d
+    where c.id = d.id and coalesce(c.bookmarks_count, 0) <> d.actual
+    returning c.name::text, c.bookmarks_count::integer;
+end;
+$$;
@@ -0,0 +1,23 @@
+-- Закладка без url_normalized не конфликтует в уникальном индексе (NULL <> NULL),
+-- и дубликат молча проходит весь конвейер. Все пути записи (POST /bookmarks,
+-- /api/bookmarks из попапа, импорт) считают ключ через url_canon.normalize_url —
+-- вставка без ключа значит, что пропущен новый путь записи, и отклоняется.
+-- UPDATE не проверяется: backfill_url_normalized.py временно снимает ключи.
+create or replace function public.bookmarks_require_url_normalized()
+returns trigger
+language plpgsql
+as $$
+begin
+    if new.url is not null and new.url <> '' and new.url_normalized is null then
+        raise exception 'bookmarks.url_normalized is required (url_canon.normalize_url)'
+            using errcode = 'not_null_violation';
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists bookmarks_require_url_normalized on public.bookmarks;
+create trigger bookmarks_require_url_normalized
+    before insert on public.bookmarks
+    for each row
+    execute function public.bookmarks_require_url_normalized();
@@ -0,0 +1,33 @@
+-- Изменения бакета для storage_inventory.py без постраничного обхода Storage API:
+-- объекты с updated_at позже p_since и общее число объектов (по нему видно удаления).
+-- sha256 пишет storage_ops.artifact_upload в пользовательские метаданные объекта.
+create or replace function public.storage_objects_changed(p_bucket text, p_since timestamptz default null)
+returns jsonb
+language sql
+stable
+security definer
+set search_path = ''
+as $$
+    select jsonb_build_object(
+        'total', (
+            select count(*)
+            from storage.objects o
+            where o.bucket_id = p_bucket and o.name not like '%.emptyFolderPlaceholder'
+        ),
+        'objects', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'name', o.name,
+                'size', coalesce((o.metadata->>'size')::bigint, 0),
+                'sha256', o.user_metadata->>'sha256',
+                'updated_at', o.updated_at
+            ))
+            from storage.objects o
+            where o.bucket_id = p_bucket
+              and o.name not like '%.emptyFolderPlaceholder'
+              and (p_since is null or o.updated_at >= p_since)
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- Список объектов — только для сервисного ключа (скрипты обслуживания)
+revoke execute on function public.storage_objects_changed(text, timestamptz) from public, anon, authenticated;
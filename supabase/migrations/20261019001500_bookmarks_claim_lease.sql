@@ -0,0 +1,58 @@
+-- Аренда взятой воркером закладки — отдельная колонка, а не next_attempt_at:
+-- next_attempt_at теперь означает только запланированный повтор, и арендованные
+-- строки больше не выглядят для воркеров как отложенные попытки.
+alter table public.bookmarks
+    add column if not exists leased_until timestamptz;
+
+create or replace function public.claim_bookmarks(p_limit integer default 1, p_lease_seconds integer default 900)
+returns table (id bigint, url text, attempts integer)
+language plpgsql
+as $$
+begin
+    return query
+    with picked as (
+        select b.id
+        from public.bookmarks b
+        where b.categories = '[]'::jsonb
+          and b.dead_letter = false
+          and (b.next_attempt_at is null or b.next_attempt_at <= now())
+          and (b.leased_until is null or b.leased_until <= now())
+        order by b.id
+        limit p_limit
+        for update skip locked
+    )
+    update public.bookmarks b
+       set leased_until = now() + make_interval(secs => p_lease_seconds)
+      from picked
+     where b.id = picked.id
+    returning b.id::bigint, b.url::text, b.attempts::integer;
+end;
+$$;
+
+-- Буфер записи конвейера снимает аренду вместе с результатом попытки
+create or replace function public.bulk_update_bookmarks(p_rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    updated integer;
+begin
+    update public.bookmarks b
+       set title            = case when r ? 'title' then r->>'title' else b.title end,
+           summary          = case when r ? 'summary' then r->>'summary' else b.summary end,
+           categories       = case when r ? 'categories' then r->'categories' else b.categories end,
+           is_processed     = case when r ? 'is_processed' then (r->>'is_processed')::boolean else b.is_processed end,
+           processing_error = case when r ? 'processing_error' then r->>'processing_error' else b.processing_error end,
+           processing_stage = case when r ? 'processing_stage' then r->>'processing_stage' else b.processing_stage end,
+           attempts         = case when r ? 'attempts' then (r->>'attempts')::integer else b.attempts end,
+           next_attempt_at  = case when r ? 'next_attempt_at' then (r->>'next_attempt_at')::timestamptz else b.next_attempt_at end,
+           leased_until     = case when r ? 'leased_until' then (r->>'leased_until')::timestamptz else b.leased_until end,
+           last_error       = case when r ? 'last_error' then r->>'last_error' else b.last_error end,
+           dead_letter      = case when r ? 'dead_letter' then (r->>'dead_letter')::boolean else b.dead_letter end
+      from jsonb_array_elements(p_rows) as e(r)
+     where b.id = (r->>'id')::bigint;
+
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
@@ -0,0 +1,71 @@
+import io
+
+import bookmarks_parser
+from bookmarks_parser import iter_chrome_bookmarks, parse_chrome_bookmarks
+
+EXPORT = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3 ADD_DATE="1" PERSONAL_TOOLBAR_FOLDER="true">Панель закладок</H3>
+    <DL><p>
+        <DT><H3>Разработка</H3>
+        <DL><p>
+            <DT><A HREF="https://fastapi.tiangolo.com/" ADD_DATE="100">FastAPI</A>
+            <DT><H3>Python &amp; Co</H3>
+            <DL><p>
+                <DT><A HREF="https://docs.python.org/?a=1&amp;b=2" ADD_DATE="200">Docs &amp; more</A>
+                <DT><A HREF="chrome://settings" ADD_DATE="1">Settings</A>
+            </DL><p>
+        </DL><p>
+        <DT><A HREF="https://news.example/" ADD_DATE="300">Новости</A>
+        <DT><H3>Полезное</H3>
+        <DL><p>
+            <DT><A HREF="https://fastapi.tiangolo.com/" ADD_DATE="500">FastAPI (новее)</A>
+        </DL><p>
+    </DL><p>
+</DL><p>
+"""
+
+
+def test_links_carry_full_folder_path():
+    links = list(iter_chrome_bookmarks(EXPORT))
+    by_title = {link["title"]: link for link in links}
+    assert by_title["Docs & more"]["folders"] == ("Панель закладок", "Разработка", "Python & Co")
+    assert by_title["Docs & more"]["url"] == "https://docs.python.org/?a=1&b=2"
+    assert by_title["Новости"]["folders"] == ("Панель закладок",)
+    assert by_title["FastAPI"]["add_date"] == 100
+
+
+def test_target_folders_include_nested_and_keep_newest_duplicate():
+    links = parse_chrome_bookmarks(EXPORT, ["Разработка", "Полезное"])
+    assert [link["url"] for link in links] == ["https://fastapi.tiangolo.com/", "https://docs.python.org/?a=1&b=2"]
+    assert links[0]["title"] == "FastAPI (новее)"
+    assert links[0]["folder"] == "Панель закладок/Полезное"
+
+
+def test_stream_split_into_tiny_chunks_gives_same_result(monkeypatch):
+    expected = parse_chrome_bookmarks(EXPORT, [])
+    monkeypatch.setattr(bookmarks_parser, "CHUNK_SIZE", 7)
+    assert parse_chrome_bookmarks(io.BytesIO(EXPORT.encode("utf-8")), []) == expected
+    assert len(expected) == 3
+
+
+def test_target_folders_from_env(monkeypatch):
+    monkeypatch.setenv("BOOKMARK_TARGET_FOLDERS", "Услуги, Разработка")
+    assert bookmarks_parser.folders_from_env(["x"]) == ["Услуги", "Разработка"]
+    monkeypatch.delenv("BOOKMARK_TARGET_FOLDERS")
+    assert bookmarks_parser.folders_from_env(["x"]) == ["x"]
+
+
+def test_unclosed_link_does_not_swallow_neighbours(monkeypatch):
+    broken = EXPORT.replace('ADD_DATE="100">FastAPI</A>', 'ADD_DATE="100">FastAPI')
+    for chunk_size in (7, 64 * 1024):
+        monkeypatch.setattr(bookmarks_parser, "CHUNK_SIZE", chunk_size)
+        titles = [link["title"] for link in iter_chrome_bookmarks(broken)]
+        # Пропадает только битая ссылка, папка «Python & Co» и её ссылки на месте
+        assert "FastAPI" not in titles
+        assert titles[:2] == ["Docs & more", "Settings"]
+        by_title = {link["title"]: link for link in iter_chrome_bookmarks(broken)}
+        assert by_title["Docs & more"]["folders"] == ("Панель закладок", "Разработка", "Python & Co")
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+
+from cache import AsyncTTLCache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    cache = AsyncTTLCache(ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"total": 1}
+
+    results = await asyncio.gather(*(cache.get("status", loader) for _ in range(20)))
+    assert calls == 1
+    assert all(r == {"total": 1} for r in results)
+
+
+@pytest.mark.asyncio
+async def test_expired_value_is_reloaded():
+    cache = AsyncTTLCache(ttl=0.01)
+    values = iter([1, 2])
+
+    async def loader():
+        return next(values)
+
+    assert await cache.get("k", loader) == 1
+    await asyncio.sleep(0.02)
+    assert await cache.get("k", loader) == 2
+    cache.invalidate("k")
+    cache.set("k", 5)
+    assert await cache.get("k", loader) == 5
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_refreshing():
+    cache = AsyncTTLCache(ttl=0.01)
+    values = iter([1, 2])
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        return next(values)
+
+    assert await cache.get_or_stale("menu", loader) == 1
+    await asyncio.sleep(0.02)
+    # Просрочено: сразу получаем старое значение, новое грузится в фоне
+    assert await cache.get_or_stale("menu", loader) == 1
+    await asyncio.sleep(0.03)
+    assert await cache.get_or_stale("menu", loader) == 2
+
+
+@pytest.mark.asyncio
+async def test_peek_does_not_load():
+    cache = AsyncTTLCache(ttl=0.01)
+    assert cache.peek("count") is None
+    cache.set("count", 7)
+    assert cache.peek("count") == 7
+    await asyncio.sleep(0.02)
+    assert cache.peek("count", -1) == -1
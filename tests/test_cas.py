@@ -0,0 +1,76 @@
+import pytest
+
+import cas
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db, self.table, self.filters, self.row = db, table, {}, None
+
+    def select(self, *_):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def limit(self, _):
+        return self
+
+    def upsert(self, row, **_):
+        self.row = row
+        return self
+
+    async def execute(self):
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.row is not None:
+            rows.append(self.row)
+            return type("Res", (), {"data": [self.row]})
+        found = [r for r in rows if all(r.get(k) == v for k, v in self.filters.items())]
+        return type("Res", (), {"data": found})
+
+
+class FakeDb:
+    def __init__(self):
+        self.tables = {}
+        self.uploads = []
+        self.storage = self
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def from_(self, bucket):
+        return self
+
+    async def upload(self, path, file, file_options):
+        self.uploads.append(path)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDb()
+
+    async def get_db():
+        return fake
+
+    monkeypatch.setattr(cas, "get_db", get_db)
+    monkeypatch.setattr(cas, "get_storage", lambda bucket: fake)
+    return fake
+
+
+def test_path_is_derived_from_content():
+    digest = cas.content_hash(b"same bytes")
+    path = cas.cas_path(digest, "image/png")
+    assert path == f"cas/{digest[:2]}/{digest}.png"
+    assert cas.is_cas_path(path) and not cas.is_cas_path("temp/x.png")
+    assert cas.digest_from_path(path) == digest
+
+
+@pytest.mark.asyncio
+async def test_identical_content_is_uploaded_once(db):
+    first = await cas.put_blob(b"<html>page</html>", "text/html")
+    second = await cas.put_blob(b"<html>page</html>", "text/html")
+    assert first[0] == second[0]
+    assert (first[2], second[2]) == (True, False)
+    assert db.uploads == [first[0]]
+    assert db.tables["asset_blobs"][0]["bucket"] == "screenshots"
@@ -0,0 +1,112 @@
+import pytest
+
+import category_counts
+from category_counts import aggregate_counts, build_parent_map, with_ancestors
+
+CATEGORIES = [
+    {"id": 1, "name": "Разработка", "slug": "razrabotka", "parent_category": None, "bookmarks_count": 0},
+    {"id": 2, "name": "Python", "slug": "python", "parent_category": "Разработка", "bookmarks_count": 5},
+    {"id": 3, "name": "Go", "slug": "go", "parent_category": "Разработка", "bookmarks_count": 1},
+    {"id": 4, "name": "Docker", "slug": "docker", "parent_category": None, "bookmarks_count": 1},
+]
+
+
+def test_parent_counts_each_bookmark_once():
+    parents = build_parent_map(CATEGORIES)
+    assert with_ancestors(["Python", "Go"], parents) == {"Python", "Go", "Разработка"}
+    counts = aggregate_counts([["Python", "Go"], ["Python"], [], None, ["Docker"]], parents)
+    assert counts == {"Python": 2, "Go": 1, "Разработка": 2, "Docker": 1}
+
+
+def test_cycles_in_hierarchy_do_not_hang():
+    assert with_ancestors(["a"], {"a": "b", "b": "a"}) == {"a", "b"}
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db, self.table, self.after, self.size, self.start = db, table, 0, None, 0
+
+    def select(self, *_):
+        return self
+
+    def order(self, *_):
+        return self
+
+    def gt(self, _, value):
+        self.after = value
+        return self
+
+    def limit(self, size):
+        self.size = size
+        return self
+
+    def range(self, start, end):
+        self.start, self.size = start, end - start + 1
+        return self
+
+    def upsert(self, rows, **_):
+        self.db.upserts.append(rows)
+        self.size = 0
+        return self
+
+    async def execute(self):
+        self.db.requests += 1
+        rows = self.db.rows[self.table]
+        if self.table == "bookmarks":
+            rows = [r for r in rows if r["id"] > self.after][:self.size]
+        else:
+            rows = rows[self.start:self.start + self.size]
+        return type("Res", (), {"data": rows})
+
+
+class FakeDb:
+    def __init__(self, bookmarks):
+        self.rows = {"categories": CATEGORIES, "bookmarks": bookmarks}
+        self.upserts = []
+        self.rpcs = []
+        self.requests = 0
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        self.rpcs.append(name)
+        query = FakeQuery(self, "categories")
+        query.execute = lambda: _result([{"category_name": "Python", "new_count": 1}])
+        return query
+
+
+async def _result(rows):
+    return type("Res", (), {"data": rows})
+
+
+@pytest.mark.asyncio
+async def test_dry_run_streams_pages_and_writes_nothing(monkeypatch):
+    monkeypatch.setattr(category_counts, "PAGE_SIZE", 2)
+    bookmarks = [{"id": i, "categories": ["Python"]} for i in range(1, 6)] + [{"id": 9, "categories": ["Go", "Python"]}]
+    db = FakeDb(bookmarks)
+
+    changed = await category_counts.recount_all(db, dry_run=True)
+
+    assert changed == {"Разработка": 6, "Python": 6, "Docker": 0}
+    assert db.upserts == [] and db.rpcs == []
+
+
+@pytest.mark.asyncio
+async def test_recount_writes_in_one_database_transaction():
+    db = FakeDb([])
+    assert await category_counts.recount_all(db) == {"Python": 1}
+    assert db.rpcs == ["recount_category_counts"]
+    assert db.upserts == []
+
+
+@pytest.mark.asyncio
+async def test_drift_check_reports_and_repairs_atomically(monkeypatch):
+    db = FakeDb([{"id": 1, "categories": ["Python"]}])
+    drift = await category_counts.check_drift(db)
+    assert drift == {"Разработка": (0, 1), "Python": (5, 1), "Go": (1, 0), "Docker": (1, 0)}
+    assert db.rpcs == []
+
+    await category_counts.check_drift(db, repair=True)
+    assert db.rpcs == ["recount_category_counts"]
+    assert db.upserts == []
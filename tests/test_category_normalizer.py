@@ -0,0 +1,52 @@
+from category_normalizer import FALLBACK_CATEGORY, CategoryNormalizer, derived_aliases, edit_distance, fold
+
+
+def test_fold_handles_case_transliteration_and_symbols():
+    assert fold("Базы Данных") == fold("базы данных") == "bazy-dannykh"
+    assert fold("C++") != fold("C#") != fold("C")
+    assert fold("  Yandex.Cloud ") == fold("yandex cloud")
+
+
+def test_derived_aliases():
+    assert derived_aliases("Google Cloud (GCP)") == ["Google Cloud", "GCP"]
+    assert derived_aliases("Bash/Shell") == ["Bash", "Shell"]
+    assert "Статьи" in derived_aliases("Статьи (IT)")
+
+
+def test_exact_slug_alias_and_fuzzy_matches():
+    normalizer = CategoryNormalizer(categories=[{"name": "Квантовые вычисления", "slug": "kvantovye-vychisleniia"}])
+    assert normalizer.match("python") == "Python"
+    assert normalizer.match("kvantovye-vychisleniia") == "Квантовые вычисления"
+    assert normalizer.match("JS") == "JavaScript"
+    assert normalizer.match("GCP") == "Google Cloud (GCP)"
+    assert normalizer.match("Kubernets") == "Kubernetes"
+    assert normalizer.match("Совсем новая тема") is None
+
+
+def test_ambiguous_derived_alias_is_not_used():
+    # 'Objective-C' есть и в Mobile, и в Desktop — угадывать нельзя
+    assert CategoryNormalizer(threshold=1.0).match("Objective-C") is None
+
+
+def test_normalize_dedupes_and_records_suggestions():
+    normalizer = CategoryNormalizer()
+    result = normalizer.normalize(["python", "Python", " ", "Новая тема", "JS"])
+    assert result == ["Python", "Новая тема", "JavaScript"]
+    assert normalizer.suggestions == {"Новая тема": 1}
+
+
+def test_fuzzy_does_not_remap_related_but_different_categories():
+    normalizer = CategoryNormalizer()
+    for label in ["iOS development", "Data", "Oracle Cloud", "Azure DevOps", "Spring Boot", "GitLab"]:
+        assert normalizer.fuzzy(label) is None, label
+
+
+def test_fallback_category_is_known():
+    normalizer = CategoryNormalizer()
+    assert normalizer.normalize([FALLBACK_CATEGORY]) == [FALLBACK_CATEGORY]
+    assert not normalizer.suggestions
+
+
+def test_edit_distance_counts_transposition_once_and_stops_at_limit():
+    assert edit_distance("pyhton", "python", 1) == 1
+    assert edit_distance("spring", "springboot", 2) == 3
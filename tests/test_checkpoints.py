@@ -0,0 +1,53 @@
+import os
+
+from checkpoints import StageCheckpoint
+
+
+def _write(path, text="x"):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_checkpoint_resumes_from_last_stage(tmp_path):
+    cp = StageCheckpoint(42, base_dir=str(tmp_path))
+    assert cp.stage is None
+    assert not cp.reached("crawled")
+
+    _write(cp.html_path, "<html></html>")
+    cp.mark("crawled", title="Example")
+    _write(cp.proc_path)
+    cp.mark("rendered")
+
+    # Новый объект (следующая попытка) видит сохранённое состояние
+    again = StageCheckpoint(42, base_dir=str(tmp_path))
+    assert again.stage == "rendered"
+    assert again.meta["title"] == "Example"
+    assert again.reached("crawled")
+    assert again.reached("rendered")
+    assert not again.reached("converted")
+
+
+def test_checkpoint_requires_artifacts(tmp_path):
+    cp = StageCheckpoint(7, base_dir=str(tmp_path))
+    cp.mark("converted")
+    # Маркер есть, а файлов нет (например, другой хост) — этап не считается пройденным
+    assert not cp.reached("converted")
+
+    cp.clear()
+    assert StageCheckpoint(7, base_dir=str(tmp_path)).stage is None
+
+
+def test_stage_needs_the_files_the_next_stage_reads(tmp_path):
+    cp = StageCheckpoint(9, base_dir=str(tmp_path))
+    _write(cp.html_path)
+    cp.mark("crawled")
+    # Без сырого скриншота обрабатывать нечего — скрапинг нужно повторить
+    assert not cp.reached("crawled")
+    _write(cp.raw_path)
+    assert cp.reached("crawled")
+
+    cp.mark("rendered")
+    assert not cp.reached("rendered")
+    _write(cp.proc_path)
+    os.remove(cp.raw_path)
+    assert cp.reached("crawled") and cp.reached("rendered")
@@ -0,0 +1,67 @@
+import io
+
+from import_watermarks import ImportWatermarks, file_digest
+
+FOLDERS = ["Разработка", "Полезное"]
+LINKS = [
+    {"url": "https://a.com", "title": "A", "add_date": 100},
+    {"url": "https://b.com", "title": "B", "add_date": 200},
+]
+
+
+def test_digest_rewinds_file():
+    f = io.BytesIO(b"<DL><p></DL>")
+    assert file_digest(f) == file_digest(io.BytesIO(b"<DL><p></DL>"))
+    assert f.read() == b"<DL><p></DL>"
+
+
+def test_unchanged_file_and_newer_entries(tmp_path):
+    path = str(tmp_path / "import_watermarks.json")
+    marks = ImportWatermarks(path)
+    assert marks.filter_new("chrome", LINKS, FOLDERS) == LINKS
+    marks.advance("chrome", "d1", LINKS, FOLDERS)
+
+    marks = ImportWatermarks(path)
+    assert marks.is_unchanged("chrome", "d1", FOLDERS)
+    assert not marks.is_unchanged("chrome", "d2", FOLDERS)
+    assert not marks.is_unchanged("firefox", "d1", FOLDERS)
+
+    newer = LINKS + [{"url": "https://c.com", "title": "C", "add_date": 300},
+                     {"url": "https://d.com", "title": "D", "add_date": 0}]
+    assert [l["url"] for l in marks.filter_new("chrome", newer, FOLDERS)] == ["https://c.com", "https://d.com"]
+    assert marks.filter_new("chrome", newer, FOLDERS, force=True) == newer
+
+
+def test_watermark_never_moves_back_and_resets_on_folder_change(tmp_path):
+    marks = ImportWatermarks(str(tmp_path / "w.json"))
+    marks.advance("chrome", "d1", LINKS, FOLDERS)
+    marks.advance("chrome", "d2", LINKS[:1], FOLDERS)
+    assert marks.since("chrome", FOLDERS) == 200
+
+    assert marks.since("chrome", FOLDERS + ["Услуги"]) == 0
+    assert not marks.is_unchanged("chrome", "d2", FOLDERS + ["Услуги"])
+
+
+def test_folder_sets_keep_separate_marks(tmp_path):
+    marks = ImportWatermarks(str(tmp_path / "w.json"))
+    marks.advance("chrome", "api", LINKS, FOLDERS)
+    marks.advance("chrome", "cli", LINKS[:1], ["Услуги"])
+
+    marks = ImportWatermarks(str(tmp_path / "w.json"))
+    assert marks.is_unchanged("chrome", "api", FOLDERS)
+    assert marks.is_unchanged("chrome", "cli", ["Услуги"])
+    assert (marks.since("chrome", FOLDERS), marks.since("chrome", ["Услуги"])) == (200, 100)
+
+
+def test_staged_mark_moves_only_on_commit(tmp_path):
+    path = str(tmp_path / "w.json")
+    ImportWatermarks(path).stage("chrome", "d1", LINKS, FOLDERS)
+
+    marks = ImportWatermarks(path)
+    assert marks.since("chrome", FOLDERS) == 0
+    assert not marks.is_unchanged("chrome", "d1", FOLDERS)
+    assert marks.commit_pending() == 1
+
+    marks = ImportWatermarks(path)
+    assert marks.since("chrome", FOLDERS) == 200 and not marks.pending
+
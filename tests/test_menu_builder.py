@@ -0,0 +1,30 @@
+import json
+
+from menu_builder import build_menu, menu_digest, write_menu
+
+CATEGORIES = [
+    {"id": 2, "name": "Python", "slug": "python", "parent_category": "Разработка", "bookmarks_count": 5},
+    {"id": 1, "name": "Разработка", "slug": "razrabotka", "parent_category": None, "bookmarks_count": 6},
+    {"id": 3, "name": "Go", "slug": "go", "parent_category": "Разработка", "bookmarks_count": 1},
+    {"id": 4, "name": "Rust", "slug": "rust", "parent_category": "Разработка", "bookmarks_count": 0},
+    {"id": 5, "name": "Сирота", "slug": "sirota", "parent_category": "Нет такой", "bookmarks_count": 2},
+]
+
+
+def test_build_menu_nests_and_filters_empty():
+    menu = build_menu(CATEGORIES)
+    assert [item["name"] for item in menu] == ["Разработка"]
+    assert [child["name"] for child in menu[0]["children"]] == ["Go", "Python"]
+    assert menu[0]["bookmarks_count"] == 6
+
+
+def test_write_menu_only_when_changed(tmp_path):
+    path = str(tmp_path / "public" / "menu.json")
+    menu = build_menu(CATEGORIES)
+    assert write_menu(menu, path) is True
+    assert write_menu(build_menu(list(reversed(CATEGORIES))), path) is False
+
+    changed = [dict(c, bookmarks_count=c["bookmarks_count"] + 1) for c in CATEGORIES]
+    assert write_menu(build_menu(changed), path) is True
+    with open(path, encoding="utf-8") as f:
+        assert menu_digest(json.load(f)) == menu_digest(build_menu(changed))
@@ -0,0 +1,59 @@
+import random
+from datetime import datetime, timezone
+
+import httpx
+from unittest.mock import MagicMock
+
+from llm.model import LLMUnavailableError
+from retry_policy import classify_error, backoff_delay, plan_failure, TRANSIENT, PERMANENT
+
+
+def _status_error(code: int) -> httpx.HTTPStatusError:
+    response = MagicMock()
+    response.status_code = code
+    return httpx.HTTPStatusError("error", request=MagicMock(), response=response)
+
+
+def test_classify_error():
+    assert classify_error(LLMUnavailableError("down")) == TRANSIENT
+    assert classify_error(TimeoutError()) == TRANSIENT
+    assert classify_error(_status_error(503)) == TRANSIENT
+    assert classify_error(_status_error(404)) == PERMANENT
+    assert classify_error(Exception("Page returned status 404")) == PERMANENT
+    assert classify_error(Exception("Page returned status 429")) == TRANSIENT
+    assert classify_error(Exception("Page content is too short")) == PERMANENT
+    assert classify_error(Exception("net::ERR_NAME_NOT_RESOLVED at https://x")) == PERMANENT
+    assert classify_error(Exception("something odd")) == TRANSIENT
+
+
+def test_backoff_grows_and_is_capped():
+    rng = random.Random(1)
+    for attempt in range(1, 10):
+        expected = min(3600, 60 * 2 ** (attempt - 1))
+        delay = backoff_delay(attempt, base=60, cap=3600, rng=rng)
+        assert expected / 2 <= delay <= expected
+
+
+def test_plan_failure_transient_then_dead_letter():
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    plan = plan_failure(TimeoutError("slow"), attempts=0, now=now, max_attempts=3)
+    assert plan["attempts"] == 1
+    assert plan["dead_letter"] is False
+    assert plan["is_processed"] is False
+    assert datetime.fromisoformat(plan["next_attempt_at"]) > now
+    # Результат попытки снимает аренду воркера, иначе повтор ждал бы её истечения
+    assert plan["leased_until"] is None
+
+    plan = plan_failure(TimeoutError("slow"), attempts=2, now=now, max_attempts=3)
+    assert plan["dead_letter"] is True
+    assert plan["processing_error"] == "slow"
+    assert plan["next_attempt_at"] is None
+
+
+def test_plan_failure_permanent_and_llm_outage():
+    plan = plan_failure(Exception("Page returned status 404"), attempts=0)
+    assert plan["dead_letter"] is True
+
+    # Недоступность ИИ никогда не отправляет закладку в dead-letter
+    plan = plan_failure(LLMUnavailableError("All providers failed"), attempts=50, max_attempts=3)
+    assert plan["dead_letter"] is False
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import pytest
+
+from scheduler import PriorityScheduler, Priority, SchedulerOverloaded
+
+
+@pytest.mark.asyncio
+async def test_reserved_slot_is_kept_for_interactive(tmp_path):
+    sched = PriorityScheduler(capacity=2, reserved=1, beacon_path=str(tmp_path / "beacon"),
+                              slots_dir=str(tmp_path / "slots"), beacon_ttl=0.2)
+
+    await sched.acquire(Priority.BACKGROUND)
+    # Второе фоновое место недоступно: оно зарезервировано под интерактив
+    second_bg = asyncio.create_task(sched.acquire(Priority.BACKGROUND))
+    await asyncio.sleep(0.05)
+    assert not second_bg.done()
+
+    # Интерактивный запрос проходит сразу
+    await asyncio.wait_for(sched.acquire(Priority.INTERACTIVE), timeout=0.5)
+    assert sched.running[Priority.INTERACTIVE] == 1
+
+    await sched.release(Priority.INTERACTIVE)
+    await sched.release(Priority.BACKGROUND)
+    await asyncio.wait_for(second_bg, timeout=2)
+    await sched.release(Priority.BACKGROUND)
+
+
+@pytest.mark.asyncio
+async def test_background_yields_to_waiting_interactive(tmp_path):
+    sched = PriorityScheduler(capacity=1, reserved=0, beacon_path=str(tmp_path / "beacon"),
+                              slots_dir=str(tmp_path / "slots"), beacon_ttl=0.2)
+    order = []
+
+    await sched.acquire(Priority.BACKGROUND)
+
+    async def job(priority, name):
+        async with sched.slot(priority):
+            order.append(name)
+
+    bg = asyncio.create_task(job(Priority.BACKGROUND, "background"))
+    await asyncio.sleep(0.01)
+    fg = asyncio.create_task(job(Priority.INTERACTIVE, "interactive"))
+    await asyncio.sleep(0.01)
+
+    await sched.release(Priority.BACKGROUND)
+    await asyncio.wait_for(asyncio.gather(bg, fg), timeout=3)
+    assert order == ["interactive", "background"]
+
+
+@pytest.mark.asyncio
+async def test_fresh_beacon_throttles_background(tmp_path):
+    beacon = tmp_path / "beacon"
+    sched = PriorityScheduler(capacity=2, reserved=0, beacon_path=str(beacon), beacon_ttl=0.3,
+                              slots_dir=str(tmp_path / "slots"))
+
+    beacon.touch()
+    assert sched.external_pressure()
+    task = asyncio.create_task(sched.acquire(Priority.BACKGROUND))
+    await asyncio.sleep(0.1)
+    assert not task.done()
+
+    # Маяк устарел — фон снова получает место
+    old = os.path.getmtime(beacon) - 10
+    os.utime(beacon, (old, old))
+    await asyncio.wait_for(task, timeout=2)
+    await sched.release(Priority.BACKGROUND)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_fast(tmp_path):
+    sched = PriorityScheduler(capacity=1, reserved=0, beacon_path=str(tmp_path / "beacon"),
+                              slots_dir=str(tmp_path / "slots"),
+                              beacon_ttl=0.2, queue_depth=1, queue_timeout=5)
+    await sched.acquire(Priority.INTERACTIVE)
+    queued = asyncio.create_task(sched.acquire(Priority.INTERACTIVE))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(SchedulerOverloaded) as exc_info:
+        await asyncio.wait_for(sched.acquire(Priority.INTERACTIVE), timeout=0.5)
+    assert exc_info.value.retry_after >= 1
+    assert sched.rejected[Priority.INTERACTIVE] == 1
+
+    await sched.release(Priority.INTERACTIVE)
+    await asyncio.wait_for(queued, timeout=1)
+    await sched.release(Priority.INTERACTIVE)
+    assert sched.snapshot()["admitted"]["interactive"] == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_timeout(tmp_path):
+    sched = PriorityScheduler(capacity=1, reserved=0, beacon_path=str(tmp_path / "beacon"),
+                              slots_dir=str(tmp_path / "slots"),
+                              beacon_ttl=0.2, queue_depth=5, queue_timeout=0.1)
+    await sched.acquire(Priority.INTERACTIVE)
+    with pytest.raises(SchedulerOverloaded):
+        await sched.acquire(Priority.INTERACTIVE)
+    assert sched.waiting[Priority.INTERACTIVE] == 0
+    await sched.release(Priority.INTERACTIVE)
+
+
+@pytest.mark.asyncio
+async def test_capacity_is_shared_between_processes(tmp_path):
+    # Два планировщика на одном каталоге мест — как API и воркер конвейера на одном хосте
+    common = dict(capacity=2, reserved=0, beacon_path=str(tmp_path / "beacon"), beacon_ttl=0.2,
+                  slots_dir=str(tmp_path / "slots"), poll_interval=0.02)
+    api, worker = PriorityScheduler(**common), PriorityScheduler(**common)
+
+    await api.acquire(Priority.BACKGROUND)
+    await worker.acquire(Priority.BACKGROUND)
+    assert api.snapshot()["host_running"] == 2
+
+    third = asyncio.create_task(worker.acquire(Priority.BACKGROUND))
+    await asyncio.sleep(0.1)
+    assert not third.done()
+
+    # Место, освобождённое другим процессом, замечается по опросу
+    await api.release(Priority.BACKGROUND)
+    await asyncio.wait_for(third, timeout=1)
+    await worker.release(Priority.BACKGROUND)
+    await worker.release(Priority.BACKGROUND)
+
+
+@pytest.mark.asyncio
+async def test_background_runs_alongside_interactive_while_capacity_remains(tmp_path):
+    beacon = tmp_path / "beacon"
+    common = dict(capacity=3, reserved=1, beacon_path=str(beacon), beacon_ttl=0.5,
+                  slots_dir=str(tmp_path / "slots"), poll_interval=0.02)
+    api, worker = PriorityScheduler(**common), PriorityScheduler(**common)
+
+    # Выполняющийся интерактивный запрос не останавливает фон соседнего процесса
+    await api.acquire(Priority.INTERACTIVE)
+    await asyncio.wait_for(worker.acquire(Priority.BACKGROUND), timeout=0.5)
+    assert not beacon.exists()
+
+    await asyncio.wait_for(api.acquire(Priority.INTERACTIVE), timeout=0.5)
+    # Мест не осталось: ждущий интерактив зажигает маяк, и фон больше не стартует
+    waiting = asyncio.create_task(api.acquire(Priority.INTERACTIVE))
+    await asyncio.sleep(0.05)
+    assert worker.external_pressure()
+    await api.release(Priority.INTERACTIVE)
+    await asyncio.wait_for(waiting, timeout=1)
+
+    for _ in range(2):
+        await api.release(Priority.INTERACTIVE)
+    await worker.release(Priority.BACKGROUND)
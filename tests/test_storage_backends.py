@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from storage_backends import CachedStorage, LocalStorage
+
+
+@pytest.mark.asyncio
+async def test_local_storage_roundtrip(tmp_path):
+    storage = LocalStorage("screenshots", root=str(tmp_path), base_url="http://api/storage")
+    await storage.upload("html/1.html", b"<p>1</p>", {"upsert": "true"})
+    with pytest.raises(FileExistsError):
+        await storage.upload("html/1.html", b"again", {})
+
+    await storage.move("html/1.html", "html/2.html")
+    assert await storage.download("html/2.html") == b"<p>1</p>"
+    assert [i["name"] for i in await storage.list("html")] == ["2.html"]
+    assert await storage.remove(["html/2.html", "html/3.html"]) == [{"name": "html/2.html"}]
+    assert storage.public_url("image/1.png") == "http://api/storage/screenshots/image/1.png"
+    with pytest.raises(ValueError):
+        storage.file_path("../escape")
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_hot_reads_locally_and_evicts_lru(tmp_path):
+    remote = LocalStorage("screenshots", root=str(tmp_path / "remote"))
+    for name in "abc":
+        await remote.upload(f"image/{name}.png", name.encode() * 40, {"upsert": "true"})
+    cache = CachedStorage(remote, cache_dir=str(tmp_path / "cache"), max_bytes=100)
+
+    await cache.download("image/a.png")
+    assert await cache.download("image/a.png") == b"a" * 40
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    await cache.download("image/b.png")
+    await cache.download("image/a.png")   # a — самый свежий
+    await cache.download("image/c.png")   # 120 байт > 100: вытесняется b
+    assert list(cache._entries) == ["image/a.png", "image/c.png"]
+    assert cache.stats()["bytes"] == 80
+
+    # После перезапуска индекс восстанавливается с диска
+    again = CachedStorage(remote, cache_dir=str(tmp_path / "cache"), max_bytes=100)
+    assert set(again._entries) == {"image/a.png", "image/c.png"}
+
+
+@pytest.mark.asyncio
+async def test_cache_write_through_and_remove(tmp_path):
+    remote = LocalStorage("screenshots", root=str(tmp_path / "remote"))
+    cache = CachedStorage(remote, cache_dir=str(tmp_path / "cache"), max_bytes=1000)
+    await cache.upload("temp/x.png", b"x", {"upsert": "true"})
+    await cache.move("temp/x.png", "image/1.png")
+    assert await remote.download("image/1.png") == b"x"
+    assert await cache.download("image/1.png") == b"x" and cache.hits == 1
+
+    await cache.remove(["image/1.png"])
+    assert cache.stats()["objects"] == 0
+    with pytest.raises(FileNotFoundError):
+        await cache.download("image/1.png")
+
+
+@pytest.mark.asyncio
+async def test_processes_sharing_a_cache_dir_respect_one_budget(tmp_path):
+    remote = LocalStorage("screenshots", root=str(tmp_path / "remote"))
+    for name in "abc":
+        await remote.upload(f"image/{name}.png", name.encode() * 40, {"upsert": "true"})
+    first = CachedStorage(remote, cache_dir=str(tmp_path / "cache"), max_bytes=100)
+    second = CachedStorage(remote, cache_dir=str(tmp_path / "cache"), max_bytes=100, rescan_interval=0)
+
+    await first.download("image/a.png")
+    await second.download("image/b.png")
+    await second.download("image/c.png")   # 120 байт на диске, включая файл первого процесса
+    assert second.stats()["bytes"] <= 100
+    assert not os.path.exists(second.cache.file_path("image/a.png"))
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from storage_backends import LocalStorage
+from storage_inventory import StorageInventory, bookmark_id_of
+
+
+def test_bookmark_id_of_known_layouts():
+    assert bookmark_id_of("image/12.png") == 12
+    assert bookmark_id_of("html/12.html") == 12
+    assert bookmark_id_of("12.png") == 12
+    assert bookmark_id_of("html/12.png") is None
+    assert bookmark_id_of("temp/abc.png") is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_applies_only_the_difference(tmp_path):
+    storage = LocalStorage("screenshots", root=str(tmp_path / "bucket"))
+    for path in ["image/1.png", "html/1.html", "cas/ab/abcd.png"]:
+        await storage.upload(path, b"data", {"upsert": "true"})
+    manifest = str(tmp_path / "inventory.json")
+
+    inventory = StorageInventory(storage, path=manifest)
+    assert (await inventory.refresh())["added"] == 3
+
+    await storage.remove(["html/1.html"])
+    await storage.upload("markdown/1.md", b"md", {"upsert": "true"})
+    stats = await StorageInventory(storage, path=manifest).refresh()
+    assert (stats["added"], stats["changed"], stats["removed"], stats["total"]) == (1, 0, 1, 3)
+
+
+@pytest.mark.asyncio
+async def test_orphans_and_missing_images(tmp_path):
+    storage = LocalStorage("screenshots", root=str(tmp_path / "bucket"))
+    for path in ["image/1.png", "image/2.png", "markdown/2.md", "temp/old.png", "temp/new.png", "cas/aa/aaaa.png"]:
+        await storage.upload(path, b"x", {"upsert": "true"})
+    inventory = StorageInventory(storage, path=str(tmp_path / "inventory.json"))
+    await inventory.refresh()
+
+    later = time.time() + 48 * 3600
+    inventory.objects["temp/new.png"]["updated_at"] = None
+    orphans = inventory.find_orphans({1}, referenced_hashes=set(), now=later)
+    assert orphans == ["cas/aa/aaaa.png", "image/2.png", "markdown/2.md", "temp/old.png"]
+    # Без таблицы ссылок CAS не трогаем
+    assert "cas/aa/aaaa.png" not in inventory.find_orphans({1, 2}, referenced_hashes=None, now=later)
+
+    assert inventory.find_missing_images({1, 3, 4}, referenced_images={4}) == [3]
+
+
+class ChangesStorage(LocalStorage):
+    """Бэкенд с выборкой изменений, как SupabaseStorage поверх storage.objects."""
+
+    def __init__(self, root, objects):
+        super().__init__("screenshots", root=root)
+        self.rows = objects
+        self.calls = []
+
+    async def list(self, folder, limit=1000, offset=0):
+        raise AssertionError("бакет не должен обходиться")
+
+    async def changed_since(self, since):
+        self.calls.append(since)
+        rows = [row for row in self.rows if since is None or row["updated_at"] >= since]
+        return rows, len(self.rows)
+
+
+@pytest.mark.asyncio
+async def test_refresh_reads_only_changes_and_resyncs_on_deletes(tmp_path):
+    rows = [{"name": "image/1.png", "size": 1, "sha256": "h1", "updated_at": "2026-01-01T00:00:00+00:00"},
+            {"name": "cas/ab/abcd.png", "size": 2, "sha256": None, "updated_at": "2026-01-02T00:00:00+00:00"}]
+    storage = ChangesStorage(str(tmp_path / "bucket"), rows)
+    inventory = StorageInventory(storage, path=str(tmp_path / "inventory.json"))
+    assert (await inventory.refresh())["added"] == 2
+    assert inventory.objects["cas/ab/abcd.png"]["sha256"] == "abcd"
+
+    rows.append({"name": "html/1.html", "size": 3, "sha256": "h2", "updated_at": "2026-01-03T00:00:00+00:00"})
+    stats = await inventory.refresh()
+    assert storage.calls == [None, "2026-01-02T00:00:00+00:00"]
+    assert (stats["added"], stats["changed"], stats["total"]) == (1, 0, 3)
+
+    del rows[0]
+    stats = await inventory.refresh()
+    assert storage.calls[-1] is None
+    assert (stats["removed"], stats["total"]) == (1, 2)
+
+
+class DeniedChangesStorage(LocalStorage):
+    """SupabaseStorage с обычным ключом: RPC storage_objects_changed отозван у anon/authenticated."""
+
+    async def changed_since(self, since):
+        raise Exception("permission denied for function storage_objects_changed")
+
+
+@pytest.mark.asyncio
+async def test_denied_changes_rpc_falls_back_to_walk(tmp_path):
+    storage = DeniedChangesStorage("screenshots", root=str(tmp_path / "bucket"))
+    for path in ["image/1.png", "html/1.html"]:
+        await storage.upload(path, b"data", {"upsert": "true"})
+    inventory = StorageInventory(storage, path=str(tmp_path / "inventory.json"))
+    stats = await inventory.refresh()
+    assert (stats["added"], stats["total"]) == (2, 2)
+    assert inventory.refreshed_at
+
+
+def test_shared_placeholder_is_never_an_orphan(tmp_path):
+    inventory = StorageInventory(LocalStorage("screenshots", root=str(tmp_path / "bucket")),
+                                 path=str(tmp_path / "inventory.json"))
+    inventory.objects = {"image/102.png": {"size": 1}, "image/103.png": {"size": 1}}
+    assert inventory.find_orphans({1}) == ["image/103.png"]
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import pytest
+
+import storage_ops
+from storage_ops import StorageBundle
+
+
+class FakeBucket:
+    def __init__(self, missing=()):
+        self.objects = {"temp/a.png": b"a", "temp/b.html": b"b", "image/1.png": b"x"}
+        self.missing = set(missing)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _hit(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+    async def upload(self, path, file, file_options):
+        await self._hit()
+        self.objects[path] = file
+
+    async def move(self, src, dst):
+        await self._hit()
+        if src in self.missing or src not in self.objects:
+            raise RuntimeError(f"Object not found: {src}")
+        self.objects[dst] = self.objects.pop(src)
+
+    async def remove(self, paths):
+        await self._hit()
+        found = [p for p in paths if p in self.objects]
+        for p in found:
+            del self.objects[p]
+        return [{"name": p} for p in found]
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    fake = FakeBucket()
+    monkeypatch.setattr(storage_ops, "get_storage", lambda bucket: fake)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_operations_run_concurrently_and_report_per_object(bucket, tmp_path):
+    src = tmp_path / "page.md"
+    src.write_text("# hi")
+    bundle = StorageBundle()
+    bundle.upload(str(src), "temp/c.md", "text/markdown")
+    bundle.move("temp/a.png", "image/2.png")
+    bundle.move("temp/missing.html", "html/2.html")
+
+    results = await bundle.run()
+
+    assert bucket.max_in_flight == 3
+    assert results["temp/c.md"] is None and results["image/2.png"] is None
+    assert "not found" in bundle.errors["html/2.html"]
+    assert bucket.objects["image/2.png"] == b"a"
+
+
+@pytest.mark.asyncio
+async def test_remove_reports_objects_that_were_absent(bucket):
+    bundle = StorageBundle().remove("image/1.png").remove("html/1.html")
+    results = await bundle.run()
+    assert results == {"image/1.png": None, "html/1.html": "not found"}
+
+
+@pytest.mark.asyncio
+async def test_empty_bundle_does_nothing(bucket):
+    assert await StorageBundle().run() == {}
+
+
+def test_text_artifacts_are_gzipped_and_decoded_back():
+    html = ("<html>" + "<p>повтор</p>" * 2000 + "</html>").encode()
+    packed, options = storage_ops.artifact_upload(html, "text/html", compress=True)
+    assert storage_ops.is_compressed(packed)
+    assert len(packed) * 5 < len(html)
+    assert options["metadata"] == {"content-encoding": "gzip", "sha256": hashlib.sha256(html).hexdigest()}
+    assert storage_ops.decode_artifact(packed) == html
+    # Старые несжатые объекты читаются как есть, повторно не сжимаются
+    assert storage_ops.decode_artifact(html) == html
+    assert storage_ops.artifact_upload(packed, "text/html", compress=True)[0] == packed
+
+
+def test_images_are_uploaded_as_is():
+    png = b"\x89PNG" + b"\x00" * 100
+    data, options = storage_ops.artifact_upload(png, "image/png", compress=True)
+    assert data == png and options["metadata"] == {"sha256": hashlib.sha256(png).hexdigest()}
@@ -0,0 +1,48 @@
+from url_bloom import UrlBloomFilter, load_or_create, sync_from_rows
+from url_canon import normalize_url
+
+
+def test_no_false_negatives_and_low_false_positive_rate():
+    bloom = UrlBloomFilter(capacity=2000, error_rate=0.01)
+    for i in range(2000):
+        bloom.add(f"https://example.com/page/{i}")
+    assert all(f"http://www.example.com/page/{i}/?utm_source=x" in bloom for i in range(2000))
+    false_positives = sum(f"https://other.org/{i}" in bloom for i in range(5000))
+    assert false_positives < 150
+
+
+def test_round_trip_keeps_bits_and_watermark(tmp_path):
+    path = str(tmp_path / "url_bloom.bin")
+    bloom = UrlBloomFilter(capacity=100)
+    sync_from_rows(bloom, [
+        {"id": 3, "url_normalized": normalize_url("https://a.com/x")},
+        {"id": 7, "url_normalized": None},
+    ])
+    bloom.save(path)
+
+    loaded = load_or_create(path)
+    assert loaded.max_id == 7 and loaded.count == 1
+    assert "https://www.a.com/x/" in loaded
+    assert "https://b.com" not in loaded
+    assert load_or_create(path, rebuild=True).max_id == 0
+
+
+def test_corrupted_or_saturated_filter_is_recreated(tmp_path):
+    path = tmp_path / "url_bloom.bin"
+    path.write_bytes(b"garbage")
+    assert load_or_create(str(path)).count == 0
+
+    bloom = UrlBloomFilter(capacity=2)
+    for i in range(3):
+        bloom.add(f"https://a.com/{i}")
+    bloom.save(str(path))
+    fresh = load_or_create(str(path))
+    assert fresh.count == 0 and fresh.max_id == 0
+
+
+def test_rows_before_backfill_are_keyed_by_url():
+    bloom = UrlBloomFilter(capacity=100)
+    # url_normalized ещё не заполнен: фильтр не должен отвечать «точно нет» после backfill
+    sync_from_rows(bloom, [{"id": 5, "url_normalized": None, "url": "https://www.a.com/x/?utm_source=tg"}])
+    assert bloom.max_id == 5
+    assert bloom.contains_key(normalize_url("https://a.com/x"))
@@ -0,0 +1,66 @@
+from url_canon import normalize_url
+
+
+def test_normalize_url_basic_variants_collapse():
+    assert normalize_url(" HTTPS://Example.COM/Docs/ ") == "https://example.com/Docs"
+    assert normalize_url("https://example.com/docs#intro") == normalize_url("https://example.com/docs/")
+    assert normalize_url("https://example.com/?q=1") == "https://example.com?q=1"
+
+
+def test_normalize_url_empty():
+    assert normalize_url("") is None
+    assert normalize_url(None) is None
+
+
+def test_tracking_www_scheme_port_and_query_order_collapse():
+    variants = [
+        "http://www.example.com/post?b=2&a=1",
+        "https://EXAMPLE.com:443/post/?a=1&b=2&utm_source=tg&utm_medium=social",
+        "https://example.com/post?fbclid=abc&a=1&b=2#comments",
+        "http://www.example.com:80/post?a=1&gclid=x&b=2",
+        "//www.example.com/post?a=1&b=2",
+    ]
+    assert {normalize_url(u) for u in variants} == {"https://example.com/post?a=1&b=2"}
+
+
+def test_meaningful_parts_are_kept():
+    assert normalize_url("https://example.com:8080/a") == "https://example.com:8080/a"
+    assert normalize_url("https://example.com/a?id=1") != normalize_url("https://example.com/a?id=2")
+    assert normalize_url("https://app.example.com/#!/inbox") == "https://app.example.com#!/inbox"
+    assert normalize_url("mailto:me@example.com") == "mailto:me@example.com"
+
+
+def test_backfill_merges_duplicates_into_earliest_bookmark(monkeypatch):
+    # Скрипт проверяет учётные данные при импорте
+    monkeypatch.setenv("SUPABASE_URL", "http://localhost")
+    monkeypatch.setenv("SUPABASE_KEY", "test")
+    from backfill_url_normalized import merged, plan
+
+    rows = [
+        {"id": 1, "url": "https://a.com/x", "url_normalized": None, "summary": None, "categories": ["Python"]},
+        {"id": 2, "url": "http://www.a.com/x/", "url_normalized": None, "summary": "s", "categories": ["Go", "Python"]},
+        {"id": 3, "url": "https://b.com", "url_normalized": "https://b.com", "summary": "b", "categories": []},
+    ]
+    changes, duplicates = plan(rows)
+    assert changes == {1: "https://a.com/x"}
+    assert [dup["id"] for dup in duplicates[1]] == [2]
+    assert merged(rows[0], duplicates[1]) == {"categories": ["Python", "Go"], "summary": "s"}
+    assert merged(rows[2], []) == {}
+
+
+def test_backfill_keeps_the_processed_duplicate(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "http://localhost")
+    monkeypatch.setenv("SUPABASE_KEY", "test")
+    from backfill_url_normalized import merged, plan
+
+    # Ранняя закладка ещё в очереди конвейера, поздняя уже обработана (скриншот лежит под её id)
+    rows = [
+        {"id": 1, "url": "https://a.com/x", "url_normalized": None, "title": "",
+         "summary": None, "categories": [], "is_processed": False},
+        {"id": 2, "url": "https://a.com/x/", "url_normalized": None, "title": "A",
+         "summary": "s", "categories": ["Go"], "is_processed": True},
+    ]
+    changes, duplicates = plan(rows)
+    assert changes == {2: "https://a.com/x"}
+    assert [dup["id"] for dup in duplicates[2]] == [1]
+    assert merged(rows[1], duplicates[2]) == {}
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+
+from write_buffer import BookmarkWriteBuffer
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    async def execute(self):
+        if self.client.fail_times > 0:
+            self.client.fail_times -= 1
+            raise RuntimeError("network down")
+        self.client.calls.append((self.name, self.params["p_rows"]))
+
+
+class FakeClient:
+    def __init__(self, fail_times: int = 0):
+        self.calls = []
+        self.fail_times = fail_times
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+
+@pytest.mark.asyncio
+async def test_updates_are_coalesced_into_one_rpc():
+    client = FakeClient()
+    buf = BookmarkWriteBuffer(client, max_rows=10, flush_interval=60)
+    buf.add(1, {"attempts": 1, "last_error": "x"})
+    buf.add(1, {"summary": "ok", "last_error": None})
+    buf.add(2, {"summary": "two"})
+
+    assert await buf.flush() == 2
+    name, rows = client.calls[0]
+    assert name == "bulk_update_bookmarks"
+    assert {"id": 1, "attempts": 1, "last_error": None, "summary": "ok"} in rows
+    assert len(buf) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_and_newer_values():
+    client = FakeClient(fail_times=1)
+    buf = BookmarkWriteBuffer(client, max_rows=10, flush_interval=60)
+    buf.add(1, {"summary": "old"})
+    with pytest.raises(RuntimeError):
+        await buf.flush()
+    buf.add(1, {"summary": "new"})
+    assert await buf.flush() == 1
+    assert client.calls[0][1] == [{"id": 1, "summary": "new"}]
+
+
+@pytest.mark.asyncio
+async def test_size_trigger_and_close_flush():
+    client = FakeClient()
+    buf = BookmarkWriteBuffer(client, max_rows=2, flush_interval=60)
+    await buf.start()
+    buf.add(1, {"summary": "a"})
+    buf.add(2, {"summary": "b"})
+    for _ in range(50):
+        if client.calls:
+            break
+        await asyncio.sleep(0.01)
+    assert len(client.calls[0][1]) == 2
+
+    buf.add(3, {"summary": "c"})
+    await buf.close()
+    assert client.calls[-1][1] == [{"id": 3, "summary": "c"}]
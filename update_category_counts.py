@@ -1,47 +1,33 @@
 import asyncio
-import json
 import os
+import sys
 from dotenv import load_dotenv
-from supabase import create_client, AsyncClient
 from loguru import logger
 
+from category_counts import recount_all, check_drift
+
 # --- Настройка Supabase ---
 load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Supabase credentials not found in .env file")
-supabase: AsyncClient = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-async def update_category_counts():
+async def update_category_counts(dry_run: bool = False):
     """
-    Подсчитывает и обновляет количество закладок для каждой категории.
+    Подсчитывает и обновляет количество закладок для каждой категории
+    (один проход по bookmarks, одна запись в categories; см. category_counts.py).
     """
-    logger.info("Fetching all categories...")
-    categories_response = supabase.table("categories").select("id, name").execute()
-    if not categories_response.data:
-        logger.warning("No categories found.")
-        return
-
-    categories = categories_response.data
-    logger.info(f"Found {len(categories)} categories. Updating counts...")
-
-    for category in categories:
-        category_name = category['name']
-        
-        # Подсчет закладок для каждой категории
-        count_response = supabase.table("bookmarks").select("id", count="exact").contains("categories", f'["{category_name}"]').execute()
-
-        bookmarks_count = 0
-        if count_response.count is not None:
-            bookmarks_count = count_response.count
-
-        # Обновление счетчика в таблице categories
-        supabase.table("categories").update({"bookmarks_count": bookmarks_count}).eq("id", category['id']).execute()
-        logger.info(f"Category '{category_name}' updated with count: {bookmarks_count}")
+    changed = await recount_all(dry_run=dry_run)
+    for name, count in sorted(changed.items()):
+        logger.info(f"Category '{name}' updated with count: {count}")
 
 async def main():
-    await update_category_counts()
+    # Счётчики ведут триггеры; --check только сверяет их с полным пересчётом
+    if "--check" in sys.argv:
+        await check_drift()
+    else:
+        await update_category_counts(dry_run="--dry-run" in sys.argv)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,109 @@
+import hashlib
+import math
+import os
+import struct
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from url_canon import normalize_url
+
+# --- Фильтр Блума канонических URL для быстрой проверки дубликатов при импорте ---
+# Ответ «нет» точный: такой ссылки в базе нет и запрос не нужен.
+# Ответ «возможно» проверяется по уникальному индексу url_normalized.
+URL_BLOOM_PATH = os.getenv("URL_BLOOM_PATH", "bookmarks/url_bloom.bin")
+URL_BLOOM_CAPACITY = int(os.getenv("URL_BLOOM_CAPACITY", "200000"))
+URL_BLOOM_ERROR_RATE = float(os.getenv("URL_BLOOM_ERROR_RATE", "0.001"))
+
+_MAGIC = b"UBF1"
+_HEADER = struct.Struct("<4sQQIQQ")  # magic, ёмкость, бит, хэшей, элементов, максимальный id закладки
+
+
+class UrlBloomFilter:
+    def __init__(self, capacity: int = URL_BLOOM_CAPACITY, error_rate: float = URL_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self.max_id = 0  # до какой закладки фильтр синхронизирован с базой
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add_key(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def add(self, url: str):
+        key = normalize_url(url)
+        if key:
+            self.add_key(key)
+
+    def contains_key(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def __contains__(self, url: str) -> bool:
+        key = normalize_url(url)
+        return bool(key) and self.contains_key(key)
+
+    @property
+    def saturated(self) -> bool:
+        """Элементов больше расчётной ёмкости — доля ложных «возможно» растёт, пора пересобрать."""
+        return self.count > self.capacity
+
+    def save(self, path: str = URL_BLOOM_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.capacity, self.num_bits, self.num_hashes, self.count, self.max_id))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = URL_BLOOM_PATH) -> Optional["UrlBloomFilter"]:
+        try:
+            with open(path, "rb") as f:
+                magic, capacity, num_bits, num_hashes, count, max_id = _HEADER.unpack(f.read(_HEADER.size))
+                bits = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        if magic != _MAGIC or len(bits) != (num_bits + 7) // 8:
+            logger.warning(f"Файл фильтра {path} повреждён, он будет пересобран.")
+            return None
+        bloom = cls.__new__(cls)
+        bloom.capacity, bloom.num_bits, bloom.num_hashes, bloom.bits = capacity, num_bits, num_hashes, bits
+        bloom.count, bloom.max_id = count, max_id
+        return bloom
+
+
+def sync_from_rows(bloom: UrlBloomFilter, rows: Iterable[dict]):
+    """
+    Добавляет ключи закладок ({id, url_normalized, url}) и двигает max_id.
+    У строк, которые backfill_url_normalized.py ещё не заполнил, ключ считается из url:
+    иначе max_id ушёл бы дальше них, и после backfill фильтр ответил бы «точно нет» на известную ссылку.
+    """
+    for row in rows:
+        key = row.get("url_normalized") or normalize_url(row.get("url"))
+        if key:
+            bloom.add_key(key)
+        bloom.max_id = max(bloom.max_id, row["id"])
+
+
+def load_or_create(path: str = URL_BLOOM_PATH, rebuild: bool = False) -> UrlBloomFilter:
+    """
+    Сохранённый фильтр или пустой (max_id = 0 — его нужно догнать с начала таблицы).
+    Переполненный фильтр пересоздаётся с запасом ёмкости. После изменения правил
+    url_canon и backfill_url_normalized.py фильтр нужно пересобрать (rebuild=True).
+    """
+    bloom = None if rebuild else UrlBloomFilter.load(path)
+    if bloom is None:
+        return UrlBloomFilter()
+    if bloom.saturated:
+        logger.info(f"Фильтр URL переполнен ({bloom.count} > {bloom.capacity}), пересобираем с запасом.")
+        return UrlBloomFilter(capacity=max(URL_BLOOM_CAPACITY, bloom.count * 2))
+    return bloom
@@ -0,0 +1,71 @@
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# --- Канонизация URL для поиска дубликатов ---
+# Значение хранится в bookmarks.url_normalized (уникальный индекс), исходный url не меняется.
+# После изменения правил ключи пересчитывает backfill_url_normalized.py.
+
+# Параметры, которые не меняют содержимое страницы, а только помечают источник перехода
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "ysclid",
+    "igshid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "_openstat", "ref_src",
+}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# http и https считаются одной страницей
+SCHEME_ALIASES = {"http": "https"}
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _host(parts) -> str:
+    host = (parts.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{userinfo}@{host}"
+    return host
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    """
+    Канонический ключ URL: https вместо http, хост в нижнем регистре без www. и порта по умолчанию,
+    путь без завершающего '/', query без трекинговых параметров и отсортированный, без фрагмента
+    (кроме hashbang-маршрутов '#!'). Для пустой строки возвращает None.
+    """
+    url = (url or "").strip()
+    if not url:
+        return None
+    if url.startswith("//") or url.lower().startswith("www."):
+        url = f"https://{url.lstrip('/')}"
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if not parts.netloc:
+        return url
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(name)
+    )
+    fragment = parts.fragment if parts.fragment.startswith("!") else ""
+    return urlunsplit((
+        SCHEME_ALIASES.get(scheme, scheme),
+        _host(parts),
+        parts.path.rstrip("/"),
+        urlencode(query),
+        fragment,
+    ))
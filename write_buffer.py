@@ -0,0 +1,101 @@
+import asyncio
+import os
+
+from loguru import logger
+
+# --- Настройки буфера записи результатов конвейера ---
+WRITE_BUFFER_MAX_ROWS = int(os.getenv("WRITE_BUFFER_MAX_ROWS", "50"))
+WRITE_BUFFER_FLUSH_INTERVAL = float(os.getenv("WRITE_BUFFER_FLUSH_INTERVAL", "2"))
+WRITE_BUFFER_CLOSE_RETRIES = 5
+BULK_UPDATE_RPC = "bulk_update_bookmarks"
+
+
+class BookmarkWriteBuffer:
+    """
+    Буфер отложенной записи (write-behind) для обновлений таблицы bookmarks.
+
+    Обновления копятся по id (поздние поля перекрывают ранние) и уходят
+    одним RPC bulk_update_bookmarks — по размеру пачки или по таймеру.
+    Семантика at-least-once: при ошибке пачка возвращается в буфер и будет
+    отправлена снова; обновления идемпотентны, поэтому повтор безопасен.
+    client — асинхронный клиент Supabase (db.get_db()).
+    """
+
+    def __init__(self, client, max_rows: int = WRITE_BUFFER_MAX_ROWS,
+                 flush_interval: float = WRITE_BUFFER_FLUSH_INTERVAL, rpc_name: str = BULK_UPDATE_RPC):
+        self.client = client
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.rpc_name = rpc_name
+        self._pending = {}
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._task = None
+        self.flushed_rows = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, bookmark_id: int, data: dict):
+        """Ставит обновление в очередь. Повторное обновление той же строки сливается с прежним."""
+        self._pending[bookmark_id] = {**self._pending.get(bookmark_id, {}), **data}
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+
+    async def _write(self, rows):
+        await self.client.rpc(self.rpc_name, {"p_rows": rows}).execute()
+
+    async def flush(self) -> int:
+        """Отправляет всё накопленное одной пачкой. Возвращает число строк."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._full.clear()
+            rows = [{"id": bookmark_id, **data} for bookmark_id, data in batch.items()]
+            try:
+                await self._write(rows)
+            except BaseException:
+                # Возвращаем пачку (в том числе при отмене), не затирая обновления, пришедшие во время записи
+                for bookmark_id, data in batch.items():
+                    self._pending[bookmark_id] = {**data, **self._pending.get(bookmark_id, {})}
+                raise
+            self.flushed_rows += len(rows)
+            logger.debug(f"💾 Записано {len(rows)} обновлений закладок одной пачкой.")
+            return len(rows)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Не удалось записать пачку обновлений ({len(self._pending)} в буфере): {e}")
+                await asyncio.sleep(self.flush_interval)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Останавливает фоновую запись и сбрасывает остаток (с повторами) — вызывать при остановке."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for attempt in range(1, WRITE_BUFFER_CLOSE_RETRIES + 1):
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                logger.error(f"Финальная запись буфера не удалась (попытка {attempt}): {e}")
+                await asyncio.sleep(min(10, 2 ** attempt))
+        # Строки не потеряны навсегда: по истечении аренды они вернутся в очередь конвейера
+        logger.critical(f"Не записано {len(self._pending)} обновлений, будут обработаны повторно: {sorted(self._pending)}")